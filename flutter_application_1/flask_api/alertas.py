@@ -0,0 +1,410 @@
+import heapq
+import threading
+from bisect import insort
+from collections import deque
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, select
+
+from banco import inserir_com_ids
+from database import db
+from logs import log_aviso, log_banco, log_erro
+from models import Acompanhamento, Alerta, Alta, Protocolo
+
+# Leituras guardadas enquanto a carga roda (as anteriores a ela a carga relê do banco)
+PENDENTES_MAXIMO = 10000
+# Tamanho mínimo de _chaves para esquecer as antigas a cada novo alerta; depois dobra
+CHAVES_LIMPEZA_MINIMA = 1000
+
+# 🚨 ALERTAS GLICÊMICOS
+# As regras (ALERTAS_REGRAS) guardam por paciente só o estado de que precisam
+# (uma janela de datas, um contador, um prazo) e avaliam cada leitura em O(1)
+# amortizado, logo depois do commit das rotas de escrita. O estado vive em
+# memória e é refeito a partir de `acompanhamentos` por uma thread do próprio
+# motor, que tenta de novo (com espera crescente) até conseguir.
+# Com vários workers, cada um avalia as leituras que recebeu.
+
+
+class Regra:
+    """Base das regras: nome, severidade e a faixa que conta como fora do alvo."""
+    janela = None
+
+    def __init__(self, nome, severidade='media', abaixo_de=None, acima_de=None):
+        self.nome = nome
+        self.severidade = severidade
+        self.abaixo_de = abaixo_de
+        self.acima_de = acima_de
+
+    def fora_da_faixa(self, glicemia):
+        return ((self.abaixo_de is not None and glicemia < self.abaixo_de)
+                or (self.acima_de is not None and glicemia > self.acima_de))
+
+    def faixa(self):
+        return f'< {self.abaixo_de:g}' if self.abaixo_de is not None else f'> {self.acima_de:g}'
+
+    def avaliar(self, paciente_id, glicemia, data):
+        """True quando esta leitura dispara a regra."""
+        return False
+
+    def remover(self, paciente_id):
+        pass
+
+    def limpar(self):
+        pass
+
+
+class RegraJanela(Regra):
+    """N leituras fora da faixa dentro de `horas` (ex.: duas < 70 em 6h).
+
+    Dispara quando a contagem atinge N; continua calada enquanto a janela
+    seguir cheia e volta a disparar num novo episódio."""
+
+    def __init__(self, nome, horas, ocorrencias=2, **kwargs):
+        super().__init__(nome, **kwargs)
+        self.janela = timedelta(hours=horas)
+        self.ocorrencias = ocorrencias
+        self.descricao = f'{ocorrencias} leituras {self.faixa()} mg/dL em {horas:g}h'
+        self._datas = {}  # paciente -> deque das datas fora da faixa, em ordem
+
+    def avaliar(self, paciente_id, glicemia, data):
+        if not self.fora_da_faixa(glicemia):
+            return False
+        datas = self._datas.setdefault(paciente_id, deque())
+        if datas and data < datas[-1] - self.janela:
+            return False  # leitura atrasada que já caiu fora da janela
+        if not datas or data >= datas[-1]:
+            datas.append(data)
+        else:
+            insort(datas, data)  # leitura atrasada de um lote offline
+        while datas[0] < datas[-1] - self.janela:
+            datas.popleft()
+        return len(datas) == self.ocorrencias
+
+    def remover(self, paciente_id):
+        self._datas.pop(paciente_id, None)
+
+    def limpar(self):
+        self._datas.clear()
+
+
+class RegraConsecutivas(Regra):
+    """N leituras seguidas fora da faixa (ex.: > 300 em duas checagens)."""
+
+    def __init__(self, nome, ocorrencias=2, **kwargs):
+        super().__init__(nome, **kwargs)
+        self.ocorrencias = ocorrencias
+        self.descricao = f'{ocorrencias} leituras seguidas {self.faixa()} mg/dL'
+        self._estado = {}  # paciente -> (data da última leitura, leituras seguidas fora da faixa)
+
+    def avaliar(self, paciente_id, glicemia, data):
+        ultima, seguidas = self._estado.get(paciente_id, (None, 0))
+        if ultima is not None and data < ultima:
+            return False  # fora de ordem: não mexe na sequência
+        seguidas = seguidas + 1 if self.fora_da_faixa(glicemia) else 0
+        self._estado[paciente_id] = (data, seguidas)
+        return seguidas == self.ocorrencias
+
+    def remover(self, paciente_id):
+        self._estado.pop(paciente_id, None)
+
+    def limpar(self):
+        self._estado.clear()
+
+
+class RegraAusencia(Regra):
+    """Nenhuma leitura por `horas` enquanto o paciente está na `dieta` (ex.: NPO).
+
+    Não depende de uma leitura chegar: cada atividade agenda um prazo num heap
+    e MotorAlertas.verificar() dispara os prazos vencidos."""
+
+    def __init__(self, nome, horas, dieta, **kwargs):
+        super().__init__(nome, **kwargs)
+        self.janela = timedelta(hours=horas)
+        self.dieta = normalizar_dieta(dieta)
+        self.descricao = f'Sem leitura há {horas:g}h em dieta {dieta}'
+        self._na_dieta = set()
+        self._ultima = {}   # paciente -> última leitura (ou início da dieta)
+        self._prazos = []   # heap (prazo, paciente); entradas antigas são ignoradas ao sair
+
+    def avaliar(self, paciente_id, glicemia, data):
+        self._agendar(paciente_id, data)
+        return False
+
+    def _agendar(self, paciente_id, data):
+        if paciente_id in self._ultima and data <= self._ultima[paciente_id]:
+            return
+        self._ultima[paciente_id] = data
+        if paciente_id in self._na_dieta:
+            heapq.heappush(self._prazos, (data + self.janela, paciente_id))
+
+    def definir_dieta(self, paciente_id, dieta, data):
+        if normalizar_dieta(dieta) != self.dieta:
+            self._na_dieta.discard(paciente_id)
+            return
+        if paciente_id not in self._na_dieta:
+            self._na_dieta.add(paciente_id)
+            ultima = max(self._ultima.get(paciente_id, data), data)
+            self._ultima[paciente_id] = ultima
+            heapq.heappush(self._prazos, (ultima + self.janela, paciente_id))
+
+    def vencidos(self, agora):
+        """[(paciente, última atividade)] cujo prazo passou sem nova leitura."""
+        resultado = []
+        while self._prazos and self._prazos[0][0] <= agora:
+            prazo, paciente_id = heapq.heappop(self._prazos)
+            ultima = self._ultima.get(paciente_id)
+            if paciente_id in self._na_dieta and ultima is not None and ultima + self.janela == prazo:
+                resultado.append((paciente_id, ultima))
+        return resultado
+
+    def remover(self, paciente_id):
+        self._na_dieta.discard(paciente_id)
+        self._ultima.pop(paciente_id, None)
+
+    def limpar(self):
+        self._na_dieta.clear()
+        self._ultima.clear()
+        self._prazos.clear()
+
+
+TIPOS_REGRA = {
+    'janela': RegraJanela,
+    'consecutivas': RegraConsecutivas,
+    'ausencia': RegraAusencia,
+}
+
+
+def normalizar_dieta(dieta):
+    return (dieta or '').strip().upper()
+
+
+def criar_regra(configuracao):
+    """Instancia uma regra a partir de um item de ALERTAS_REGRAS ({'tipo': ..., 'nome': ..., ...})."""
+    configuracao = dict(configuracao)
+    tipo = configuracao.pop('tipo', None)
+    if tipo not in TIPOS_REGRA:
+        raise ValueError(f"Tipo de regra de alerta desconhecido: {tipo}")
+    return TIPOS_REGRA[tipo](**configuracao)
+
+
+def gravar_alertas(novos, fila=None):
+    """INSERT dos alertas gerados, com commit. `fila` é a FilaEscrita do SQLite
+    para quem grava fora de uma requisição (aquecimento e verificação periódica)."""
+    if not novos:
+        return
+    if fila:
+        fila.entrar()
+    try:
+        inserir_com_ids(db.session, Alerta, novos)  # os ids vão junto no evento publicado
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        if fila:
+            fila.sair()
+
+
+class MotorAlertas:
+    """Avalia ALERTAS_REGRAS sobre as leituras à medida que chegam.
+
+    processar() e verificar() só devolvem as linhas de Alerta novas; quem
+    chama grava (gravar_alertas) e publica. `publicar(novos)` é chamado para os
+    alertas que o próprio motor grava (aquecimento e verificação periódica)."""
+
+    def __init__(self, app, publicar=None):
+        self.app = app
+        self.publicar = publicar
+        self.regras = [criar_regra(r) for r in app.config['ALERTAS_REGRAS']]
+        # Quanto do histórico o aquecimento relê: a maior janela, no mínimo 24h
+        self.horizonte = max([timedelta(hours=24)] + [r.janela for r in self.regras if r.janela])
+        self.pronto = False
+        self.gerados = 0
+        self._chaves = set()     # (paciente, regra, data_referencia) já gerados, contra duplicatas
+        self._proxima_limpeza = CHAVES_LIMPEZA_MINIMA
+        self._carregando = False
+        self._pendentes = deque(maxlen=PENDENTES_MAXIMO)  # leituras que chegaram durante a carga
+        self._lock = threading.Lock()
+        self._lock_carga = threading.Lock()
+        self._parar = threading.Event()
+
+    def _novo(self, novos, regra, paciente_id, data, glicemia=None):
+        chave = (paciente_id, regra.nome, data)
+        if chave in self._chaves:
+            return
+        self._chaves.add(chave)
+        # Limpeza amortizada: não depende de verificar(), que pode estar desligada
+        if len(self._chaves) >= self._proxima_limpeza:
+            self._esquecer_chaves(datetime.utcnow())
+        novos.append({
+            'paciente_id': paciente_id, 'regra': regra.nome, 'severidade': regra.severidade,
+            'mensagem': regra.descricao, 'glicemia': glicemia, 'data_referencia': data,
+            'criado_em': datetime.utcnow()
+        })
+
+    def _esquecer_chaves(self, agora):
+        limite = agora - self.horizonte
+        self._chaves = {c for c in self._chaves if c[2] >= limite}
+        self._proxima_limpeza = max(CHAVES_LIMPEZA_MINIMA, 2 * len(self._chaves))
+
+    def _avaliar(self, leituras):
+        novos = []
+        for paciente_id, glicemia, data in sorted(leituras, key=lambda leitura: leitura[2]):
+            for regra in self.regras:
+                if regra.avaliar(paciente_id, glicemia, data):
+                    self._novo(novos, regra, paciente_id, data, glicemia)
+        self.gerados += len(novos)
+        return novos
+
+    def processar(self, leituras):
+        """Leituras já commitadas: [(paciente_id, glicemia, data_registro)]."""
+        with self._lock:
+            if not self.pronto:
+                # Antes da carga não há o que guardar: as leituras já estão no banco e serão relidas
+                if self._carregando:
+                    self._pendentes.extend(leituras)
+                return []
+            return self._avaliar(leituras)
+
+    def definir_dieta(self, paciente_id, dieta, data):
+        with self._lock:
+            for regra in self.regras:
+                if isinstance(regra, RegraAusencia):
+                    regra.definir_dieta(paciente_id, dieta, data)
+
+    def remover_paciente(self, paciente_id):
+        """Alta: o paciente sai de todas as janelas."""
+        with self._lock:
+            for regra in self.regras:
+                regra.remover(paciente_id)
+
+    def verificar(self, agora=None):
+        """Dispara as regras de ausência vencidas e esquece chaves fora do horizonte."""
+        agora = agora or datetime.utcnow()
+        with self._lock:
+            if not self.pronto:
+                return []
+            novos = []
+            for regra in self.regras:
+                if isinstance(regra, RegraAusencia):
+                    for paciente_id, ultima in regra.vencidos(agora):
+                        self._novo(novos, regra, paciente_id, ultima)
+            self.gerados += len(novos)
+            self._esquecer_chaves(agora)
+            return novos
+
+    def carregar(self):
+        """Refaz o estado das regras a partir do banco (requer app context).
+        Alertas que deveriam ter saído enquanto o app estava fora são gerados
+        agora; os já gravados não se repetem."""
+        with self._lock_carga:
+            with self._lock:
+                self._carregando = True
+                self._pendentes.clear()
+            try:
+                self._carregar()
+            finally:
+                with self._lock:
+                    self._carregando = False
+                    self._pendentes.clear()
+
+    def _carregar(self):
+        agora = datetime.utcnow()
+        inicio = agora - self.horizonte
+        chaves = {tuple(c) for c in db.session.execute(
+            select(Alerta.paciente_id, Alerta.regra, Alerta.data_referencia).where(Alerta.data_referencia >= inicio)
+        )}
+        leituras = db.session.execute(
+            select(Acompanhamento.paciente_id, Acompanhamento.glicemia, Acompanhamento.data_registro)
+            .where(Acompanhamento.data_registro >= inicio).order_by(Acompanhamento.data_registro)
+        ).all()
+        ultimos = (select(Protocolo.paciente_id, func.max(Protocolo.data_protocolo).label('ultimo'))
+                   .group_by(Protocolo.paciente_id).subquery())
+        dietas = db.session.execute(
+            select(Protocolo.paciente_id, Protocolo.dieta, Protocolo.data_protocolo)
+            .join(ultimos, and_(Protocolo.paciente_id == ultimos.c.paciente_id,
+                                Protocolo.data_protocolo == ultimos.c.ultimo))
+            .where(Protocolo.data_protocolo >= inicio)
+        ).all()
+        altas = dict(db.session.execute(
+            select(Alta.paciente_id, func.max(Alta.data_alta)).where(Alta.data_alta >= inicio).group_by(Alta.paciente_id)
+        ).all())
+        carregadas = {(pid, data.replace(microsecond=0)) for pid, _, data in leituras}
+
+        with self._lock:
+            self._chaves = chaves
+            for regra in self.regras:
+                regra.limpar()
+            novos = self._avaliar(leituras)
+            for paciente_id, dieta, data in dietas:
+                for regra in self.regras:
+                    if isinstance(regra, RegraAusencia):
+                        regra.definir_dieta(paciente_id, dieta, data)
+            # Alta depois da última atividade: o paciente não é mais acompanhado
+            ultimas = {}
+            for paciente_id, _, data in list(leituras) + list(dietas):
+                ultimas[paciente_id] = max(ultimas.get(paciente_id, data), data)
+            for paciente_id, data_alta in altas.items():
+                if data_alta >= ultimas.get(paciente_id, data_alta):
+                    for regra in self.regras:
+                        regra.remover(paciente_id)
+            # Leituras que chegaram durante a carga e que a consulta não viu
+            pendentes = [l for l in self._pendentes if (l[0], l[2].replace(microsecond=0)) not in carregadas]
+            novos += self._avaliar(pendentes)
+            self.pronto = True
+
+        gravar_alertas(novos, self.app.extensions.get('insulincare_fila_escrita'))
+        if novos and self.publicar:
+            self.publicar(novos)
+        log_banco(f"🚨 Alertas: {len(leituras)} leituras relidas, {len(novos)} alertas recuperados")
+
+    def _carregar_ate_conseguir(self):
+        """Carga com nova tentativa a cada falha (AQUECIMENTO_ESPERA_INICIAL dobrando
+        até AQUECIMENTO_ESPERA_MAXIMA). Devolve False se o motor foi parado antes."""
+        config = self.app.config
+        tentativas = 0
+        while not self._parar.is_set():
+            try:
+                with self.app.app_context():
+                    try:
+                        self.carregar()
+                    finally:
+                        db.session.remove()
+                return True
+            except Exception as e:
+                tentativas += 1
+                espera = min(config.get('AQUECIMENTO_ESPERA_MAXIMA', 60),
+                             config.get('AQUECIMENTO_ESPERA_INICIAL', 1) * 2 ** (tentativas - 1))
+                log_erro(f"Falha ao carregar os alertas (tentativa {tentativas}, "
+                         f"nova tentativa em {espera:.0f}s): {str(e)}")
+                self._parar.wait(espera)
+        return False
+
+    def iniciar(self):
+        """Thread que carrega o estado e depois, a cada ALERTAS_VERIFICACAO_MINUTOS
+        (0 = nunca), verifica as regras de ausência."""
+        minutos = self.app.config['ALERTAS_VERIFICACAO_MINUTOS']
+
+        def _laco():
+            if not self._carregar_ate_conseguir() or minutos <= 0:
+                return
+            while not self._parar.wait(minutos * 60):
+                try:
+                    with self.app.app_context():
+                        novos = self.verificar()
+                        gravar_alertas(novos, self.app.extensions.get('insulincare_fila_escrita'))
+                        if novos:
+                            log_aviso(f"🚨 {len(novos)} alertas de ausência de leitura")
+                            if self.publicar:
+                                self.publicar(novos)
+                        db.session.remove()
+                except Exception as e:
+                    log_erro(f"Falha na verificação de alertas: {str(e)}")
+
+        threading.Thread(target=_laco, name='alertas', daemon=True).start()
+
+    def parar(self):
+        self._parar.set()
+
+    def estatisticas(self):
+        return {'pronto': self.pronto, 'regras': [r.nome for r in self.regras], 'gerados': self.gerados}
@@ -1,130 +1,179 @@
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, Response, current_app, g, request, jsonify, stream_with_context
+from flask.cli import with_appcontext
 from flask_cors import CORS
+from werkzeug.local import LocalProxy
 from database import db
-from models import Paciente, Protocolo, Prescricao, Acompanhamento, Alta
+from models import (Paciente, Protocolo, Prescricao, Acompanhamento, Alta, Remocao, PacienteResumo, Alerta,
+                    ProtocoloArquivo, PrescricaoArquivo, AcompanhamentoArquivo)
+from config import Config
+from glicemia import resumir_por_paciente, resumo_vazio, agrupar_serie, lttb
+from doses import calcular_prescricoes, ckd_epi_2021
+from cache import criar_cache
+from perfil_sql import init_perfil_sql
+from logs import init_logs, log_sucesso, log_erro, log_info, log_aviso, log_banco, log_requisicao
+from metricas import RegistroMetricas, init_metricas, renderizar
+from prontidao import Prontidao
+from eventos import BarramentoEventos
+from arquivamento import Arquivador, MODELOS_ARQUIVO
+from alertas import MotorAlertas, gravar_alertas
+from relatorios import TIPOS_RELATORIO, ExecutorRelatorios, FilaCheia
+from replicas import init_replica
+from versoes import condicional, criar_versoes
+from busca import IndiceBusca, buscar_no_banco, normalizar, preencher_nome_busca
+from resumos import JANELA_RESUMO, atualizar_resumo_leituras, atualizar_resumo_prescricoes, reconstruir_resumos
+from sincronizacao import MODELOS_SINCRONIZADOS, init_sincronizacao
+from codificacao import FormatoInvalido, init_compressao, responder_lista
+from banco import init_banco, inserir_com_ids, opcoes_engine, sem_escrita
+from esquema import atualizar_esquema
+from serializadores import (serializar_paciente, serializar_protocolo, serializar_prescricao,
+                            serializar_acompanhamento, serializar_alta, serializar_alerta)
+import click
+import csv
+import io
+import json
+import numpy as np
 import pymysql
+import re
 import socket
-from datetime import datetime
-import traceback
-from sqlalchemy import text, inspect
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import text, inspect, update, exists, union_all
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import selectinload
 
 # Instalar driver PyMySQL
 pymysql.install_as_MySQLdb()
 
-app = Flask(__name__)
-CORS(app)
+api = Blueprint('api', __name__)
 
-# Configuração MySQL (XAMPP)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'mysql+pymysql://root:@localhost:3306/hospital_db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_timeout': 20,
-    'pool_recycle': -1,
-    'pool_pre_ping': True
-}
+# Estado por app, guardado em app.extensions pelo create_app
+cache = LocalProxy(lambda: current_app.extensions['insulincare_cache'])
+metricas = LocalProxy(lambda: current_app.extensions['insulincare_metricas'])
+prontidao = LocalProxy(lambda: current_app.extensions['insulincare_prontidao'])
+eventos = LocalProxy(lambda: current_app.extensions['insulincare_eventos'])
+arquivador = LocalProxy(lambda: current_app.extensions['insulincare_arquivador'])
+indice_busca = LocalProxy(lambda: current_app.extensions['insulincare_busca'])
+motor_alertas = LocalProxy(lambda: current_app.extensions['insulincare_alertas'])
+executor_relatorios = LocalProxy(lambda: current_app.extensions['insulincare_relatorios'])
+versoes = LocalProxy(lambda: current_app.extensions['insulincare_versoes'])
 
-db.init_app(app)
+# 🔧 FUNÇÕES AUXILIARES
+def guardar_no_cache(chave, valor):
+    """cache.set, exceto para leituras da réplica: com atraso, ela devolveria o
+    dado de antes da escrita que acabou de invalidar a chave."""
+    if not g.get('usar_replica'):
+        cache.set(chave, valor)
 
-# 🎨 FUNÇÕES PARA LOGS COLORIDOS
-def print_header():
-    print("\n" + "="*60)
-    print("🏥 INSULIN PRESCRIBER - API FLASK")
-    print("="*60)
+def serializar_valor(valor):
+    return valor.isoformat() if isinstance(valor, datetime) else valor
 
-def print_success(message):
-    print(f"✅ {datetime.now().strftime('%H:%M:%S')} | {message}")
+def converter_data(valor):
+    """Converte uma data ISO 8601 para datetime UTC sem fuso (como o banco grava).
 
-def print_error(message):
-    print(f"❌ {datetime.now().strftime('%H:%M:%S')} | {message}")
+    Levanta ValueError se o texto não for uma data válida."""
+    data = datetime.fromisoformat(valor)
+    if data.tzinfo is not None:
+        data = data.astimezone(timezone.utc).replace(tzinfo=None)
+    return data
 
-def print_info(message):
-    print(f"ℹ️  {datetime.now().strftime('%H:%M:%S')} | {message}")
+LIMITE_MAXIMO_HISTORICO = 10000
+TAMANHO_CHUNK_INSERCAO = 1000
 
-def print_warning(message):
-    print(f"⚠️  {datetime.now().strftime('%H:%M:%S')} | {message}")
+def filtrar_periodo(query, coluna):
+    """Aplica ?since=&until=&order=&limit= a uma consulta de histórico.
 
-def print_database(message):
-    print(f"🗄️  {datetime.now().strftime('%H:%M:%S')} | {message}")
+    Com o índice (paciente_id, coluna) o banco resolve tudo como um range
+    scan já ordenado. Levanta ValueError com mensagem amigável se algum
+    parâmetro for inválido."""
+    since = request.args.get('since')
+    until = request.args.get('until')
+    try:
+        if since:
+            query = query.where(coluna >= converter_data(since))
+        if until:
+            query = query.where(coluna <= converter_data(until))
+    except ValueError:
+        raise ValueError('since/until devem estar no formato ISO 8601')
 
-def print_request(method, endpoint, data=None):
-    print(f"🌐 {datetime.now().strftime('%H:%M:%S')} | {method} {endpoint}")
-    if data and len(str(data)) < 200:
-        print(f"   📦 Dados: {data}")
+    order = request.args.get('order', 'asc').lower()
+    if order not in ('asc', 'desc'):
+        raise ValueError("order deve ser 'asc' ou 'desc'")
+    query = query.order_by(coluna.asc() if order == 'asc' else coluna.desc())
 
-def print_separator():
-    print("-" * 60)
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        query = query.limit(max(1, min(limit, LIMITE_MAXIMO_HISTORICO)))
+    return query
 
-# Inicialização do banco
-print_header()
-print_info("Iniciando configuração do banco de dados...")
+def consultar_historico(modelo, paciente_id, coluna):
+    """Histórico do paciente (com filtrar_periodo) nas tabelas quentes e no arquivo.
 
-with app.app_context():
-    try:
-        print_database("Testando conexão com MySQL...")
-        
-        with db.engine.connect() as connection:
-            result = connection.execute(text('SELECT 1'))
-            result.fetchone()
-        
-        print_success("Conexão com MySQL estabelecida!")
-        
-        print_database("Criando tabelas no banco 'hospital_db'...")
-        db.create_all()
-        print_success("Todas as tabelas criadas/verificadas com sucesso!")
-        
-        inspector = inspect(db.engine)
-        tables = inspector.get_table_names()
-        print_database(f"Tabelas disponíveis: {', '.join(tables)}")
-        
-        if tables:
-            print_success(f"✨ {len(tables)} tabelas encontradas no banco!")
-        else:
-            print_warning("Nenhuma tabela encontrada - verificar models.py")
-        
-    except Exception as e:
-        print_error(f"Erro na configuração do banco: {str(e)}")
-        print_error("Possíveis causas:")
-        print_error("1. XAMPP MySQL não está rodando")
-        print_error("2. Banco 'hospital_db' não existe")
-        print_error("3. Permissões de acesso")
-        print_info("💡 Solução: Verifique XAMPP e crie o banco via phpMyAdmin")
+    Para quem está internado o arquivo não tem nada e custa só uma busca vazia
+    no índice. Levanta ValueError como filtrar_periodo."""
+    registros = db.session.scalars(
+        filtrar_periodo(db.select(modelo).where(modelo.paciente_id == paciente_id), coluna)
+    ).all()
+    arquivo = MODELOS_ARQUIVO.get(modelo)
+    if arquivo is None:
+        return registros
+
+    arquivados = db.session.scalars(filtrar_periodo(
+        db.select(arquivo).where(arquivo.paciente_id == paciente_id), getattr(arquivo, coluna.key)
+    )).all()
+    if not arquivados:
+        return registros
 
-print_separator()
+    decrescente = request.args.get('order', 'asc').lower() == 'desc'
+    registros = sorted(registros + arquivados, key=lambda r: getattr(r, coluna.key) or datetime.min,
+                       reverse=decrescente)
+    limit = request.args.get('limit', type=int)
+    return registros[:max(1, min(limit, LIMITE_MAXIMO_HISTORICO))] if limit is not None else registros
 
 # ===============================
 # ROTAS PRINCIPAIS
 # ===============================
 
-@app.route('/health')
+@api.route('/health')
 def health_check():
-    print_request('GET', '/health')
+    log_requisicao('GET', '/health')
     try:
         with db.engine.connect() as connection:
             connection.execute(text('SELECT 1'))
         
-        print_success("Health check - Sistema OK")
-        return jsonify({
+        log_sucesso("Health check - Sistema OK")
+        resposta = {
             "status": "healthy",
             "timestamp": datetime.now().isoformat(),
             "database": "connected",
             "message": "Sistema funcionando normalmente"
-        })
+        }
+        replica = current_app.extensions.get('insulincare_replica')
+        if replica is not None:
+            resposta["replica"] = replica.resumo()
+        return jsonify(resposta)
     except Exception as e:
-        print_error(f"Health check falhou: {str(e)}")
+        log_erro(f"Health check falhou: {str(e)}")
         return jsonify({
             "status": "unhealthy", 
             "error": str(e),
             "timestamp": datetime.now().isoformat()
         }), 500
 
-@app.route('/network-info')
+@api.route('/ready')
+def readiness_check():
+    # Diferente do /health: só responde 200 depois do aquecimento do banco
+    if prontidao.modo == 'lazy':
+        prontidao.garantir()
+    resumo = prontidao.resumo()
+    return jsonify(resumo), (200 if resumo['status'] == 'pronto' else 503)
+
+@api.route('/network-info')
 def network_info():
-    print_request('GET', '/network-info')
+    log_requisicao('GET', '/network-info')
     try:
         hostname = socket.gethostname()
         local_ip = socket.gethostbyname(hostname)
         
-        print_success(f"Info de rede obtida: {local_ip}")
+        log_sucesso(f"Info de rede obtida: {local_ip}")
         return jsonify({
             "hostname": hostname,
             "local_ip": local_ip,
@@ -136,12 +185,21 @@ def network_info():
             ]
         })
     except Exception as e:
-        print_error(f"Erro ao obter info de rede: {str(e)}")
+        log_erro(f"Erro ao obter info de rede: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
-@app.route('/')
+@api.route('/metrics')
+def metrics():
+    texto = renderizar(metricas, pool=db.engine.pool, cache=cache, relatorios=executor_relatorios)
+    return Response(texto, mimetype='text/plain; version=0.0.4')
+
+@api.route('/cache/stats')
+def cache_stats():
+    return jsonify({**cache.estatisticas(), 'versoes': versoes.estatisticas()})
+
+@api.route('/')
 def home():
-    print_request('GET', '/')
+    log_requisicao('GET', '/')
     response = {
         "mensagem": "🚀 API Flask conectada com sucesso!",
         "status": "online",
@@ -158,50 +216,133 @@ def home():
             "/altas - Processar altas"
         ]
     }
-    print_success("✨ Rota principal acessada com sucesso")
+    log_sucesso("✨ Rota principal acessada com sucesso")
     return jsonify(response)
 
 # ===============================
 # ROTAS DE PACIENTES
 # ===============================
 
-@app.route('/pacientes', methods=['GET'])
+# Colunas expostas em GET /pacientes (chave = nome no JSON)
+CAMPOS_PACIENTE = {
+    'id': Paciente.id,
+    'nome': Paciente.nome,
+    'prontuario': Paciente.prontuario,
+    'sexo': Paciente.sexo,
+    'idade': Paciente.idade,
+    'peso': Paciente.peso,
+    'altura': Paciente.altura,
+    'imc': Paciente.imc,
+    'egfr': Paciente.egfr,
+    'cenario': Paciente.cenario,
+    'local_internacao': Paciente.local_internacao,
+    'data_cadastro': Paciente.data_cadastro
+}
+
+CAMPOS_RESUMO = {
+    'ultima_glicemia': PacienteResumo.ultima_glicemia,
+    'ultima_leitura_em': PacienteResumo.ultima_leitura_em,
+    'leituras': PacienteResumo.leituras,
+    'minima_24h': PacienteResumo.minima_24h,
+    'maxima_24h': PacienteResumo.maxima_24h,
+    'janela_em': PacienteResumo.janela_em,
+    'tdd_atual': PacienteResumo.tdd_atual,
+    'ultima_prescricao_em': PacienteResumo.ultima_prescricao_em
+}
+
+def montar_resumo(valores, limite_janela):
+    resumo = {nome: serializar_valor(valor) for nome, valor in zip(CAMPOS_RESUMO, valores)}
+    resumo['leituras'] = resumo['leituras'] or 0
+    # Min/máx calculados há mais de 24h já não descrevem as últimas 24h
+    janela_em = valores[list(CAMPOS_RESUMO).index('janela_em')]
+    if janela_em is None or janela_em < limite_janela:
+        resumo['minima_24h'] = resumo['maxima_24h'] = None
+    return resumo
+
+LIMITE_PADRAO_PACIENTES = 200
+LIMITE_MAXIMO_PACIENTES = 1000
+# O resumo muda com o relógio (min/máx das últimas 24h): ETag vale no máximo isso
+VALIDADE_ETAG_RESUMO = 60
+
+def incluir_resumo():
+    return 'resumo' in request.args.get('include', '')
+
+@api.route('/pacientes', methods=['GET'])
+@condicional(lambda: ['pacientes', 'paciente_resumo'] if incluir_resumo() else ['pacientes'],
+             validade=lambda: VALIDADE_ETAG_RESUMO if incluir_resumo() else None)
 def listar_pacientes():
-    print_request('GET', '/pacientes')
-    try:
-        pacientes = Paciente.query.all()
-        print_database(f"Encontrados {len(pacientes)} pacientes no banco")
-        
-        result = [{
-            'id': p.id,
-            'nome': p.nome,
-            'prontuario': p.prontuario,
-            'sexo': p.sexo,
-            'idade': p.idade,
-            'peso': p.peso,
-            'altura': p.altura,
-            'imc': p.imc,
-            'egfr': p.egfr,
-            'cenario': p.cenario,
-            'local_internacao': p.local_internacao,
-            'data_cadastro': p.data_cadastro.isoformat() if p.data_cadastro else None
-        } for p in pacientes]
-        
-        print_success(f"📋 Lista de pacientes retornada ({len(result)} registros)")
-        return jsonify(result)
+    log_requisicao('GET', '/pacientes', dict(request.args) or None)
+    try:
+        # 📄 Paginação por cursor: ?after_id=<último id recebido>&limit=N
+        after_id = request.args.get('after_id', type=int)
+        limit = request.args.get('limit', LIMITE_PADRAO_PACIENTES, type=int)
+        limit = max(1, min(limit, LIMITE_MAXIMO_PACIENTES))
+
+        # 🔎 Projeção: ?fields=nome,cenario (o id sempre acompanha, é o cursor)
+        fields = request.args.get('fields')
+        if fields:
+            nomes = [f.strip() for f in fields.split(',') if f.strip()]
+            invalidos = [f for f in nomes if f not in CAMPOS_PACIENTE]
+            if invalidos:
+                log_aviso(f"Campos inválidos em ?fields: {invalidos}")
+                return jsonify({'error': f"Campos inválidos: {', '.join(invalidos)}"}), 400
+            nomes = ['id'] + [f for f in nomes if f != 'id']
+        else:
+            nomes = list(CAMPOS_PACIENTE)
+
+        # 📋 ?include=resumo: junta paciente_resumo (uma linha por paciente, pela PK)
+        incluir = {i.strip() for i in request.args.get('include', '').split(',') if i.strip()}
+        if incluir - {'resumo'}:
+            return jsonify({'error': "include aceita apenas 'resumo'"}), 400
+
+        # Seleciona só as colunas pedidas, sem montar objetos Paciente
+        query = db.select(*[CAMPOS_PACIENTE[f] for f in nomes])
+        if 'resumo' in incluir:
+            query = query.add_columns(*CAMPOS_RESUMO.values()) \
+                         .outerjoin(PacienteResumo, PacienteResumo.paciente_id == Paciente.id)
+        if after_id is not None:
+            query = query.where(Paciente.id > after_id)
+
+        cenario = request.args.get('cenario', type=int)
+        if cenario is not None:
+            query = query.where(Paciente.cenario == cenario)
+        local_internacao = request.args.get('local_internacao')
+        if local_internacao:
+            query = query.where(Paciente.local_internacao == local_internacao)
+
+        # Busca limit+1 linhas para saber se existe próxima página
+        linhas = db.session.execute(query.order_by(Paciente.id).limit(limit + 1)).all()
+        tem_mais = len(linhas) > limit
+        linhas = linhas[:limit]
+        log_banco(f"Encontrados {len(linhas)} pacientes no banco")
+
+        result = [{nome: serializar_valor(valor) for nome, valor in zip(nomes, linha)} for linha in linhas]
+        if 'resumo' in incluir:
+            limite_janela = datetime.utcnow() - JANELA_RESUMO
+            for item, linha in zip(result, linhas):
+                item['resumo'] = montar_resumo(linha[len(nomes):], limite_janela)
+
+        response = responder_lista(result, nomes + ['resumo'] if 'resumo' in incluir else nomes)
+        if tem_mais:
+            response.headers['X-Next-After-Id'] = str(result[-1]['id'])
+
+        log_sucesso(f"📋 Lista de pacientes retornada ({len(result)} registros)")
+        return response
         
+    except FormatoInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        print_error(f"Erro ao listar pacientes: {str(e)}")
+        log_erro(f"Erro ao listar pacientes: {str(e)}")
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
-@app.route('/pacientes', methods=['POST'])
+@api.route('/pacientes', methods=['POST'])
 def criar_paciente():
     data = request.json
-    print_request('POST', '/pacientes', {'nome': data.get('nome'), 'cenario': data.get('cenario')})
+    log_requisicao('POST', '/pacientes', {'nome': data.get('nome'), 'cenario': data.get('cenario')})
     
     try:
         if not data.get('nome') or not data.get('nome').strip():
-            print_warning("Tentativa de criar paciente sem nome")
+            log_aviso("Tentativa de criar paciente sem nome")
             return jsonify({'error': 'Nome é obrigatório'}), 400
         
         novo = Paciente(
@@ -220,10 +361,16 @@ def criar_paciente():
         )
         
         db.session.add(novo)
+        db.session.flush()
+        db.session.add(PacienteResumo(paciente_id=novo.id, leituras=0))
         db.session.commit()
+        cache.delete(f'paciente:{novo.id}')
+        versoes.incrementar('pacientes')
+        if indice_busca.pronto:
+            indice_busca.adicionar(novo.id, novo.nome, novo.prontuario, novo.local_internacao)
         
-        print_success(f"✨ Paciente criado: ID={novo.id}, Nome={novo.nome}")
-        print_database(f"📊 Dados: IMC={novo.imc}, TFG={novo.egfr}, Cenário={novo.cenario}")
+        log_sucesso(f"✨ Paciente criado: ID={novo.id}, Nome={novo.nome}")
+        log_banco(f"📊 Dados: IMC={novo.imc}, TFG={novo.egfr}, Cenário={novo.cenario}")
         
         return jsonify({
             'message': 'Paciente cadastrado com sucesso', 
@@ -232,45 +379,176 @@ def criar_paciente():
         })
         
     except Exception as e:
-        print_error(f"Erro ao criar paciente: {str(e)}")
-        print_error(f"Dados recebidos: {data}")
+        log_erro(f"Erro ao criar paciente: {str(e)}")
         db.session.rollback()
         return jsonify({'error': 'Erro ao salvar paciente no banco'}), 500
 
-@app.route('/pacientes/<int:paciente_id>', methods=['GET'])
+LIMITE_PADRAO_BUSCA = 20
+LIMITE_MAXIMO_BUSCA = 100
+
+@api.route('/pacientes/busca', methods=['GET'])
+def buscar_pacientes():
+    """?q= por nome (sem acentos, prefixo ou aproximado) ou prontuário (exato ou
+    prefixo), em ordem de relevância. O cabeçalho X-Busca-Origem informa se
+    respondeu o índice em memória ou, enquanto ele carrega, o banco."""
+    q = request.args.get('q', '')
+    log_requisicao('GET', '/pacientes/busca', {'q': q})
+    if len(normalizar(q)) < 2:
+        return jsonify({'error': 'q deve ter ao menos 2 caracteres'}), 400
+    limite = max(1, min(request.args.get('limit', LIMITE_PADRAO_BUSCA, type=int), LIMITE_MAXIMO_BUSCA))
+
+    try:
+        if indice_busca.pronto:
+            indice_busca.sincronizar()
+            resultados, origem = indice_busca.buscar(q, limite), 'memoria'
+        else:
+            indice_busca.carregar_em_segundo_plano(current_app._get_current_object())
+            resultados, origem = buscar_no_banco(q, limite), 'banco'
+
+        log_sucesso(f"🔎 Busca '{q}': {len(resultados)} pacientes ({origem})")
+        response = jsonify(resultados)
+        response.headers['X-Busca-Origem'] = origem
+        return response
+
+    except Exception as e:
+        log_erro(f"Erro na busca de pacientes: {str(e)}")
+        return jsonify({'error': 'Erro interno'}), 500
+
+@api.route('/pacientes/<int:paciente_id>', methods=['GET'])
 def buscar_paciente(paciente_id):
-    print_request('GET', f'/pacientes/{paciente_id}')
+    log_requisicao('GET', f'/pacientes/{paciente_id}')
     
     try:
-        paciente = Paciente.query.get_or_404(paciente_id)
-        print_success(f"Paciente encontrado: {paciente.nome}")
+        resultado = cache.get(f'paciente:{paciente_id}')
+        if resultado is None:
+            paciente = db.session.get(Paciente, paciente_id)
+            if paciente is None:
+                log_aviso(f"Paciente {paciente_id} não encontrado")
+                return jsonify({'error': 'Paciente não encontrado'}), 404
+            resultado = serializar_paciente(paciente)
+            guardar_no_cache(f'paciente:{paciente_id}', resultado)
+        log_sucesso(f"Paciente encontrado: {resultado['nome']}")
         
-        return jsonify({
-            'id': paciente.id,
-            'nome': paciente.nome,
-            'prontuario': paciente.prontuario,
-            'sexo': paciente.sexo,
-            'idade': paciente.idade,
-            'peso': paciente.peso,
-            'altura': paciente.altura,
-            'imc': paciente.imc,
-            'egfr': paciente.egfr,
-            'cenario': paciente.cenario,
-            'local_internacao': paciente.local_internacao
-        })
+        return jsonify(resultado)
         
     except Exception as e:
-        print_error(f"Erro ao buscar paciente {paciente_id}: {str(e)}")
-        return jsonify({'error': 'Paciente não encontrado'}), 404
+        # Erro de banco (ex.: esquema desatualizado) não é "não encontrado"
+        log_erro(f"Erro ao buscar paciente {paciente_id}: {str(e)}")
+        return jsonify({'error': 'Erro interno'}), 500
+
+# ===============================
+# PAINEL DO PACIENTE (uma requisição)
+# ===============================
+
+PRESCRICOES_PADRAO_PAINEL = 5
+HORAS_PADRAO_PAINEL = 72
+LIMITE_PACIENTES_PAINEL = 200
+
+def opcoes_painel(desde):
+    """Carregamento antecipado das relações do painel: uma consulta IN por relação,
+    independente do número de pacientes. As leituras já vêm limitadas à janela."""
+    return (
+        selectinload(Paciente.protocolos),
+        selectinload(Paciente.prescricoes),
+        selectinload(Paciente.acompanhamentos.and_(Acompanhamento.data_registro >= desde)),
+        selectinload(Paciente.altas),
+    )
+
+def montar_painel(paciente, n_prescricoes):
+    protocolos = sorted(paciente.protocolos, key=lambda p: (p.data_protocolo or datetime.min, p.id))
+    prescricoes = sorted(paciente.prescricoes, key=lambda p: (p.data_prescricao or datetime.min, p.id), reverse=True)
+    leituras = sorted(paciente.acompanhamentos, key=lambda r: (r.data_registro or datetime.min, r.id))
+    altas = sorted(paciente.altas, key=lambda a: (a.data_alta or datetime.min, a.id))
+
+    return {
+        'paciente': serializar_paciente(paciente),
+        'protocolo': serializar_protocolo(protocolos[-1]) if protocolos else None,
+        'prescricoes': [serializar_prescricao(p) for p in prescricoes[:n_prescricoes]],
+        'acompanhamentos': [serializar_acompanhamento(r) for r in leituras],
+        'alta': serializar_alta(altas[-1]) if altas else None,
+        'internado': not altas
+    }
+
+def parametros_painel():
+    n_prescricoes = max(1, request.args.get('prescricoes', PRESCRICOES_PADRAO_PAINEL, type=int))
+    horas = max(1, request.args.get('horas', HORAS_PADRAO_PAINEL, type=int))
+    return n_prescricoes, datetime.utcnow() - timedelta(hours=horas)
+
+def completar_painel_arquivado(painel, paciente_id, n_prescricoes, desde):
+    """Paciente com alta e histórico já arquivado: busca nas tabelas *_arquivo."""
+    protocolo = ultimo_protocolo(ProtocoloArquivo, paciente_id)
+    painel['protocolo'] = serializar_protocolo(protocolo) if protocolo else None
+    painel['prescricoes'] = [serializar_prescricao(p) for p in db.session.scalars(
+        db.select(PrescricaoArquivo).where(PrescricaoArquivo.paciente_id == paciente_id)
+        .order_by(PrescricaoArquivo.data_prescricao.desc(), PrescricaoArquivo.id.desc()).limit(n_prescricoes)
+    )]
+    painel['acompanhamentos'] = [serializar_acompanhamento(r) for r in db.session.scalars(
+        db.select(AcompanhamentoArquivo)
+        .where(AcompanhamentoArquivo.paciente_id == paciente_id, AcompanhamentoArquivo.data_registro >= desde)
+        .order_by(AcompanhamentoArquivo.data_registro, AcompanhamentoArquivo.id)
+    )]
+
+@api.route('/pacientes/<int:paciente_id>/painel', methods=['GET'])
+def painel_paciente(paciente_id):
+    log_requisicao('GET', f'/pacientes/{paciente_id}/painel', dict(request.args) or None)
+
+    try:
+        n_prescricoes, desde = parametros_painel()
+        paciente = db.session.scalars(
+            db.select(Paciente).where(Paciente.id == paciente_id).options(*opcoes_painel(desde))
+        ).first()
+        if paciente is None:
+            log_aviso(f"Paciente {paciente_id} não encontrado para o painel")
+            return jsonify({'error': 'Paciente não encontrado'}), 404
+
+        painel = montar_painel(paciente, n_prescricoes)
+        if painel['alta'] and painel['protocolo'] is None and not painel['prescricoes']:
+            completar_painel_arquivado(painel, paciente_id, n_prescricoes, desde)
+
+        log_sucesso(f"🩺 Painel montado para {paciente.nome}")
+        return jsonify(painel)
+
+    except Exception as e:
+        log_erro(f"Erro ao montar painel do paciente {paciente_id}: {str(e)}")
+        return jsonify({'error': 'Erro interno'}), 500
+
+@api.route('/painel', methods=['GET'])
+def painel_setor():
+    """Painéis de vários pacientes: ?ids=1,2,3 ou ?local_internacao= (só internados)."""
+    log_requisicao('GET', '/painel', dict(request.args) or None)
+
+    try:
+        n_prescricoes, desde = parametros_painel()
+        query = db.select(Paciente).options(*opcoes_painel(desde)).order_by(Paciente.id)
+
+        ids = request.args.get('ids')
+        if ids:
+            try:
+                query = query.where(Paciente.id.in_([int(i) for i in ids.split(',') if i.strip()]))
+            except ValueError:
+                return jsonify({'error': 'ids deve ser uma lista de inteiros separados por vírgula'}), 400
+        else:
+            query = query.where(~exists().where(Alta.paciente_id == Paciente.id))
+            local_internacao = request.args.get('local_internacao')
+            if local_internacao:
+                query = query.where(Paciente.local_internacao == local_internacao)
+
+        pacientes = db.session.scalars(query.limit(LIMITE_PACIENTES_PAINEL)).all()
+        log_sucesso(f"🩺 Painel do setor montado ({len(pacientes)} pacientes)")
+        return jsonify([montar_painel(p, n_prescricoes) for p in pacientes])
+
+    except Exception as e:
+        log_erro(f"Erro ao montar painel do setor: {str(e)}")
+        return jsonify({'error': 'Erro interno'}), 500
 
 # ===============================
 # ROTAS DE PROTOCOLO
 # ===============================
 
-@app.route('/protocolos', methods=['POST'])
+@api.route('/protocolos', methods=['POST'])
 def criar_protocolo():
     data = request.json
-    print_request('POST', '/protocolos', {'paciente_id': data.get('paciente_id')})
+    log_requisicao('POST', '/protocolos', {'paciente_id': data.get('paciente_id')})
     
     try:
         novo = Protocolo(
@@ -289,9 +567,12 @@ def criar_protocolo():
         
         db.session.add(novo)
         db.session.commit()
+        cache.delete(f'protocolo:{novo.paciente_id}')
+        versoes.incrementar(f'protocolos:{novo.paciente_id}')
+        motor_alertas.definir_dieta(novo.paciente_id, novo.dieta, novo.data_protocolo)
         
-        print_success(f"💊 Protocolo criado: ID={novo.id}, Paciente={novo.paciente_id}")
-        print_database(f"Configurações: Dieta={novo.dieta}, Basal={novo.basal_tipo}, Sensibilidade={novo.sensibilidade}")
+        log_sucesso(f"💊 Protocolo criado: ID={novo.id}, Paciente={novo.paciente_id}")
+        log_banco(f"Configurações: Dieta={novo.dieta}, Basal={novo.basal_tipo}, Sensibilidade={novo.sensibilidade}")
         
         return jsonify({
             'message': 'Protocolo salvo com sucesso', 
@@ -299,65 +580,78 @@ def criar_protocolo():
         })
         
     except Exception as e:
-        print_error(f"Erro ao criar protocolo: {str(e)}")
+        log_erro(f"Erro ao criar protocolo: {str(e)}")
         db.session.rollback()
         return jsonify({'error': 'Erro ao salvar protocolo'}), 500
 
-@app.route('/protocolos/<int:paciente_id>', methods=['GET'])
+def ultimo_protocolo(modelo, paciente_id):
+    return db.session.scalars(
+        db.select(modelo).where(modelo.paciente_id == paciente_id)
+        .order_by(modelo.data_protocolo.desc(), modelo.id.desc()).limit(1)
+    ).first()
+
+@api.route('/protocolos/<int:paciente_id>', methods=['GET'])
+@condicional(lambda paciente_id: [f'protocolos:{paciente_id}'])
 def buscar_protocolo_paciente(paciente_id):
-    print_request('GET', f'/protocolos/{paciente_id}')
+    log_requisicao('GET', f'/protocolos/{paciente_id}')
     
     try:
-        protocolo = Protocolo.query.filter_by(paciente_id=paciente_id).first()
-        if not protocolo:
-            print_warning(f"Protocolo não encontrado para paciente {paciente_id}")
-            return jsonify({'error': 'Protocolo não encontrado'}), 404
+        resultado = cache.get(f'protocolo:{paciente_id}')
+        if resultado is None:
+            # Protocolo vigente = o mais recente do paciente
+            protocolo = ultimo_protocolo(Protocolo, paciente_id) or ultimo_protocolo(ProtocoloArquivo, paciente_id)
+            if not protocolo:
+                log_aviso(f"Protocolo não encontrado para paciente {paciente_id}")
+                return jsonify({'error': 'Protocolo não encontrado'}), 404
+            resultado = serializar_protocolo(protocolo)
+            guardar_no_cache(f'protocolo:{paciente_id}', resultado)
         
-        print_success(f"Protocolo encontrado para paciente {paciente_id}")
+        log_sucesso(f"Protocolo encontrado para paciente {paciente_id}")
         
-        return jsonify({
-            'id': protocolo.id,
-            'dieta': protocolo.dieta,
-            'corticoide': protocolo.corticoide,
-            'hepato': protocolo.hepato,
-            'sensibilidade': protocolo.sensibilidade,
-            'glicemia_atual': protocolo.glicemia_atual,
-            'escala_dispositivo': protocolo.escala_dispositivo,
-            'basal_tipo': protocolo.basal_tipo,
-            'nph_posologia': protocolo.nph_posologia,
-            'rapida_tipo': protocolo.rapida_tipo,
-            'bolus_threshold': protocolo.bolus_threshold,
-            'data_protocolo': protocolo.data_protocolo.isoformat()
-        })
+        return jsonify(resultado)
         
     except Exception as e:
-        print_error(f"Erro ao buscar protocolo: {str(e)}")
+        log_erro(f"Erro ao buscar protocolo: {str(e)}")
         return jsonify({'error': 'Erro interno'}), 500
 
 # ===============================
 # ROTAS DE PRESCRIÇÃO
 # ===============================
 
-@app.route('/prescricoes', methods=['POST'])
+@api.route('/prescricoes', methods=['POST'])
 def criar_prescricao():
     data = request.json
-    print_request('POST', '/prescricoes', {'paciente_id': data.get('paciente_id')})
+    log_requisicao('POST', '/prescricoes', {'paciente_id': data.get('paciente_id')})
     
     try:
+        dose_total, basal, prandial = data.get('dose_total'), data.get('basal'), data.get('prandial')
+        if dose_total is None:
+            # 🧮 Sem doses informadas: o servidor calcula a partir do cadastro
+            pacientes = carregar_dados_dose(Paciente.id == data['paciente_id'])
+            if not pacientes:
+                return jsonify({'error': 'Paciente não encontrado'}), 404
+            sugestao = calcular_prescricoes(pacientes, detalhada=False)[0]
+            dose_total, basal, prandial = sugestao['tdd'], sugestao['basal'], sugestao['bolus_refeicao']
+            log_info(f"Doses calculadas pelo servidor para paciente {data['paciente_id']}")
+
         nova = Prescricao(
             paciente_id=data['paciente_id'],
             protocolo_id=data.get('protocolo_id'),
-            dose_total=data.get('dose_total'),
-            basal=data.get('basal'),
-            prandial=data.get('prandial'),
+            dose_total=dose_total,
+            basal=basal,
+            prandial=prandial,
             observacoes=data.get('observacoes')
         )
         
         db.session.add(nova)
+        db.session.flush()
+        atualizar_resumo_prescricoes([(nova.paciente_id, nova.dose_total, nova.data_prescricao)])
         db.session.commit()
+        versoes.incrementar(f'prescricoes:{nova.paciente_id}', 'paciente_resumo')
+        notificar('prescricao', [nova])
         
-        print_success(f"📋 Prescrição criada: ID={nova.id}, TDD={nova.dose_total}U")
-        print_database(f"Doses: Basal={nova.basal}U, Prandial={nova.prandial}U")
+        log_sucesso(f"📋 Prescrição criada: ID={nova.id}, TDD={nova.dose_total}U")
+        log_banco(f"Doses: Basal={nova.basal}U, Prandial={nova.prandial}U")
         
         return jsonify({
             'message': 'Prescrição salva', 
@@ -365,42 +659,190 @@ def criar_prescricao():
         })
         
     except Exception as e:
-        print_error(f"Erro ao criar prescrição: {str(e)}")
+        log_erro(f"Erro ao criar prescrição: {str(e)}")
         db.session.rollback()
         return jsonify({'error': 'Erro ao salvar prescrição'}), 500
 
-@app.route('/prescricoes/<int:paciente_id>', methods=['GET'])
+# Campos do cadastro usados pelo motor de doses (doses.py)
+CAMPOS_DOSE = ('peso', 'idade', 'cenario', 'egfr', 'creatinina', 'sexo')
+
+def carregar_dados_dose(*condicoes):
+    """Busca, numa consulta colunar, os dados de dose dos pacientes que atendem às condições."""
+    colunas = [Paciente.id, Paciente.nome] + [getattr(Paciente, c) for c in CAMPOS_DOSE]
+    linhas = db.session.execute(db.select(*colunas).where(*condicoes).order_by(Paciente.id)).all()
+    return [dict(linha._mapping) for linha in linhas]
+
+@api.route('/prescricoes/calcular', methods=['POST'])
+@sem_escrita
+def calcular_prescricao():
+    data = request.get_json(silent=True) or {}
+    log_requisicao('POST', '/prescricoes/calcular', {'paciente_id': data.get('paciente_id')})
+
+    try:
+        paciente = {}
+        if data.get('paciente_id') is not None:
+            encontrados = carregar_dados_dose(Paciente.id == data['paciente_id'])
+            if not encontrados:
+                log_aviso(f"Paciente {data['paciente_id']} não encontrado para cálculo")
+                return jsonify({'error': 'Paciente não encontrado'}), 404
+            paciente = encontrados[0]
+
+        # Valores enviados no corpo substituem os do cadastro (simulação)
+        paciente.update({c: data[c] for c in CAMPOS_DOSE if c in data})
+        if 'creatinina' in data and 'egfr' not in data:
+            paciente['egfr'] = None
+
+        sugestao = calcular_prescricoes([paciente])[0]
+        log_sucesso(f"🧮 Dose calculada: TDD={sugestao['tdd']}U, Basal={sugestao['basal']}U")
+        return jsonify({'paciente_id': paciente.get('id'), **sugestao})
+
+    except (TypeError, ValueError) as e:
+        log_aviso(f"Dados inválidos para cálculo de dose: {str(e)}")
+        return jsonify({'error': 'Dados inválidos para cálculo de dose'}), 400
+    except Exception as e:
+        log_erro(f"Erro ao calcular prescrição: {str(e)}")
+        return jsonify({'error': 'Erro interno'}), 500
+
+@api.route('/prescricoes/calcular/lote', methods=['POST'])
+def calcular_prescricoes_lote():
+    data = request.get_json(silent=True) or {}
+    local_internacao = data.get('local_internacao')
+    atualizacoes = data.get('atualizacoes') or []
+    salvar = bool(data.get('salvar'))
+    log_requisicao('POST', '/prescricoes/calcular/lote', {
+        'local_internacao': local_internacao, 'atualizacoes': len(atualizacoes), 'salvar': salvar
+    })
+
+    if not isinstance(atualizacoes, list):
+        return jsonify({'error': 'atualizacoes deve ser uma lista'}), 400
+
+    try:
+        # 🏥 Censo: pacientes sem alta (do setor, se informado)
+        condicoes = [~exists().where(Alta.paciente_id == Paciente.id)]
+        if local_internacao:
+            condicoes.append(Paciente.local_internacao == local_internacao)
+        pacientes = carregar_dados_dose(*condicoes)
+        por_id = {p['id']: p for p in pacientes}
+
+        # ✏️ Aplica as alterações de peso/creatinina/TFG em memória
+        alterados, erros = {}, []
+        for indice, item in enumerate(atualizacoes):
+            paciente = por_id.get(item.get('paciente_id')) if isinstance(item, dict) else None
+            if paciente is None:
+                erros.append({'indice': indice, 'error': 'Paciente não encontrado no censo'})
+                continue
+            campos = {c: item[c] for c in ('peso', 'creatinina', 'egfr', 'idade') if c in item}
+            if any(v is not None and (not isinstance(v, (int, float)) or isinstance(v, bool)) for v in campos.values()):
+                erros.append({'indice': indice, 'error': 'peso/creatinina/egfr/idade devem ser numéricos'})
+                continue
+            paciente.update(campos)
+            alterados[paciente['id']] = set(campos)
+
+        # TFG recalculada (CKD-EPI 2021) onde só a creatinina mudou
+        recalcular = [pid for pid, campos in alterados.items() if 'creatinina' in campos and 'egfr' not in campos]
+        if recalcular:
+            grupo = [por_id[pid] for pid in recalcular]
+            egfrs = ckd_epi_2021([p['creatinina'] or 0 for p in grupo],
+                                 [p['idade'] or 0 for p in grupo],
+                                 [p['sexo'] or 'M' for p in grupo])
+            for p, egfr in zip(grupo, egfrs.tolist()):
+                p['egfr'] = round(egfr, 1) if egfr > 0 else None
+                alterados[p['id']].add('egfr')
+
+        # Um único UPDATE em lote (executemany) para todas as alterações
+        if alterados:
+            db.session.execute(update(Paciente), [
+                {'id': pid, **{c: por_id[pid][c] for c in campos}} for pid, campos in alterados.items()
+            ])
+
+        sugestoes = calcular_prescricoes(pacientes, detalhada=False)
+
+        if salvar and sugestoes:
+            agora = datetime.utcnow()
+            linhas = [{
+                'paciente_id': p['id'],
+                'dose_total': s['tdd'],
+                'basal': s['basal'],
+                'prandial': s['bolus_refeicao'],
+                'observacoes': 'Recalculada em lote pelo servidor',
+                'data_prescricao': agora
+            } for p, s in zip(pacientes, sugestoes)]
+            inserir_com_ids(db.session, Prescricao, linhas, TAMANHO_CHUNK_INSERCAO)
+            atualizar_resumo_prescricoes([(l['paciente_id'], l['dose_total'], l['data_prescricao']) for l in linhas])
+
+        db.session.commit()
+        cache.delete(*[f'paciente:{pid}' for pid in alterados])
+        alteradas = ['pacientes'] if alterados else []
+        if salvar and sugestoes:
+            alteradas += [f"prescricoes:{p['id']}" for p in pacientes] + ['paciente_resumo']
+        if alteradas:
+            versoes.incrementar(*alteradas)
+        if salvar and sugestoes:
+            notificar('prescricao', linhas)
+
+        log_sucesso(f"🧮 Doses recalculadas para {len(pacientes)} pacientes ({len(alterados)} cadastros atualizados)")
+        return jsonify({
+            'local_internacao': local_internacao,
+            'pacientes': len(pacientes),
+            'atualizados': len(alterados),
+            'prescricoes_salvas': len(sugestoes) if salvar else 0,
+            'sugestoes': [{'paciente_id': p['id'], 'nome': p['nome'], **s} for p, s in zip(pacientes, sugestoes)],
+            'erros': erros
+        })
+
+    except Exception as e:
+        log_erro(f"Erro ao recalcular doses em lote: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Erro ao recalcular doses'}), 500
+
+@api.route('/prescricoes/<int:paciente_id>', methods=['GET'])
+@condicional(lambda paciente_id: [f'prescricoes:{paciente_id}'])
 def listar_prescricoes(paciente_id):
-    print_request('GET', f'/prescricoes/{paciente_id}')
+    log_requisicao('GET', f'/prescricoes/{paciente_id}', dict(request.args) or None)
     
     try:
-        prescricoes = Prescricao.query.filter_by(paciente_id=paciente_id).all()
-        print_database(f"Encontradas {len(prescricoes)} prescrições para paciente {paciente_id}")
+        try:
+            prescricoes = consultar_historico(Prescricao, paciente_id, Prescricao.data_prescricao)
+        except ValueError as e:
+            log_aviso(f"Parâmetros inválidos: {e}")
+            return jsonify({'error': str(e)}), 400
+
+        log_banco(f"Encontradas {len(prescricoes)} prescrições para paciente {paciente_id}")
         
-        result = [{
-            'id': p.id,
-            'dose_total': p.dose_total,
-            'basal': p.basal,
-            'prandial': p.prandial,
-            'observacoes': p.observacoes,
-            'data': p.data_prescricao.isoformat()
-        } for p in prescricoes]
+        result = [serializar_prescricao(p) for p in prescricoes]
         
-        print_success(f"Lista de prescrições retornada")
-        return jsonify(result)
+        log_sucesso(f"Lista de prescrições retornada")
+        return responder_lista(result)
         
+    except FormatoInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        print_error(f"Erro ao listar prescrições: {str(e)}")
+        log_erro(f"Erro ao listar prescrições: {str(e)}")
         return jsonify({'error': 'Erro interno'}), 500
 
 # ===============================
 # ROTAS DE ACOMPANHAMENTO
 # ===============================
 
-@app.route('/acompanhamentos', methods=['POST'])
+def avaliar_alertas(leituras):
+    """Passa leituras já commitadas pelo motor de alertas, grava e publica os novos.
+
+    Roda depois do commit: uma falha aqui não desfaz a leitura, só fica no log."""
+    try:
+        novos = motor_alertas.processar(leituras)
+        if novos:
+            gravar_alertas(novos)
+            notificar('alerta', novos)
+            log_aviso(f"🚨 {len(novos)} alertas: " + ', '.join(f"{a['regra']} (paciente {a['paciente_id']})" for a in novos))
+        return novos
+    except Exception as e:
+        log_erro(f"Erro ao avaliar alertas: {str(e)}")
+        return []
+
+@api.route('/acompanhamentos', methods=['POST'])
 def registrar_acompanhamento():
     data = request.json
-    print_request('POST', '/acompanhamentos', {'glicemia': data.get('glicemia')})
+    log_requisicao('POST', '/acompanhamentos', {'glicemia': data.get('glicemia')})
     
     try:
         novo = Acompanhamento(
@@ -410,49 +852,149 @@ def registrar_acompanhamento():
         )
         
         db.session.add(novo)
+        db.session.flush()
+        atualizar_resumo_leituras([(novo.paciente_id, novo.glicemia, novo.data_registro)])
         db.session.commit()
+        versoes.incrementar(f'acompanhamentos:{novo.paciente_id}', 'paciente_resumo')
+        notificar('acompanhamento', [novo])
+        avaliar_alertas([(novo.paciente_id, novo.glicemia, novo.data_registro)])
         
         glicemia = data.get('glicemia', 0)
         status = "Normal" if 70 <= glicemia <= 180 else ("Hipo" if glicemia < 70 else "Hiper")
         
-        print_success(f"📊 Acompanhamento registrado: Glicemia={glicemia}mg/dL ({status})")
+        log_sucesso(f"📊 Acompanhamento registrado: Glicemia={glicemia}mg/dL ({status})")
         
         return jsonify({'message': 'Acompanhamento registrado'})
         
     except Exception as e:
-        print_error(f"Erro ao registrar acompanhamento: {str(e)}")
+        log_erro(f"Erro ao registrar acompanhamento: {str(e)}")
         db.session.rollback()
         return jsonify({'error': 'Erro ao salvar acompanhamento'}), 500
 
-@app.route('/acompanhamentos/<int:paciente_id>', methods=['GET'])
+# Limites da ingestão em lote
+LOTE_MAXIMO_ACOMPANHAMENTOS = 10000
+
+def validar_leitura(leitura):
+    """Valida uma leitura do lote e devolve (linha para INSERT, None) ou (None, erro)."""
+    if not isinstance(leitura, dict):
+        return None, 'Leitura deve ser um objeto'
+
+    paciente_id = leitura.get('paciente_id')
+    if not isinstance(paciente_id, int) or isinstance(paciente_id, bool):
+        return None, 'paciente_id é obrigatório e deve ser inteiro'
+
+    glicemia = leitura.get('glicemia')
+    if not isinstance(glicemia, (int, float)) or isinstance(glicemia, bool) or glicemia <= 0:
+        return None, 'glicemia é obrigatória e deve ser um número positivo'
+
+    data_registro = leitura.get('data_registro')
+    if data_registro is None:
+        data_registro = datetime.utcnow()
+    else:
+        try:
+            data_registro = converter_data(data_registro)
+        except (TypeError, ValueError):
+            return None, 'data_registro deve estar no formato ISO 8601'
+
+    return {
+        'paciente_id': paciente_id,
+        'glicemia': float(glicemia),
+        'observacao': leitura.get('observacao'),
+        'data_registro': data_registro
+    }, None
+
+@api.route('/acompanhamentos/batch', methods=['POST'])
+def registrar_acompanhamentos_lote():
+    data = request.get_json(silent=True)
+    leituras = data.get('acompanhamentos') if isinstance(data, dict) else data
+    log_requisicao('POST', '/acompanhamentos/batch', {'leituras': len(leituras) if isinstance(leituras, list) else None})
+
+    if not isinstance(leituras, list):
+        log_aviso("Lote de acompanhamentos inválido")
+        return jsonify({'error': 'Envie uma lista de acompanhamentos'}), 400
+    if len(leituras) > LOTE_MAXIMO_ACOMPANHAMENTOS:
+        log_aviso(f"Lote com {len(leituras)} leituras excede o limite")
+        return jsonify({'error': f'Máximo de {LOTE_MAXIMO_ACOMPANHAMENTOS} leituras por lote'}), 413
+
+    try:
+        linhas, indices, erros = [], [], []
+        for indice, leitura in enumerate(leituras):
+            linha, erro = validar_leitura(leitura)
+            if erro:
+                erros.append({'indice': indice, 'error': erro})
+            else:
+                linhas.append(linha)
+                indices.append(indice)
+
+        # 🔎 Uma única consulta para verificar todos os pacientes do lote
+        ids = {linha['paciente_id'] for linha in linhas}
+        existentes = set(db.session.scalars(db.select(Paciente.id).where(Paciente.id.in_(ids)))) if ids else set()
+
+        validas = []
+        for indice, linha in zip(indices, linhas):
+            if linha['paciente_id'] in existentes:
+                validas.append(linha)
+            else:
+                erros.append({'indice': indice, 'error': f"Paciente {linha['paciente_id']} não encontrado"})
+        erros.sort(key=lambda e: e['indice'])
+
+        # 💾 INSERT em lote por chunk, tudo numa única transação; os ids voltam para o feed
+        inserir_com_ids(db.session, Acompanhamento, validas, TAMANHO_CHUNK_INSERCAO)
+        atualizar_resumo_leituras([(l['paciente_id'], l['glicemia'], l['data_registro']) for l in validas])
+        db.session.commit()
+        if validas:
+            versoes.incrementar(*{f"acompanhamentos:{l['paciente_id']}" for l in validas}, 'paciente_resumo')
+        notificar('acompanhamento', validas)
+        avaliar_alertas([(l['paciente_id'], l['glicemia'], l['data_registro']) for l in validas])
+
+        log_sucesso(f"📊 Lote registrado: {len(validas)} leituras de {len(ids & existentes)} pacientes")
+        if erros:
+            log_aviso(f"{len(erros)} leituras rejeitadas no lote")
+
+        return jsonify({
+            'message': 'Lote de acompanhamentos processado',
+            'inseridos': len(validas),
+            'rejeitados': len(erros),
+            'erros': erros
+        })
+
+    except Exception as e:
+        log_erro(f"Erro ao registrar lote de acompanhamentos: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Erro ao salvar lote de acompanhamentos'}), 500
+
+@api.route('/acompanhamentos/<int:paciente_id>', methods=['GET'])
+@condicional(lambda paciente_id: [f'acompanhamentos:{paciente_id}'])
 def listar_acompanhamentos(paciente_id):
-    print_request('GET', f'/acompanhamentos/{paciente_id}')
+    log_requisicao('GET', f'/acompanhamentos/{paciente_id}', dict(request.args) or None)
     
     try:
-        registros = Acompanhamento.query.filter_by(paciente_id=paciente_id).all()
-        print_database(f"Encontrados {len(registros)} acompanhamentos para paciente {paciente_id}")
+        try:
+            registros = consultar_historico(Acompanhamento, paciente_id, Acompanhamento.data_registro)
+        except ValueError as e:
+            log_aviso(f"Parâmetros inválidos: {e}")
+            return jsonify({'error': str(e)}), 400
+
+        log_banco(f"Encontrados {len(registros)} acompanhamentos para paciente {paciente_id}")
         
-        result = [{
-            'id': r.id,
-            'glicemia': r.glicemia,
-            'observacao': r.observacao,
-            'data': r.data_registro.isoformat()
-        } for r in registros]
+        result = [serializar_acompanhamento(r) for r in registros]
         
-        return jsonify(result)
+        return responder_lista(result)
         
+    except FormatoInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        print_error(f"Erro ao listar acompanhamentos: {str(e)}")
+        log_erro(f"Erro ao listar acompanhamentos: {str(e)}")
         return jsonify({'error': 'Erro interno'}), 500
 
 # ===============================
 # ROTAS DE ALTA
 # ===============================
 
-@app.route('/altas', methods=['POST'])
+@api.route('/altas', methods=['POST'])
 def registrar_alta():
     data = request.json
-    print_request('POST', '/altas')
+    log_requisicao('POST', '/altas')
     
     try:
         nova = Alta(
@@ -462,37 +1004,43 @@ def registrar_alta():
         
         db.session.add(nova)
         db.session.commit()
+        versoes.incrementar('altas')
+        notificar('alta', [nova])
+        motor_alertas.remover_paciente(nova.paciente_id)
         
-        print_success(f"🏠 Alta registrada para paciente {nova.paciente_id}")
+        log_sucesso(f"🏠 Alta registrada para paciente {nova.paciente_id}")
         
         return jsonify({'message': 'Alta registrada'})
         
     except Exception as e:
-        print_error(f"Erro ao registrar alta: {str(e)}")
+        log_erro(f"Erro ao registrar alta: {str(e)}")
         db.session.rollback()
         return jsonify({'error': 'Erro ao salvar alta'}), 500
 
-@app.route('/altas/<int:paciente_id>', methods=['GET'])
+@api.route('/altas/<int:paciente_id>', methods=['GET'])
 def listar_altas(paciente_id):
-    print_request('GET', f'/altas/{paciente_id}')
+    log_requisicao('GET', f'/altas/{paciente_id}', dict(request.args) or None)
     
     try:
-        altas = Alta.query.filter_by(paciente_id=paciente_id).all()
+        try:
+            query = filtrar_periodo(db.select(Alta).where(Alta.paciente_id == paciente_id), Alta.data_alta)
+        except ValueError as e:
+            log_aviso(f"Parâmetros inválidos: {e}")
+            return jsonify({'error': str(e)}), 400
+
+        altas = db.session.scalars(query).all()
         
-        result = [{
-            'id': a.id,
-            'resumo': a.resumo,
-            'data': a.data_alta.isoformat()
-        } for a in altas]
+        result = [serializar_alta(a) for a in altas]
         
         return jsonify(result)
         
     except Exception as e:
-        print_error(f"Erro ao listar altas: {str(e)}")
+        log_erro(f"Erro ao listar altas: {str(e)}")
         return jsonify({'error': 'Erro interno'}), 500
 
 # 🔹 ROTA CORRETA: listar TODAS as altas do banco
-@app.route('/altas', methods=['GET'])
+@api.route('/altas', methods=['GET'])
+@condicional(lambda: ['altas', 'pacientes'])  # a lista traz o nome do paciente
 def listar_todas_altas():
     try:
         altas = db.session.query(Alta, Paciente.nome).join(Paciente, Alta.paciente_id == Paciente.id).all()
@@ -503,45 +1051,711 @@ def listar_todas_altas():
             'data_alta': alta.Alta.data_alta.isoformat() if alta.Alta.data_alta else None
         } for alta in altas]
 
-        return jsonify(resultado)
+        return responder_lista(resultado, ('id', 'nome_paciente', 'resumo', 'data_alta'))
+    except FormatoInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        print("Erro ao listar todas as altas:", str(e))
-        print(traceback.format_exc())
+        log_erro(f"Erro ao listar todas as altas: {str(e)}")
         return jsonify({'error': 'Erro ao buscar altas'}), 500
 
 
 
+# ===============================
+# ROTAS DE ALERTAS
+# ===============================
+
+LIMITE_PADRAO_ALERTAS = 100
+LIMITE_MAXIMO_ALERTAS = 1000
+
+@api.route('/alertas', methods=['GET'])
+def listar_alertas():
+    """Alertas gravados pelo motor (alertas.py), em ordem de id.
+
+    Filtros: paciente_id, local_internacao, regra, severidade e since (ISO 8601,
+    pela data de criação). Paginação por cursor: ?after_id=&limit=."""
+    log_requisicao('GET', '/alertas', dict(request.args) or None)
+
+    try:
+        limit = max(1, min(request.args.get('limit', LIMITE_PADRAO_ALERTAS, type=int), LIMITE_MAXIMO_ALERTAS))
+        query = (db.select(Alerta, Paciente.nome, Paciente.local_internacao)
+                 .join(Paciente, Alerta.paciente_id == Paciente.id)
+                 .order_by(Alerta.id).limit(limit))
+
+        after_id = request.args.get('after_id', type=int)
+        if after_id is not None:
+            query = query.where(Alerta.id > after_id)
+        paciente_id = request.args.get('paciente_id', type=int)
+        if paciente_id is not None:
+            query = query.where(Alerta.paciente_id == paciente_id)
+        for campo, coluna in (('local_internacao', Paciente.local_internacao),
+                              ('regra', Alerta.regra), ('severidade', Alerta.severidade)):
+            if request.args.get(campo):
+                query = query.where(coluna == request.args[campo])
+        since = request.args.get('since')
+        if since:
+            try:
+                query = query.where(Alerta.criado_em >= converter_data(since))
+            except (TypeError, ValueError):
+                return jsonify({'error': 'since deve estar no formato ISO 8601'}), 400
+
+        result = [{**serializar_alerta(alerta), 'nome_paciente': nome, 'local_internacao': local}
+                  for alerta, nome, local in db.session.execute(query)]
+
+        response = responder_lista(result)
+        if len(result) == limit:
+            response.headers['X-Next-After-Id'] = str(result[-1]['id'])
+        return response
+
+    except FormatoInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        log_erro(f"Erro ao listar alertas: {str(e)}")
+        return jsonify({'error': 'Erro ao buscar alertas'}), 500
+
+# ===============================
+# RELATÓRIOS (segundo plano)
+# ===============================
+
+@api.route('/relatorios', methods=['POST'])
+@sem_escrita
+def criar_relatorio():
+    """Enfileira um relatório e devolve 202 com o id da tarefa.
+
+    {'tipo': 'setor', 'local_internacao': ..., 'since'?, 'until'?} ou
+    {'tipo': 'alta', 'paciente_ids': [...], 'since'?, 'until'?}. 'forcar': true
+    ignora um relatório igual ainda no cache."""
+    data = request.get_json(silent=True) or {}
+    tipo = data.get('tipo')
+    log_requisicao('POST', '/relatorios', {'tipo': tipo})
+
+    if tipo not in TIPOS_RELATORIO:
+        return jsonify({'error': f"tipo deve ser um de: {', '.join(TIPOS_RELATORIO)}"}), 400
+
+    parametros = {}
+    try:
+        for campo in ('since', 'until'):
+            if data.get(campo):
+                parametros[campo] = converter_data(data[campo]).isoformat()
+    except (TypeError, ValueError):
+        return jsonify({'error': 'since/until devem estar no formato ISO 8601'}), 400
+
+    if tipo == 'setor':
+        if not data.get('local_internacao'):
+            return jsonify({'error': 'local_internacao é obrigatório no relatório de setor'}), 400
+        parametros['local_internacao'] = data['local_internacao']
+        if 'since' not in parametros:
+            parametros['horas'] = current_app.config['RELATORIOS_JANELA_SETOR_HORAS']
+    else:
+        ids = data.get('paciente_ids')
+        if ids is None and data.get('paciente_id') is not None:
+            ids = [data['paciente_id']]
+        if (not isinstance(ids, list) or not ids
+                or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids)):
+            return jsonify({'error': 'paciente_ids deve ser uma lista de inteiros'}), 400
+        if len(ids) > current_app.config['RELATORIOS_MAXIMO_PACIENTES']:
+            return jsonify({'error': f"Máximo de {current_app.config['RELATORIOS_MAXIMO_PACIENTES']} pacientes"}), 413
+        parametros['paciente_ids'] = sorted(set(ids))
+
+    try:
+        tarefa, reaproveitada = executor_relatorios.submeter(tipo, parametros, forcar=bool(data.get('forcar')))
+    except FilaCheia:
+        log_aviso("Fila de relatórios cheia")
+        response = jsonify({'error': 'Muitos relatórios em andamento, tente novamente em instantes'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+
+    log_sucesso(f"📑 Relatório {tipo} {'reaproveitado' if reaproveitada else 'enfileirado'}: {tarefa.id}")
+    response = jsonify({**tarefa.resumo(), 'reaproveitado': reaproveitada,
+                        'status_url': f'/relatorios/{tarefa.id}'})
+    response.headers['Location'] = f'/relatorios/{tarefa.id}'
+    return response, 202
+
+@api.route('/relatorios/<tarefa_id>', methods=['GET'])
+def consultar_relatorio(tarefa_id):
+    """Estado da tarefa; com ?download=1, o relatório pronto (JSON)."""
+    tarefa = executor_relatorios.obter(tarefa_id)
+    if tarefa is None:
+        return jsonify({'error': 'Relatório não encontrado (ou já descartado)'}), 404
+
+    if request.args.get('download'):
+        if tarefa.estado != 'concluido':
+            return jsonify({**tarefa.resumo(), 'error': 'Relatório ainda não está pronto'}), 409
+        response = Response(tarefa.resultado, mimetype='application/json')
+        response.headers['Content-Disposition'] = f'attachment; filename=relatorio-{tarefa.tipo}-{tarefa.id}.json'
+        return response
+
+    resumo = tarefa.resumo()
+    if tarefa.estado == 'concluido':
+        resumo['download_url'] = f'/relatorios/{tarefa.id}?download=1'
+    return jsonify(resumo)
+
+# ===============================
+# ROTAS DE ANÁLISE GLICÊMICA
+# ===============================
+
+JANELA_PADRAO_DIAS = 14
+
+def periodo_analise():
+    """Janela de análise: ?since=&until= (ISO 8601) ou os últimos ?dias= (padrão 14)."""
+    until = request.args.get('until')
+    fim = converter_data(until) if until else datetime.utcnow()
+    since = request.args.get('since')
+    if since:
+        return converter_data(since), fim
+    dias = request.args.get('dias', JANELA_PADRAO_DIAS, type=int)
+    return fim - timedelta(days=max(1, dias)), fim
+
+def leituras_periodo(paciente_id, inicio, fim):
+    """(data_registro, glicemia) do paciente no período, em ordem, somando o arquivo."""
+    consultas = [
+        db.select(m.data_registro, m.glicemia)
+        .where(m.paciente_id == paciente_id, m.data_registro >= inicio, m.data_registro <= fim)
+        for m in (Acompanhamento, AcompanhamentoArquivo)
+    ]
+    uniao = union_all(*consultas).subquery()
+    return db.session.execute(db.select(uniao).order_by(uniao.c.data_registro)).all()
+
+@api.route('/pacientes/<int:paciente_id>/glicemia/resumo', methods=['GET'])
+def resumo_glicemia_paciente(paciente_id):
+    log_requisicao('GET', f'/pacientes/{paciente_id}/glicemia/resumo', dict(request.args) or None)
+
+    try:
+        inicio, fim = periodo_analise()
+    except ValueError:
+        return jsonify({'error': 'since/until devem estar no formato ISO 8601'}), 400
+
+    try:
+        if db.session.get(Paciente, paciente_id) is None:
+            return jsonify({'error': 'Paciente não encontrado'}), 404
+
+        # Uma consulta colunar, servida pelos índices (paciente_id, data_registro)
+        linhas = leituras_periodo(paciente_id, inicio, fim)
+        log_banco(f"{len(linhas)} leituras analisadas para paciente {paciente_id}")
+
+        resumo = resumo_vazio()
+        if linhas:
+            glicemias = [glicemia for _, glicemia in linhas]
+            resumo = resumir_por_paciente([paciente_id] * len(glicemias), glicemias)[paciente_id]
+
+        return jsonify({
+            'paciente_id': paciente_id,
+            'inicio': inicio.isoformat(),
+            'fim': fim.isoformat(),
+            **resumo
+        })
+
+    except Exception as e:
+        log_erro(f"Erro ao resumir glicemias do paciente {paciente_id}: {str(e)}")
+        return jsonify({'error': 'Erro interno'}), 500
+
+# Tamanho da série enviada ao gráfico
+PONTOS_PADRAO_SERIE = 300
+PONTOS_MAXIMOS_SERIE = 2000
+UNIDADES_DURACAO = {'m': 60, 'h': 3600, 'd': 86400}
+
+def converter_duracao(valor):
+    """Converte '15m', '1h' ou '1d' em segundos. Levanta ValueError se inválida."""
+    encontrado = re.fullmatch(r'(\d+)([mhd])', valor or '')
+    if not encontrado or int(encontrado.group(1)) == 0:
+        raise ValueError(valor)
+    return int(encontrado.group(1)) * UNIDADES_DURACAO[encontrado.group(2)]
+
+@api.route('/pacientes/<int:paciente_id>/glicemia/serie', methods=['GET'])
+def serie_glicemia_paciente(paciente_id):
+    """Série para gráfico com no máximo ?points= pontos.
+
+    Com ?bucket=15m|1h|1d devolve mínima/média/máxima por janela (a janela é
+    alargada se o período geraria mais de `points` janelas); sem bucket, as
+    ?points= (padrão 300) leituras escolhidas por LTTB, que preservam picos e
+    hipoglicemias."""
+    log_requisicao('GET', f'/pacientes/{paciente_id}/glicemia/serie', dict(request.args) or None)
+
+    try:
+        inicio, fim = periodo_analise()
+    except ValueError:
+        return jsonify({'error': 'since/until devem estar no formato ISO 8601'}), 400
+
+    # Com bucket e sem points, o limite é o teto da rota (ex.: 1h em 60 dias = 1440 janelas)
+    padrao = PONTOS_MAXIMOS_SERIE if request.args.get('bucket') else PONTOS_PADRAO_SERIE
+    pontos = request.args.get('points', padrao, type=int)
+    if not 3 <= pontos <= PONTOS_MAXIMOS_SERIE:
+        return jsonify({'error': f'points deve estar entre 3 e {PONTOS_MAXIMOS_SERIE}'}), 400
+    largura = None
+    if request.args.get('bucket'):
+        try:
+            largura = converter_duracao(request.args['bucket'])
+        except ValueError:
+            return jsonify({'error': "bucket deve ser uma duração como '15m', '1h' ou '1d'"}), 400
+        # Janelas demais para o período: usa o menor múltiplo do bucket que cabe em `points`
+        janelas = -(-(fim - inicio).total_seconds() // largura)
+        largura *= max(1, int(-(-janelas // pontos)))
+
+    try:
+        if db.session.get(Paciente, paciente_id) is None:
+            return jsonify({'error': 'Paciente não encontrado'}), 404
+
+        # Só as duas colunas necessárias, pelos índices (paciente_id, data_registro)
+        linhas = leituras_periodo(paciente_id, inicio, fim)
+
+        serie = []
+        if linhas:
+            datas, glicemias = zip(*linhas)
+            segundos = (np.array(datas, dtype='datetime64[us]') - np.datetime64(inicio, 'us')) / np.timedelta64(1, 's')
+            if largura:
+                serie = [{
+                    'inicio': (inicio + timedelta(seconds=janela * largura)).isoformat(),
+                    'leituras': n, 'minima': minima, 'media': media, 'maxima': maxima
+                } for janela, n, minima, media, maxima in agrupar_serie(segundos, glicemias, largura)]
+            else:
+                serie = [{'data': datas[i].isoformat(), 'glicemia': glicemias[i]}
+                         for i in lttb(segundos, glicemias, pontos).tolist()]
+
+        log_banco(f"Série de {len(linhas)} leituras reduzida a {len(serie)} pontos (paciente {paciente_id})")
+        return jsonify({
+            'paciente_id': paciente_id,
+            'inicio': inicio.isoformat(),
+            'fim': fim.isoformat(),
+            'metodo': 'bucket' if largura else 'lttb',
+            'bucket_segundos': int(largura) if largura else None,
+            'leituras': len(linhas),
+            'serie': serie
+        })
+
+    except Exception as e:
+        log_erro(f"Erro ao montar série glicêmica do paciente {paciente_id}: {str(e)}")
+        return jsonify({'error': 'Erro interno'}), 500
+
+@api.route('/analytics/glicemia', methods=['GET'])
+def analytics_glicemia():
+    local_internacao = request.args.get('local_internacao')
+    log_requisicao('GET', '/analytics/glicemia', dict(request.args) or None)
+
+    try:
+        inicio, fim = periodo_analise()
+    except ValueError:
+        return jsonify({'error': 'since/until devem estar no formato ISO 8601'}), 400
+
+    try:
+        query = (
+            db.select(Acompanhamento.paciente_id, Acompanhamento.glicemia)
+            .where(Acompanhamento.data_registro >= inicio, Acompanhamento.data_registro <= fim)
+            .order_by(Acompanhamento.paciente_id, Acompanhamento.data_registro)
+        )
+        if local_internacao:
+            query = query.join(Paciente, Paciente.id == Acompanhamento.paciente_id) \
+                         .where(Paciente.local_internacao == local_internacao)
+
+        linhas = db.session.execute(query).all()
+        log_banco(f"{len(linhas)} leituras analisadas (setor: {local_internacao or 'todos'})")
+
+        pacientes, geral = [], resumo_vazio()
+        if linhas:
+            ids, glicemias = zip(*linhas)
+            por_paciente = resumir_por_paciente(ids, glicemias)
+            nomes = dict(db.session.execute(
+                db.select(Paciente.id, Paciente.nome).where(Paciente.id.in_(por_paciente))
+            ).all())
+            pacientes = [{'paciente_id': pid, 'nome': nomes.get(pid), **resumo}
+                         for pid, resumo in por_paciente.items()]
+
+            # Resumo do setor: todas as leituras juntas, episódios somados por paciente
+            geral = resumir_por_paciente([0] * len(glicemias), glicemias)[0]
+            geral['episodios_hipoglicemia'] = sum(r['episodios_hipoglicemia'] for r in por_paciente.values())
+
+        log_sucesso(f"📈 Análise glicêmica de {len(pacientes)} pacientes concluída")
+        return jsonify({
+            'local_internacao': local_internacao,
+            'inicio': inicio.isoformat(),
+            'fim': fim.isoformat(),
+            'geral': {'pacientes': len(pacientes), **geral},
+            'pacientes': pacientes
+        })
+
+    except Exception as e:
+        log_erro(f"Erro na análise glicêmica: {str(e)}")
+        return jsonify({'error': 'Erro interno'}), 500
+
+# ===============================
+# ROTAS DE EXPORTAÇÃO (auditoria)
+# ===============================
+
+LINHAS_POR_LOTE_EXPORTACAO = 1000
+
+def colunas_exportacao(modelo):
+    """Colunas e coluna de data da exportação; `modelo` pode ser a tabela quente ou a de arquivo."""
+    comuns = [Paciente.prontuario, Paciente.local_internacao]
+    if modelo in (Acompanhamento, AcompanhamentoArquivo):
+        return [modelo.id, modelo.paciente_id, *comuns, modelo.glicemia,
+                modelo.observacao, modelo.data_registro], modelo.data_registro
+    return [modelo.id, modelo.paciente_id, *comuns, modelo.protocolo_id, modelo.dose_total,
+            modelo.basal, modelo.prandial, modelo.observacoes, modelo.data_prescricao], \
+        modelo.data_prescricao
+
+def exportar(modelo, nome):
+    """Exporta a tabela em NDJSON (padrão) ou CSV (?formato=csv), filtrando por
+    ?since=&until=&local_internacao=. As linhas saem de um cursor no servidor
+    (yield_per) direto para a resposta, então a memória não cresce com o volume.
+
+    Primeiro vem a tabela quente, depois a *_arquivo, cada uma ordenada por
+    (paciente_id, data, id): a ordem é por tabela, não global (um paciente
+    arquivado aparece de novo no fim). Um ORDER BY sobre o UNION obrigaria o
+    banco a ordenar tudo antes de enviar a primeira linha."""
+    log_requisicao('GET', f'/export/{nome}', dict(request.args) or None)
+
+    formato = request.args.get('formato', 'ndjson').lower()
+    if formato not in ('ndjson', 'csv'):
+        return jsonify({'error': "formato deve ser 'ndjson' ou 'csv'"}), 400
+
+    try:
+        since = converter_data(request.args['since']) if request.args.get('since') else None
+        until = converter_data(request.args['until']) if request.args.get('until') else None
+    except ValueError:
+        return jsonify({'error': 'since/until devem estar no formato ISO 8601'}), 400
+
+    consultas = []
+    for m in (modelo, MODELOS_ARQUIVO[modelo]):
+        colunas, coluna_data = colunas_exportacao(m)
+        consulta = db.select(*colunas).join(Paciente, Paciente.id == m.paciente_id)
+        if since is not None:
+            consulta = consulta.where(coluna_data >= since)
+        if until is not None:
+            consulta = consulta.where(coluna_data <= until)
+        if request.args.get('local_internacao'):
+            consulta = consulta.where(Paciente.local_internacao == request.args['local_internacao'])
+        # Mesma ordem do índice (paciente_id, data): o banco não precisa ordenar antes de enviar.
+        # Paciente.id (= paciente_id pelo JOIN) vale também partindo de ix_pacientes_local_id
+        consultas.append(consulta.order_by(Paciente.id, coluna_data, m.id))
+    nomes = [c.key for c in colunas]
+
+    def gerar():
+        total = 0
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer) if formato == 'csv' else None
+        if escritor:
+            escritor.writerow(nomes)
+
+        for query in consultas:
+            resultado = db.session.execute(query.execution_options(yield_per=LINHAS_POR_LOTE_EXPORTACAO))
+            for lote in resultado.partitions():
+                for linha in lote:
+                    valores = [serializar_valor(v) for v in linha]
+                    if escritor:
+                        escritor.writerow(valores)
+                    else:
+                        buffer.write(json.dumps(dict(zip(nomes, valores)), ensure_ascii=False))
+                        buffer.write('\n')
+                total += len(lote)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+        log_sucesso(f"📤 Exportação de {nome} concluída ({total} linhas)")
+
+    mimetype = 'text/csv' if formato == 'csv' else 'application/x-ndjson'
+    response = Response(stream_with_context(gerar()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={nome}.{formato}'
+    return response
+
+@api.route('/export/acompanhamentos', methods=['GET'])
+def exportar_acompanhamentos():
+    return exportar(Acompanhamento, 'acompanhamentos')
+
+@api.route('/export/prescricoes', methods=['GET'])
+def exportar_prescricoes():
+    return exportar(Prescricao, 'prescricoes')
+
+# ===============================
+# FEED DE ALTERAÇÕES (SSE)
+# ===============================
+
+# Modelo e serializador de cada tipo de evento publicado pelas rotas de escrita
+TIPOS_EVENTO = {
+    'acompanhamento': (Acompanhamento, serializar_acompanhamento),
+    'prescricao': (Prescricao, serializar_prescricao),
+    'alta': (Alta, serializar_alta),
+    'alerta': (Alerta, serializar_alerta),
+}
+
+def notificar(tipo, registros):
+    """Publica no feed os registros já commitados (modelos ou dicts do INSERT em lote).
+
+    Sem nenhum tablet conectado só marca a lacuna no histórico (quem reconectar
+    recarrega pelas listagens); senão, uma consulta busca o setor dos pacientes.
+    Falhas aqui não desfazem a escrita, só ficam no log."""
+    if not registros or eventos.pular_sem_assinantes():
+        return
+    try:
+        modelo, serializar = TIPOS_EVENTO[tipo]
+        registros = [modelo(**r) if isinstance(r, dict) else r for r in registros]
+        ids = {r.paciente_id for r in registros}
+        locais = dict(db.session.execute(
+            db.select(Paciente.id, Paciente.local_internacao).where(Paciente.id.in_(ids))
+        ).all())
+        for r in registros:
+            eventos.publicar(tipo, r.paciente_id, locais.get(r.paciente_id),
+                             {'paciente_id': r.paciente_id, **serializar(r)})
+    except Exception as e:
+        log_aviso(f"Falha ao publicar evento '{tipo}': {str(e)}")
+
+SSE_RETRY_MS = 3000
+
+def transmitir(**filtro):
+    """Resposta text/event-stream para uma assinatura (paciente_id ou local_internacao).
+
+    O stream não usa o banco: a conexão aberta só espera eventos na fila. O
+    Last-Event-ID (cabeçalho, ou ?last_event_id= no primeiro acesso) reenvia o
+    que foi perdido; se o histórico não cobre o intervalo, o cliente recebe
+    'reset' e deve recarregar pelas rotas de listagem."""
+    ultimo_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    log_requisicao('GET', request.path, {'last_event_id': ultimo_id} if ultimo_id else None)
+
+    assinatura, perdidos, completo = eventos.assinar(ultimo_id=ultimo_id, **filtro)
+    barramento = eventos._get_current_object()
+    heartbeat = current_app.config['SSE_HEARTBEAT']
+
+    def gerar():
+        try:
+            yield f'retry: {SSE_RETRY_MS}\n\n'
+            if not completo:
+                yield 'event: reset\ndata: {}\n\n'
+            for evento in perdidos:
+                yield evento.formatar()
+            # Atrasada = fila cheia: encerra e deixa o cliente retomar pelo Last-Event-ID
+            while not assinatura.atrasada:
+                evento = assinatura.proximo(timeout=heartbeat)
+                yield evento.formatar() if evento else ': ping\n\n'
+        finally:
+            barramento.cancelar(assinatura)
+
+    response = Response(gerar(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # sem buffer em proxies nginx
+    return response
+
+@api.route('/stream/pacientes/<int:paciente_id>', methods=['GET'])
+def stream_paciente(paciente_id):
+    return transmitir(paciente_id=paciente_id)
+
+@api.route('/stream/setores/<local_internacao>', methods=['GET'])
+def stream_setor(local_internacao):
+    return transmitir(local_internacao=local_internacao)
+
+# ===============================
+# ARQUIVAMENTO
+# ===============================
+
+@api.route('/arquivamento', methods=['GET'])
+def status_arquivamento():
+    """Últimas execuções do arquivamento: pacientes, linhas movidas e duração."""
+    return jsonify(arquivador.resumo())
+
+# ===============================
+# SINCRONIZAÇÃO (clientes offline)
+# ===============================
+
+# O cursor devolvido fica um pouco antes do início da consulta: uma transação
+# que gravou antes mas só fez commit depois ainda entra na próxima rodada
+MARGEM_CURSOR_SYNC = timedelta(seconds=5)
+
+SERIALIZADORES_SYNC = {
+    'pacientes': serializar_paciente,
+    'protocolos': serializar_protocolo,
+    'prescricoes': serializar_prescricao,
+    'acompanhamentos': serializar_acompanhamento,
+    'altas': serializar_alta,
+}
+
+def serializar_sync(tabela, registro):
+    dados = SERIALIZADORES_SYNC[tabela](registro)
+    if tabela != 'pacientes':
+        dados['paciente_id'] = registro.paciente_id
+    dados['updated_at'] = serializar_valor(registro.updated_at)
+    return dados
+
+@api.route('/sync', methods=['GET'])
+def sincronizar():
+    """Tudo o que mudou desde ?since=<cursor> (opcionalmente só de ?local_internacao=),
+    numa única resposta, mais os ids removidos (tombstones). Sem since, devolve
+    tudo. O cliente aplica as linhas por id e guarda o novo `cursor`; linhas
+    repetidas entre duas rodadas são esperadas (ver MARGEM_CURSOR_SYNC)."""
+    log_requisicao('GET', '/sync', dict(request.args) or None)
+
+    try:
+        desde = converter_data(request.args['since']) if request.args.get('since') else None
+    except ValueError:
+        return jsonify({'error': 'since deve ser o cursor devolvido pelo /sync (ISO 8601)'}), 400
+    local_internacao = request.args.get('local_internacao')
+
+    try:
+        inicio = datetime.utcnow()
+        resultado = {'cursor': (inicio - MARGEM_CURSOR_SYNC).isoformat(), 'completo': desde is None}
+
+        total = 0
+        for tabela, modelo in MODELOS_SINCRONIZADOS.items():
+            query = db.select(modelo)
+            if desde is not None:
+                query = query.where(modelo.updated_at > desde)  # índice em updated_at
+            if local_internacao:
+                if modelo is not Paciente:
+                    query = query.join(Paciente, Paciente.id == modelo.paciente_id)
+                query = query.where(Paciente.local_internacao == local_internacao)
+            registros = db.session.scalars(query.order_by(modelo.updated_at, modelo.id)).all()
+            resultado[tabela] = [serializar_sync(tabela, r) for r in registros]
+            total += len(registros)
+
+        removidos = {}
+        if desde is not None:
+            for tabela, registro_id in db.session.execute(
+                db.select(Remocao.tabela, Remocao.registro_id).where(Remocao.removido_em > desde)
+            ):
+                removidos.setdefault(tabela, []).append(registro_id)
+        resultado['removidos'] = removidos
+
+        log_sucesso(f"🔄 Sincronização: {total} registros alterados, "
+                    f"{sum(len(ids) for ids in removidos.values())} removidos")
+        return jsonify(resultado)
+
+    except Exception as e:
+        log_erro(f"Erro na sincronização: {str(e)}")
+        return jsonify({'error': 'Erro interno'}), 500
+
 # ===============================
 # HANDLERS DE ERRO
 # ===============================
 
-@app.errorhandler(404)
+@api.app_errorhandler(404)
 def not_found(error):
-    print_warning(f"🔍 Rota não encontrada: {request.url}")
+    log_aviso(f"🔍 Rota não encontrada: {request.url}")
     return jsonify({'error': 'Rota não encontrada'}), 404
 
-@app.errorhandler(500)
+@api.app_errorhandler(500)
 def internal_error(error):
-    print_error(f"💥 Erro interno do servidor: {str(error)}")
+    log_erro(f"💥 Erro interno do servidor: {str(error)}")
     return jsonify({'error': 'Erro interno do servidor'}), 500
 
 # ===============================
 # INICIALIZAÇÃO
 # ===============================
 
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Cria as tabelas que ainda não existem e atualiza as antigas (colunas e
+    índices novos, ver esquema.py). Rode de novo a cada atualização do app."""
+    log_banco("Criando tabelas no banco...")
+    alteracoes = atualizar_esquema()
+    # A coluna nome_busca pode ter acabado de ser criada: backfill dos cadastros antigos
+    indexados = preencher_nome_busca()
+    tabelas = inspect(db.engine).get_table_names()
+    log_sucesso(f"✨ {len(tabelas)} tabelas criadas/verificadas: {', '.join(tabelas)}")
+    click.echo(f"Tabelas: {', '.join(tabelas)}")
+    if alteracoes['colunas'] or alteracoes['indices']:
+        click.echo(f"Colunas adicionadas: {', '.join(alteracoes['colunas']) or '-'}; "
+                   f"índices criados: {', '.join(alteracoes['indices']) or '-'}")
+    if indexados:
+        click.echo(f"{indexados} pacientes indexados para a busca")
+
+@click.command('arquivar')
+@click.option('--dias', type=int, default=None, help='Alta há mais de N dias (padrão: ARQUIVAMENTO_DIAS)')
+@with_appcontext
+def arquivar_command(dias):
+    """Move o histórico de pacientes com alta antiga para as tabelas *_arquivo."""
+    relatorio = current_app.extensions['insulincare_arquivador'].executar(dias)
+    if relatorio is None:
+        click.echo('Já existe um arquivamento em andamento')
+        return
+    click.echo(f"{relatorio['pacientes']} pacientes, {relatorio['linhas_total']} linhas "
+               f"({relatorio['linhas']}) em {relatorio['duracao_ms']} ms")
+
+@click.command('reconstruir-resumos')
+@with_appcontext
+def reconstruir_resumos_command():
+    """Refaz a tabela paciente_resumo a partir do histórico (backfill)."""
+    relatorio = reconstruir_resumos(current_app.extensions.get('insulincare_fila_escrita'))
+    versoes.incrementar('paciente_resumo')
+    log_sucesso(f"📋 Resumos reconstruídos: {relatorio['pacientes']} pacientes em {relatorio['duracao_ms']} ms")
+    click.echo(f"{relatorio['pacientes']} pacientes em {relatorio['duracao_ms']} ms")
+
+@click.command('indexar-busca')
+@with_appcontext
+def indexar_busca_command():
+    """Preenche pacientes.nome_busca nos cadastros antigos (o init-db já faz isso
+    depois de criar a coluna; útil após importar pacientes direto no banco)."""
+    click.echo(f"{preencher_nome_busca()} pacientes indexados")
+
+def create_app(config=None):
+    """Cria o app Flask. `config` pode ser um dict ou uma classe/objeto de configuração.
+
+    Nada aqui acessa o banco: a conexão é aquecida em segundo plano (ou sob
+    demanda, com DB_AQUECIMENTO='lazy') e o /ready informa quando terminou.
+    As tabelas são criadas explicitamente com `python -m flask --app app init-db`."""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    if isinstance(config, dict):
+        app.config.update(config)
+    elif config is not None:
+        app.config.from_object(config)
+
+    # Opções de pool conforme o backend, se não vierem prontas na configuração
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', opcoes_engine(app.config))
+
+    # Réplica de leitura opcional: vira o bind 'replica' (ver replicas.py)
+    if app.config.get('REPLICA_URL'):
+        binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+        binds.setdefault('replica', {'url': app.config['REPLICA_URL'],
+                                     **opcoes_engine(app.config, app.config['REPLICA_URL'])})
+
+    CORS(app, expose_headers=['X-Next-After-Id', 'Server-Timing', 'X-Busca-Origem', 'X-Banco-Leitura', 'Location', 'ETag'])
+    init_logs(app)
+    log_info("🏥 INSULIN PRESCRIBER - API FLASK")
+
+    db.init_app(app)
+    init_banco(app, db)
+    init_sincronizacao()
+    app.extensions['insulincare_replica'] = init_replica(app)
+    app.extensions['insulincare_cache'] = criar_cache(app.config)
+    app.extensions['insulincare_versoes'] = criar_versoes(app.config)
+    init_perfil_sql(app)
+    app.extensions['insulincare_metricas'] = RegistroMetricas()
+    init_metricas(app, app.extensions['insulincare_metricas'])
+    init_compressao(app)
+
+    app.extensions['insulincare_eventos'] = BarramentoEventos(
+        historico=app.config['EVENTOS_HISTORICO'], fila_maxima=app.config['EVENTOS_FILA_MAXIMA'])
+
+    app.register_blueprint(api)
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(arquivar_command)
+    app.cli.add_command(reconstruir_resumos_command)
+    app.cli.add_command(indexar_busca_command)
+
+    app.extensions['insulincare_arquivador'] = Arquivador(app)
+    app.extensions['insulincare_arquivador'].iniciar()
+
+    app.extensions['insulincare_alertas'] = MotorAlertas(app, publicar=lambda novos: notificar('alerta', novos))
+    app.extensions['insulincare_alertas'].iniciar()
+
+    app.extensions['insulincare_relatorios'] = ExecutorRelatorios(app)
+
+    app.extensions['insulincare_busca'] = IndiceBusca()
+    app.extensions['insulincare_prontidao'] = Prontidao(app, app.config['DB_AQUECIMENTO'])
+    app.extensions['insulincare_prontidao'].adicionar_tarefa('indice_busca', app.extensions['insulincare_busca'].carregar)
+    app.extensions['insulincare_prontidao'].iniciar()
+    return app
+
 if __name__ == '__main__':
-    print_separator()
-    print_info("⚙️  Configurações do servidor:")
-    print_info("🌍 Host: 0.0.0.0 (aceita conexões externas)")
-    print_info("🔌 Porta: 5000")
-    print_info("🐛 Debug: Ativado")
-    print_database("🗄️  Banco: mysql+pymysql://root:@localhost:3306/hospital_db")
-    print_separator()
-    print_success("🚀 Servidor Flask iniciado com sucesso!")
-    print_info("💡 Teste em: http://localhost:5000 ou http://10.0.0.186:5000")
-    print_info("🏥 Health check: http://localhost:5000/health")
-    print_info("🌐 Network info: http://localhost:5000/network-info")
-    print_info("⏹️  Pressione CTRL+C para parar")
-    print_separator()
+    app = create_app()
+    log_info("⚙️  Configurações do servidor:")
+    log_info("🌍 Host: 0.0.0.0 (aceita conexões externas)")
+    log_info("🔌 Porta: 5000")
+    log_info("🐛 Debug: Ativado")
+    log_banco(f"🗄️  Banco: {make_url(app.config['SQLALCHEMY_DATABASE_URI']).render_as_string(hide_password=True)}")
+    log_sucesso("🚀 Servidor Flask iniciado com sucesso!")
+    log_info("💡 Teste em: http://localhost:5000 ou http://10.0.0.186:5000")
+    log_info("🏥 Health check: http://localhost:5000/health")
+    log_info("🚦 Readiness: http://localhost:5000/ready")
+    log_info("🌐 Network info: http://localhost:5000/network-info")
+    log_info("⏹️  Pressione CTRL+C para parar")
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,169 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, exists, func, insert, literal, or_, select
+
+from database import db
+from logs import log_banco, log_erro, log_sucesso
+from models import (Paciente, Protocolo, Prescricao, Acompanhamento, Alta,
+                    ProtocoloArquivo, PrescricaoArquivo, AcompanhamentoArquivo)
+
+# 🗃️ ARQUIVAMENTO DE PACIENTES COM ALTA ANTIGA
+# Move protocolos, prescrições e acompanhamentos de quem recebeu alta há mais
+# de ARQUIVAMENTO_DIAS para as tabelas *_arquivo, mantendo as tabelas quentes
+# do tamanho do censo atual. As rotas de histórico leem os dois lugares.
+
+MODELOS_ARQUIVO = {
+    Acompanhamento: AcompanhamentoArquivo,
+    Prescricao: PrescricaoArquivo,  # antes de Protocolo: prescricoes.protocolo_id aponta para protocolos
+    Protocolo: ProtocoloArquivo,
+}
+
+COLUNA_DATA = {
+    Acompanhamento: 'data_registro',
+    Prescricao: 'data_prescricao',
+    Protocolo: 'data_protocolo',
+}
+
+
+def pacientes_para_arquivar(corte, limite):
+    """Pacientes cuja última alta é anterior ao corte, que ainda têm linhas nas
+    tabelas quentes e nenhum registro depois do corte (ex.: reinternação)."""
+    alta_antiga = (
+        select(Alta.paciente_id).group_by(Alta.paciente_id)
+        .having(func.max(Alta.data_alta) < corte)
+    )
+    com_dados = or_(*[exists().where(m.paciente_id == Paciente.id) for m in MODELOS_ARQUIVO])
+    sem_atividade_recente = [
+        ~exists().where(m.paciente_id == Paciente.id, getattr(m, COLUNA_DATA[m]) >= corte)
+        for m in MODELOS_ARQUIVO
+    ]
+    return db.session.scalars(
+        select(Paciente.id)
+        .where(Paciente.id.in_(alta_antiga), com_dados, *sem_atividade_recente)
+        .order_by(Paciente.id).limit(limite)
+    ).all()
+
+
+def mover_para_arquivo(paciente_ids):
+    """INSERT ... SELECT no arquivo e DELETE na tabela quente, para cada tabela.
+    Não faz commit; devolve {tabela: linhas movidas}."""
+    agora = datetime.utcnow()
+    movidas = {}
+    for modelo, arquivo in MODELOS_ARQUIVO.items():
+        colunas = list(modelo.__table__.columns)
+        db.session.execute(
+            insert(arquivo).from_select(
+                [c.key for c in colunas] + ['arquivado_em'],
+                select(*colunas, literal(agora)).where(modelo.paciente_id.in_(paciente_ids))
+            )
+        )
+        resultado = db.session.execute(delete(modelo).where(modelo.paciente_id.in_(paciente_ids)))
+        movidas[modelo.__tablename__] = resultado.rowcount
+    return movidas
+
+
+def arquivar(dias, pacientes_por_lote=100, fila=None, versoes=None):
+    """Arquiva todos os pacientes elegíveis, um lote de pacientes por transação.
+
+    `fila` é a FilaEscrita do SQLite (banco.py), quando houver; `versoes`, o
+    registro de ETags (versoes.py), para invalidar o histórico movido. Devolve o
+    relatório da execução: pacientes, linhas movidas por tabela e duração."""
+    inicio = time.perf_counter()
+    corte = datetime.utcnow() - timedelta(days=dias)
+    relatorio = {
+        'inicio': datetime.utcnow().isoformat(),
+        'corte': corte.isoformat(),
+        'pacientes': 0,
+        'linhas': {m.__tablename__: 0 for m in MODELOS_ARQUIVO},
+    }
+
+    while True:
+        if fila:
+            fila.entrar()
+        try:
+            ids = pacientes_para_arquivar(corte, pacientes_por_lote)
+            if not ids:
+                db.session.rollback()
+                break
+            movidas = mover_para_arquivo(ids)
+            db.session.commit()
+            if versoes is not None:
+                versoes.incrementar(*[f'{m.__tablename__}:{pid}' for m in MODELOS_ARQUIVO for pid in ids])
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            if fila:
+                fila.sair()
+
+        relatorio['pacientes'] += len(ids)
+        for tabela, n in movidas.items():
+            relatorio['linhas'][tabela] += n
+        log_banco(f"🗃️ Lote arquivado: {len(ids)} pacientes", linhas=movidas)
+
+    relatorio['linhas_total'] = sum(relatorio['linhas'].values())
+    relatorio['duracao_ms'] = round((time.perf_counter() - inicio) * 1000, 1)
+    return relatorio
+
+
+class Arquivador:
+    """Executa o arquivamento sob demanda (CLI) ou periodicamente numa thread.
+
+    Configurações: ARQUIVAMENTO_DIAS, ARQUIVAMENTO_PACIENTES_POR_LOTE e
+    ARQUIVAMENTO_INTERVALO_HORAS (0 = sem thread; rode via cron com
+    `python -m flask --app app arquivar`). Com vários workers, ligue a thread
+    em apenas um deles."""
+
+    def __init__(self, app):
+        self.app = app
+        self.execucoes = deque(maxlen=20)
+        self.em_execucao = False
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+
+    def executar(self, dias=None):
+        if not self._lock.acquire(blocking=False):
+            return None  # já existe uma execução em andamento
+        self.em_execucao = True
+        try:
+            with self.app.app_context():
+                config = self.app.config
+                relatorio = arquivar(
+                    dias if dias is not None else config['ARQUIVAMENTO_DIAS'],
+                    config['ARQUIVAMENTO_PACIENTES_POR_LOTE'],
+                    self.app.extensions.get('insulincare_fila_escrita'),
+                    self.app.extensions.get('insulincare_versoes')
+                )
+                db.session.remove()
+            self.execucoes.append(relatorio)
+            log_sucesso(f"🗃️ Arquivamento concluído: {relatorio['pacientes']} pacientes, "
+                        f"{relatorio['linhas_total']} linhas em {relatorio['duracao_ms']} ms",
+                        evento='arquivamento', **relatorio)
+            return relatorio
+        except Exception as e:
+            self.execucoes.append({'inicio': datetime.utcnow().isoformat(), 'erro': str(e)})
+            log_erro(f"Falha no arquivamento: {str(e)}")
+            raise
+        finally:
+            self.em_execucao = False
+            self._lock.release()
+
+    def iniciar(self):
+        horas = self.app.config['ARQUIVAMENTO_INTERVALO_HORAS']
+        if horas <= 0:
+            return
+
+        def _laco():
+            while not self._parar.wait(horas * 3600):
+                try:
+                    self.executar()
+                except Exception:
+                    pass  # já registrado; tenta de novo no próximo intervalo
+
+        threading.Thread(target=_laco, name='arquivamento', daemon=True).start()
+
+    def resumo(self):
+        return {'em_execucao': self.em_execucao, 'execucoes': list(self.execucoes)}
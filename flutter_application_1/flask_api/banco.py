@@ -0,0 +1,164 @@
+import threading
+
+from flask import g, has_request_context, request
+from sqlalchemy import event, insert, text
+from sqlalchemy.engine import make_url
+
+# 🗄️ BACKEND DO BANCO
+# O backend vem da URL (DATABASE_URL): MySQL no hospital, SQLite (WAL) em nós
+# de borda de um setor e no CI. Aqui ficam as opções de pool de cada um e os
+# ajustes do SQLite.
+
+METODOS_LEITURA = ('GET', 'HEAD', 'OPTIONS')
+
+PRAGMAS_SQLITE_PADRAO = {
+    'journal_mode': 'WAL',     # leitores não bloqueiam o escritor
+    'synchronous': 'NORMAL',   # seguro com WAL e bem mais rápido que FULL
+    'busy_timeout': 5000,      # ms esperando o lock em vez de falhar na hora
+    'foreign_keys': 'ON',
+    'cache_size': -20000,      # ~20 MB de cache de páginas por conexão
+    'temp_store': 'MEMORY',
+    'mmap_size': 268435456,
+}
+
+
+def opcoes_engine(config, url=None):
+    """Monta SQLALCHEMY_ENGINE_OPTIONS a partir do backend e das variáveis DB_POOL_*.
+
+    `url` permite montar as opções de outro banco (ex.: a réplica de leitura)."""
+    url = make_url(url or config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() != 'sqlite':
+        return {
+            'pool_size': config['DB_POOL_SIZE'],
+            'max_overflow': config['DB_MAX_OVERFLOW'],
+            'pool_timeout': config['DB_POOL_TIMEOUT'],
+            'pool_recycle': config['DB_POOL_RECYCLE'],
+            'pool_pre_ping': True
+        }
+
+    opcoes = {
+        # Conexões circulam entre as threads do servidor; o lock de escrita é nosso
+        'connect_args': {'check_same_thread': False,
+                         'timeout': config['SQLITE_PRAGMAS']['busy_timeout'] / 1000}
+    }
+    if url.database not in (None, '', ':memory:'):
+        opcoes.update({
+            'pool_size': config['DB_POOL_SIZE'],
+            'max_overflow': config['DB_MAX_OVERFLOW'],
+            'pool_timeout': config['DB_POOL_TIMEOUT']
+        })
+    return opcoes
+
+
+def inserir_com_ids(sessao, modelo, linhas, tamanho_chunk=1000):
+    """INSERT em lote (chunks de `tamanho_chunk`) que preenche 'id' em cada dict
+    de `linhas`, para quem publica as linhas depois (eventos, alertas).
+
+    Cada chunk é um único INSERT de várias linhas. Com RETURNING (SQLite,
+    PostgreSQL, MariaDB) os ids vêm dele; como são gerados na ordem do VALUES,
+    ordená-los devolve a ordem das linhas (o executemany com
+    sort_by_parameter_order cairia para um INSERT por linha no SQLite). No
+    MySQL, um INSERT com o número de linhas conhecido recebe ids consecutivos a
+    partir do LAST_INSERT_ID, no passo de auto_increment_increment."""
+    if not linhas:
+        return
+    dialeto = sessao.get_bind(mapper=modelo).dialect
+    passo = None
+    for inicio in range(0, len(linhas), tamanho_chunk):
+        chunk = linhas[inicio:inicio + tamanho_chunk]
+        if dialeto.insert_returning:
+            ids = sorted(sessao.scalars(insert(modelo).values(chunk).returning(modelo.id)))
+        else:
+            if passo is None:
+                passo = sessao.scalar(text('SELECT @@auto_increment_increment')) or 1
+            primeiro = sessao.execute(insert(modelo).values(chunk)).lastrowid
+            ids = range(primeiro, primeiro + passo * len(chunk), passo)
+        for linha, registro_id in zip(chunk, ids):
+            linha['id'] = registro_id
+
+
+def sem_escrita(rota):
+    """Marca uma rota POST que não escreve no banco (cálculo, enfileirar
+    relatório): ela não espera na fila de escrita nem abre BEGIN IMMEDIATE.
+    Vai logo abaixo do @api.route."""
+    rota.sem_escrita = True
+    return rota
+
+
+def requisicao_escreve(app):
+    """Se a requisição atual pode escrever: método fora de METODOS_LEITURA e
+    rota sem o @sem_escrita."""
+    if request.method in METODOS_LEITURA:
+        return False
+    return not getattr(app.view_functions.get(request.endpoint), 'sem_escrita', False)
+
+
+class FilaEscrita:
+    """Fila FIFO de escritores: uma requisição de escrita por vez no SQLite.
+
+    Sem ela, duas transações que leem e depois escrevem podem receber
+    "database is locked" mesmo com busy_timeout."""
+
+    def __init__(self):
+        self._condicao = threading.Condition()
+        self._proxima_senha = 0
+        self._chamando = 0
+
+    def entrar(self):
+        with self._condicao:
+            senha = self._proxima_senha
+            self._proxima_senha += 1
+            while senha != self._chamando:
+                self._condicao.wait()
+
+    def sair(self):
+        with self._condicao:
+            self._chamando += 1
+            self._condicao.notify_all()
+
+    def aguardando(self):
+        with self._condicao:
+            return self._proxima_senha - self._chamando
+
+
+def configurar_engine_sqlite(engine, pragmas):
+    """Aplica os PRAGMAs em cada conexão nova e abre transações de escrita com
+    BEGIN IMMEDIATE (o lock é pego no início, não no primeiro UPDATE)."""
+
+    @event.listens_for(engine, 'connect')
+    def _aplicar_pragmas(dbapi_connection, connection_record):
+        # Controle manual de transação: o pysqlite não emite BEGIN sozinho
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for nome, valor in pragmas.items():
+            cursor.execute(f'PRAGMA {nome}={valor}')
+        cursor.close()
+
+    @event.listens_for(engine, 'begin')
+    def _iniciar_transacao(conn):
+        escrita = has_request_context() and g.get('fila_escrita', False)
+        conn.exec_driver_sql('BEGIN IMMEDIATE' if escrita else 'BEGIN')
+
+
+def init_banco(app, db):
+    """Liga o modo SQLite (PRAGMAs + fila de escrita) quando o backend é SQLite."""
+    with app.app_context():
+        engines = [e for e in db.engines.values() if e.dialect.name == 'sqlite']
+    if not engines:
+        return
+
+    for engine in engines:
+        configurar_engine_sqlite(engine, app.config['SQLITE_PRAGMAS'])
+
+    fila = app.extensions['insulincare_fila_escrita'] = FilaEscrita()
+
+    @app.before_request
+    def _entrar_na_fila():
+        if requisicao_escreve(app):
+            fila.entrar()
+            g.fila_escrita = True
+
+    @app.teardown_request
+    def _sair_da_fila(exc):
+        if g.pop('fila_escrita', False):
+            fila.sair()
@@ -0,0 +1,65 @@
+"""Benchmark: POST /acompanhamentos (uma leitura por requisição) vs POST /acompanhamentos/batch.
+
+Uso (a partir da pasta flask_api):
+    python benchmarks/bench_acompanhamentos_batch.py --leituras 2000
+
+Roda contra o banco configurado em config.py, usando um paciente temporário
+que é removido (junto com as leituras) ao final.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LOG_NIVEL', 'OFF')
+
+from app import create_app  # noqa: E402
+from database import db  # noqa: E402
+from models import Paciente, Acompanhamento, PacienteResumo, Alerta  # noqa: E402
+
+
+def medir(descricao, n, func):
+    inicio = time.perf_counter()
+    func()
+    duracao = time.perf_counter() - inicio
+    print(f"{descricao:<12} {n:>7} leituras em {duracao:8.3f}s  ->  {n / duracao:10.0f} linhas/s")
+    return duracao
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--leituras', type=int, default=2000, help='leituras por rota')
+    parser.add_argument('--chunk', type=int, default=1000, help='leituras por requisição no lote')
+    args = parser.parse_args()
+
+    app = create_app()
+    client = app.test_client()
+    paciente_id = client.post('/pacientes', json={'nome': 'Benchmark Lote'}).json['id']
+
+    leituras = [{'paciente_id': paciente_id, 'glicemia': random.randint(50, 350)} for _ in range(args.leituras)]
+
+    def uma_a_uma():
+        for leitura in leituras:
+            client.post('/acompanhamentos', json=leitura)
+
+    def em_lote():
+        for inicio in range(0, len(leituras), args.chunk):
+            client.post('/acompanhamentos/batch', json=leituras[inicio:inicio + args.chunk])
+
+    try:
+        t_unitario = medir('unitário', args.leituras, uma_a_uma)
+        t_lote = medir('lote', args.leituras, em_lote)
+        print(f"speedup: {t_unitario / t_lote:.1f}x")
+    finally:
+        with app.app_context():
+            db.session.execute(db.delete(Acompanhamento).where(Acompanhamento.paciente_id == paciente_id))
+            db.session.execute(db.delete(PacienteResumo).where(PacienteResumo.paciente_id == paciente_id))
+            db.session.execute(db.delete(Alerta).where(Alerta.paciente_id == paciente_id))
+            db.session.execute(db.delete(Paciente).where(Paciente.id == paciente_id))
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    main()
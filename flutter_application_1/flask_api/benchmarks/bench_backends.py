@@ -0,0 +1,129 @@
+"""Benchmark: mesmas rotas da API rodando sobre MySQL e sobre SQLite (WAL).
+
+Uso (a partir da pasta flask_api):
+    python benchmarks/bench_backends.py
+    python benchmarks/bench_backends.py --url sqlite:////tmp/borda.db --url mysql+pymysql://root:@localhost/bench_db
+
+Sem --url, compara um SQLite temporário com o banco de DATABASE_URL (se
+definida). Os pacientes semeados são removidos ao final; use um banco
+descartável para o MySQL. Cada rota roda com várias threads em paralelo,
+então escritas concorrentes também testam a fila de escrita do SQLite.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LOG_NIVEL', 'OFF')
+
+from app import create_app  # noqa: E402
+from database import db  # noqa: E402
+from models import Paciente, Protocolo, Prescricao, Acompanhamento, Alta, PacienteResumo, Alerta  # noqa: E402
+
+
+def semear(client, n_pacientes, leituras_por_paciente):
+    ids = []
+    for i in range(n_pacientes):
+        ids.append(client.post('/pacientes', json={
+            'nome': f'Benchmark Backend {i}', 'peso': random.uniform(45, 120),
+            'idade': random.randint(18, 95), 'cenario': random.randint(1, 5),
+            'local_internacao': random.choice(['UTI', 'Enfermaria A', 'Enfermaria B'])
+        }).json['id'])
+    leituras = [{'paciente_id': pid, 'glicemia': random.randint(50, 350)}
+                for pid in ids for _ in range(leituras_por_paciente)]
+    for inicio in range(0, len(leituras), 1000):
+        client.post('/acompanhamentos/batch', json=leituras[inicio:inicio + 1000])
+    return ids
+
+
+def cargas(ids):
+    return [
+        ('GET /pacientes', 'GET', lambda: '/pacientes?limit=50', None),
+        ('GET /pacientes/<id>', 'GET', lambda: f'/pacientes/{random.choice(ids)}', None),
+        ('GET /acompanhamentos/<id>', 'GET', lambda: f'/acompanhamentos/{random.choice(ids)}', None),
+        ('GET /analytics/glicemia', 'GET', lambda: '/analytics/glicemia?local_internacao=UTI', None),
+        ('POST /acompanhamentos', 'POST', lambda: '/acompanhamentos',
+         lambda: {'paciente_id': random.choice(ids), 'glicemia': random.randint(50, 350)}),
+        ('POST /prescricoes', 'POST', lambda: '/prescricoes', lambda: {'paciente_id': random.choice(ids)}),
+    ]
+
+
+def medir(app, caminho, corpo, metodo, requisicoes, threads):
+    def uma(_):
+        client = app.test_client()
+        inicio = time.perf_counter()
+        resposta = client.open(caminho(), method=metodo, json=corpo() if corpo else None)
+        return time.perf_counter() - inicio, resposta.status_code
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        resultados = list(executor.map(uma, range(requisicoes)))
+    total = time.perf_counter() - inicio
+
+    latencias = sorted(r[0] * 1000 for r in resultados)
+    erros = sum(1 for r in resultados if r[1] >= 400)
+    return {
+        'rps': requisicoes / total,
+        'p50': statistics.median(latencias),
+        'p95': latencias[int(len(latencias) * 0.95) - 1],
+        'erros': erros
+    }
+
+
+def limpar(app, ids):
+    with app.app_context():
+        for modelo in (Acompanhamento, Prescricao, Protocolo, Alta, PacienteResumo, Alerta):
+            db.session.execute(db.delete(modelo).where(modelo.paciente_id.in_(ids)))
+        db.session.execute(db.delete(Paciente).where(Paciente.id.in_(ids)))
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', action='append', help='URL do banco (pode repetir)')
+    parser.add_argument('--pacientes', type=int, default=100)
+    parser.add_argument('--leituras', type=int, default=50, help='leituras por paciente')
+    parser.add_argument('--requisicoes', type=int, default=300, help='requisições por rota')
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    arquivo_temporario = None
+    urls = args.url
+    if not urls:
+        arquivo_temporario = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+        urls = [f'sqlite:///{arquivo_temporario}']
+        if os.environ.get('DATABASE_URL'):
+            urls.append(os.environ['DATABASE_URL'])
+
+    try:
+        for url in urls:
+            app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+            with app.app_context():
+                db.create_all()
+            client = app.test_client()
+            ids = semear(client, args.pacientes, args.leituras)
+            try:
+                print(f"\n{app.config['SQLALCHEMY_DATABASE_URI'].split('@')[-1]}  "
+                      f"({args.threads} threads, {args.requisicoes} requisições por rota)")
+                print(f"{'rota':<28} {'req/s':>9} {'p50':>9} {'p95':>9} {'erros':>6}")
+                for nome, metodo, caminho, corpo in cargas(ids):
+                    r = medir(app, caminho, corpo, metodo, args.requisicoes, args.threads)
+                    print(f"{nome:<28} {r['rps']:>9.0f} {r['p50']:>7.1f}ms {r['p95']:>7.1f}ms {r['erros']:>6}")
+            finally:
+                limpar(app, ids)
+                with app.app_context():
+                    db.engine.dispose()
+    finally:
+        if arquivo_temporario:
+            for sufixo in ('', '-wal', '-shm'):
+                if os.path.exists(arquivo_temporario + sufixo):
+                    os.remove(arquivo_temporario + sufixo)
+
+
+if __name__ == '__main__':
+    main()
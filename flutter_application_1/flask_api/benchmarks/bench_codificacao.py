@@ -0,0 +1,124 @@
+"""Benchmark: bytes trafegados e tempo de serialização das rotas de listagem.
+
+Uso (a partir da pasta flask_api):
+    python benchmarks/bench_codificacao.py
+    DATABASE_URL=mysql+pymysql://root:@localhost/bench_db python benchmarks/bench_codificacao.py --leituras 5000
+
+Compara JSON (lista de objetos), JSON colunar e MessagePack (se instalado),
+sem compressão, com gzip e com brotli (se instalado). "serializar" é só a
+montagem do corpo; "total" é a requisição inteira pelo test client, incluindo
+o banco. Os registros semeados são removidos ao final.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LOG_NIVEL', 'OFF')
+
+from app import create_app  # noqa: E402
+from codificacao import brotli, msgpack, responder_lista  # noqa: E402
+from database import db  # noqa: E402
+from models import Paciente, Prescricao, Acompanhamento, Alta, PacienteResumo, Alerta  # noqa: E402
+
+
+def semear(client, n_pacientes, leituras):
+    ids = [client.post('/pacientes', json={
+        'nome': f'Benchmark Codificação {i}', 'prontuario': f'BC{i:05d}', 'peso': 70 + i % 40,
+        'idade': 20 + i % 70, 'cenario': 1 + i % 5, 'local_internacao': 'UTI'
+    }).json['id'] for i in range(n_pacientes)]
+    alvo = ids[0]
+    for inicio in range(0, leituras, 1000):
+        client.post('/acompanhamentos/batch', json=[
+            {'paciente_id': alvo, 'glicemia': 80 + j % 150, 'observacao': 'Pré-prandial' if j % 3 == 0 else None}
+            for j in range(inicio, min(leituras, inicio + 1000))
+        ])
+    for j in range(200):
+        client.post('/prescricoes', json={'paciente_id': alvo, 'observacoes': 'Ajuste de dose'})
+    for pid in ids[1:n_pacientes // 2]:
+        client.post('/altas', json={'paciente_id': pid, 'resumo': 'Alta hospitalar com controle glicêmico adequado'})
+    return ids
+
+
+def medir(client, caminho, cabecalhos, repeticoes):
+    tempos, tamanho = [], 0
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resposta = client.get(caminho, headers=cabecalhos)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        tamanho = len(resposta.get_data())
+        assert resposta.status_code == 200, (caminho, resposta.status_code)
+    return tamanho, statistics.median(tempos)
+
+
+def medir_serializacao(app, registros, formato, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        with app.test_request_context(f'/?formato={formato}'):
+            inicio = time.perf_counter()
+            responder_lista(registros).get_data()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pacientes', type=int, default=1000)
+    parser.add_argument('--leituras', type=int, default=3000, help='leituras do paciente medido')
+    parser.add_argument('--repeticoes', type=int, default=20)
+    args = parser.parse_args()
+
+    arquivo_temporario, config = None, None
+    if not os.environ.get('DATABASE_URL'):
+        arquivo_temporario = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+        config = {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{arquivo_temporario}'}
+
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    ids = semear(client, args.pacientes, args.leituras)
+
+    rotas = [
+        ('/pacientes', f'/pacientes?limit={args.pacientes}'),
+        ('/acompanhamentos/<id>', f'/acompanhamentos/{ids[0]}?limit={args.leituras}'),
+        ('/prescricoes/<id>', f'/prescricoes/{ids[0]}'),
+        ('/altas', '/altas'),
+    ]
+    formatos = ['json', 'colunas'] + (['msgpack'] if msgpack else [])
+    codificacoes = ['identity', 'gzip'] + (['br'] if brotli else [])
+    if not msgpack or not brotli:
+        print('(msgpack e/ou brotli não instalados: formatos/codificações omitidos)')
+
+    try:
+        for nome, caminho in rotas:
+            registros = client.get(caminho).json
+            print(f"\n{nome}  ({len(registros)} registros)")
+            print(f"{'formato':<9} {'serializar':>11} " + ' '.join(f"{c + ' bytes':>14} {'total':>8}" for c in codificacoes))
+            for formato in formatos:
+                serializar = medir_serializacao(app, registros, formato, args.repeticoes)
+                colunas = []
+                for codificacao in codificacoes:
+                    separador = '&' if '?' in caminho else '?'
+                    tamanho, total = medir(client, f'{caminho}{separador}formato={formato}',
+                                           {'Accept-Encoding': codificacao}, args.repeticoes)
+                    colunas.append(f"{tamanho:>14,} {total:>6.1f}ms")
+                print(f"{formato:<9} {serializar:>9.2f}ms " + ' '.join(colunas))
+    finally:
+        with app.app_context():
+            for modelo in (Acompanhamento, Prescricao, Alta, PacienteResumo, Alerta):
+                db.session.execute(db.delete(modelo).where(modelo.paciente_id.in_(ids)))
+            db.session.execute(db.delete(Paciente).where(Paciente.id.in_(ids)))
+            db.session.commit()
+            db.engine.dispose()
+        if arquivo_temporario:
+            for sufixo in ('', '-wal', '-shm'):
+                if os.path.exists(arquivo_temporario + sufixo):
+                    os.remove(arquivo_temporario + sufixo)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Benchmark: tempo entre o import do app e a primeira requisição respondida.
+
+Uso (a partir da pasta flask_api):
+    python benchmarks/bench_inicializacao.py --rodadas 10
+
+Cada rodada é um processo Python novo (import a frio), que mede:
+import dos módulos, create_app(), primeira requisição sem banco (GET /),
+primeira requisição com banco (GET /pacientes?limit=1) e o tempo até o
+/ready responder 200.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PASTA_API = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RODADA = r'''
+import json, os, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, os.getcwd())
+from app import create_app
+t1 = time.perf_counter()
+app = create_app()
+t2 = time.perf_counter()
+client = app.test_client()
+client.get('/')
+t3 = time.perf_counter()
+client.get('/pacientes?limit=1')
+t4 = time.perf_counter()
+while client.get('/ready').status_code != 200 and time.perf_counter() - t0 < 60:
+    time.sleep(0.005)
+t5 = time.perf_counter()
+print(json.dumps({
+    'import': t1 - t0,
+    'create_app': t2 - t1,
+    'primeira_requisicao': t3 - t0,
+    'primeira_consulta': t4 - t0,
+    'ready': t5 - t0,
+}))
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rodadas', type=int, default=10)
+    args = parser.parse_args()
+
+    ambiente = dict(os.environ, LOG_NIVEL='OFF')
+    resultados = []
+    for _ in range(args.rodadas):
+        saida = subprocess.run([sys.executable, '-c', RODADA], cwd=PASTA_API, env=ambiente,
+                               capture_output=True, text=True, check=True)
+        resultados.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+
+    print(f"{'etapa (desde o import)':<24} {'mediana':>10} {'mínimo':>10} {'máximo':>10}")
+    for etapa in resultados[0]:
+        valores = [r[etapa] * 1000 for r in resultados]
+        print(f"{etapa:<24} {statistics.median(valores):>8.1f}ms {min(valores):>8.1f}ms {max(valores):>8.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
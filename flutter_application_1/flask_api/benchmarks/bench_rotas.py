@@ -0,0 +1,369 @@
+"""Benchmark: todas as rotas da API sobre um hospital sintético, com baseline.
+
+Uso (a partir da pasta flask_api):
+    python benchmarks/bench_rotas.py
+    python benchmarks/bench_rotas.py --salvar-baseline benchmarks/baseline.json
+    python benchmarks/bench_rotas.py --sem-baseline --pacientes 5000
+    python benchmarks/bench_rotas.py --url mysql+pymysql://root:@localhost/bench_db --modo http
+
+Semeia o hospital (hospital_sintetico.py) num banco descartável: sem --url, um
+SQLite temporário. Cada rota é medida de duas formas:
+- pelo test client do Flask, em sequência e sem rede;
+- por HTTP, com várias conexões keep-alive em paralelo contra um servidor
+  local (ou contra --alvo, um servidor ligado ao mesmo banco de --url).
+
+O relatório traz p50/p95/p99, requisições por segundo e consultas por
+requisição (lidas do Server-Timing, ver perfil_sql.py).
+
+Compara com benchmarks/baseline.json (versionado, gerado com os valores padrão
+e a semente fixa; outro arquivo com --baseline, nenhum com --sem-baseline) e
+sai com código 1 quando uma rota piora ou o baseline não existe. Piorar é ter
+p95 acima da tolerância, mais consultas por requisição ou mais erros. As
+latências dependem da máquina: regrave o baseline ao trocar o ambiente de CI. Toda rota do
+blueprint precisa de um cenário em CENARIOS: rota nova sem cenário também
+falha. As streams SSE ficam de fora.
+"""
+import argparse
+import http.client
+import json
+import logging
+import math
+import os
+import platform
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urlencode, urlsplit
+
+BASELINE_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('LOG_NIVEL', 'OFF')
+
+from werkzeug.serving import make_server  # noqa: E402
+
+from app import create_app  # noqa: E402
+from database import db  # noqa: E402
+from hospital_sintetico import semear_hospital  # noqa: E402
+
+# rota: regra do url_map; caminho(dados, rng) e corpo(dados, rng) montam cada requisição
+Cenario = namedtuple('Cenario', 'rota metodo caminho corpo nome', defaults=(None, None))
+
+# Streams abertas indefinidamente: não cabem numa medição de latência
+ROTAS_IGNORADAS = {('/stream/pacientes/<int:paciente_id>', 'GET'), ('/stream/setores/<local_internacao>', 'GET')}
+
+
+def _url(caminho, **parametros):
+    return f'{caminho}?{urlencode(parametros)}' if parametros else caminho
+
+
+def _desde(dados, horas):
+    return (dados['agora'] - timedelta(hours=horas)).isoformat()
+
+
+# Leituras primeiro; as escritas vêm por último porque mudam os dados (altas tiram pacientes do censo)
+CENARIOS = [
+    Cenario('/', 'GET', lambda d, r: '/'),
+    Cenario('/health', 'GET', lambda d, r: '/health'),
+    Cenario('/ready', 'GET', lambda d, r: '/ready'),
+    Cenario('/network-info', 'GET', lambda d, r: '/network-info'),
+    Cenario('/metrics', 'GET', lambda d, r: '/metrics'),
+    Cenario('/cache/stats', 'GET', lambda d, r: '/cache/stats'),
+    Cenario('/pacientes', 'GET', lambda d, r: _url('/pacientes', limit=50)),
+    Cenario('/pacientes', 'GET', lambda d, r: _url('/pacientes', limit=50, include='resumo'),
+            nome='GET /pacientes?include=resumo'),
+    Cenario('/pacientes/busca', 'GET', lambda d, r: _url('/pacientes/busca', q=r.choice(d['nomes'])[:4])),
+    Cenario('/pacientes/<int:paciente_id>', 'GET', lambda d, r: f"/pacientes/{r.choice(d['pacientes'])}"),
+    Cenario('/pacientes/<int:paciente_id>/painel', 'GET', lambda d, r: f"/pacientes/{r.choice(d['internados'])}/painel"),
+    Cenario('/painel', 'GET', lambda d, r: _url('/painel', local_internacao=r.choice(d['setores']))),
+    Cenario('/protocolos/<int:paciente_id>', 'GET', lambda d, r: f"/protocolos/{r.choice(d['pacientes'])}"),
+    Cenario('/prescricoes/<int:paciente_id>', 'GET', lambda d, r: f"/prescricoes/{r.choice(d['pacientes'])}"),
+    Cenario('/acompanhamentos/<int:paciente_id>', 'GET', lambda d, r: f"/acompanhamentos/{r.choice(d['pacientes'])}"),
+    Cenario('/altas/<int:paciente_id>', 'GET', lambda d, r: f"/altas/{r.choice(d['pacientes'])}"),
+    Cenario('/altas', 'GET', lambda d, r: '/altas'),
+    Cenario('/alertas', 'GET', lambda d, r: _url('/alertas', limit=100)),
+    Cenario('/pacientes/<int:paciente_id>/glicemia/resumo', 'GET',
+            lambda d, r: f"/pacientes/{r.choice(d['pacientes'])}/glicemia/resumo"),
+    Cenario('/pacientes/<int:paciente_id>/glicemia/serie', 'GET',
+            lambda d, r: _url(f"/pacientes/{r.choice(d['pacientes'])}/glicemia/serie", points=300)),
+    Cenario('/analytics/glicemia', 'GET', lambda d, r: _url('/analytics/glicemia', local_internacao=r.choice(d['setores']))),
+    Cenario('/export/acompanhamentos', 'GET',
+            lambda d, r: _url('/export/acompanhamentos', local_internacao=r.choice(d['setores']), since=_desde(d, 48))),
+    Cenario('/export/prescricoes', 'GET', lambda d, r: _url('/export/prescricoes', local_internacao=r.choice(d['setores']))),
+    Cenario('/arquivamento', 'GET', lambda d, r: '/arquivamento'),
+    Cenario('/relatorios/<tarefa_id>', 'GET', lambda d, r: f"/relatorios/{d['relatorio']}"),
+    Cenario('/relatorios/<tarefa_id>', 'GET', lambda d, r: _url(f"/relatorios/{d['relatorio']}", download=1),
+            nome='GET /relatorios/<tarefa_id>?download=1'),
+    Cenario('/sync', 'GET', lambda d, r: _url('/sync', since=_desde(d, 1), local_internacao=r.choice(d['setores']))),
+    Cenario('/prescricoes/calcular', 'POST', lambda d, r: '/prescricoes/calcular',
+            lambda d, r: {'paciente_id': r.choice(d['internados'])}),
+    Cenario('/relatorios', 'POST', lambda d, r: '/relatorios',
+            lambda d, r: {'tipo': 'setor', 'local_internacao': r.choice(d['setores'])}),
+    Cenario('/prescricoes/calcular/lote', 'POST', lambda d, r: '/prescricoes/calcular/lote',
+            lambda d, r: {'local_internacao': r.choice(d['setores'])}),
+    Cenario('/pacientes', 'POST', lambda d, r: '/pacientes',
+            lambda d, r: {'nome': f"Paciente Benchmark {r.randint(1, 10 ** 6)}", 'peso': round(r.uniform(45, 120), 1),
+                          'idade': r.randint(18, 95), 'cenario': r.randint(1, 5), 'sexo': r.choice('MF'),
+                          'local_internacao': r.choice(d['setores'])}),
+    Cenario('/protocolos', 'POST', lambda d, r: '/protocolos',
+            lambda d, r: {'paciente_id': r.choice(d['internados']), 'dieta': r.choice(['Dieta geral', 'NPO']),
+                          'sensibilidade': 'Usual', 'basal_tipo': 'NPH'}),
+    Cenario('/prescricoes', 'POST', lambda d, r: '/prescricoes', lambda d, r: {'paciente_id': r.choice(d['internados'])}),
+    Cenario('/acompanhamentos', 'POST', lambda d, r: '/acompanhamentos',
+            lambda d, r: {'paciente_id': r.choice(d['internados']), 'glicemia': r.randint(50, 350)}),
+    Cenario('/acompanhamentos/batch', 'POST', lambda d, r: '/acompanhamentos/batch',
+            lambda d, r: [{'paciente_id': r.choice(d['internados']), 'glicemia': r.randint(50, 350)} for _ in range(100)]),
+    Cenario('/altas', 'POST', lambda d, r: '/altas',
+            lambda d, r: {'paciente_id': r.choice(d['internados']), 'resumo': 'Alta (benchmark)'}),
+]
+
+_CONSULTAS = re.compile(r'desc="(\d+) queries"')
+
+
+def nome_cenario(cenario):
+    return cenario.nome or f'{cenario.metodo} {cenario.rota}'
+
+
+def verificar_cobertura(app):
+    """(rotas do blueprint sem cenário, cenários de rotas que não existem mais)."""
+    rotas = {(regra.rule, metodo) for regra in app.url_map.iter_rules() if regra.endpoint.startswith('api.')
+             for metodo in regra.methods - {'HEAD', 'OPTIONS'}}
+    cobertas = {(c.rota, c.metodo) for c in CENARIOS}
+    return sorted(rotas - cobertas - ROTAS_IGNORADAS), sorted(cobertas - rotas)
+
+
+def contar_consultas(server_timing):
+    encontrado = _CONSULTAS.search(server_timing or '')
+    return int(encontrado.group(1)) if encontrado else None
+
+
+def percentil(valores_ordenados, p):
+    """Percentil pelo posto mais próximo."""
+    posto = max(1, math.ceil(p / 100 * len(valores_ordenados)))
+    return valores_ordenados[posto - 1]
+
+
+def resumir(resultados, duracao):
+    """resultados: [(segundos, status, consultas)] -> métricas da rota."""
+    latencias = sorted(r[0] * 1000 for r in resultados)
+    consultas = [r[2] for r in resultados if r[2] is not None]
+    return {
+        'requisicoes': len(resultados),
+        'rps': round(len(resultados) / duracao, 1),
+        'p50': round(percentil(latencias, 50), 2),
+        'p95': round(percentil(latencias, 95), 2),
+        'p99': round(percentil(latencias, 99), 2),
+        'consultas': round(sum(consultas) / len(consultas), 2) if consultas else None,
+        'erros': sum(1 for r in resultados if r[1] >= 400)
+    }
+
+
+def medir_client(app, cenario, pedidos):
+    client = app.test_client()
+    resultados = []
+    inicio = time.perf_counter()
+    for caminho, corpo in pedidos:
+        t = time.perf_counter()
+        resposta = client.open(caminho, method=cenario.metodo, json=corpo)
+        resposta.get_data()  # consome as respostas em stream (export)
+        resultados.append((time.perf_counter() - t, resposta.status_code,
+                           contar_consultas(', '.join(resposta.headers.getlist('Server-Timing')))))
+    return resumir(resultados, time.perf_counter() - inicio)
+
+
+def medir_http(alvo, cenario, pedidos, conexoes):
+    """Gerador de carga: `conexoes` threads, cada uma com sua conexão keep-alive."""
+    url = urlsplit(alvo)
+
+    def trabalhar(fatia):
+        conexao = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+        resultados = []
+        try:
+            for caminho, corpo in fatia:
+                dados = json.dumps(corpo).encode() if corpo is not None else None
+                cabecalhos = {'Content-Type': 'application/json'} if dados else {}
+                t = time.perf_counter()
+                conexao.request(cenario.metodo, url.path.rstrip('/') + caminho, body=dados, headers=cabecalhos)
+                resposta = conexao.getresponse()
+                resposta.read()
+                resultados.append((time.perf_counter() - t, resposta.status,
+                                   contar_consultas(resposta.getheader('Server-Timing'))))
+        finally:
+            conexao.close()
+        return resultados
+
+    fatias = [pedidos[i::conexoes] for i in range(conexoes)]
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=conexoes) as executor:
+        resultados = [r for parte in executor.map(trabalhar, fatias) for r in parte]
+    return resumir(resultados, time.perf_counter() - inicio)
+
+
+def comparar(atual, baseline, tolerancia, folga_ms):
+    """Lista das regressões de `atual` em relação ao `baseline`."""
+    regressoes = []
+    for modo, rotas in atual['rotas'].items():
+        for nome, r in rotas.items():
+            b = baseline.get('rotas', {}).get(modo, {}).get(nome)
+            if not b:
+                print(f"⚠️  {modo} {nome}: sem valor no baseline, não comparado")
+                continue
+            if r['p95'] > b['p95'] * (1 + tolerancia) and r['p95'] - b['p95'] > folga_ms:
+                regressoes.append(f"{modo:<6} {nome}: p95 {b['p95']:.1f}ms -> {r['p95']:.1f}ms")
+            if r['consultas'] is not None and b['consultas'] is not None and r['consultas'] > b['consultas'] + 0.5:
+                regressoes.append(f"{modo:<6} {nome}: consultas/req {b['consultas']} -> {r['consultas']}")
+            if r['erros'] > b['erros']:
+                regressoes.append(f"{modo:<6} {nome}: erros {b['erros']} -> {r['erros']}")
+    return regressoes
+
+
+def imprimir(modo, rotas):
+    print(f"\n[{modo}]")
+    print(f"{'rota':<48} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'consultas':>9} {'erros':>6}")
+    for nome, r in rotas.items():
+        consultas = '-' if r['consultas'] is None else f"{r['consultas']:g}"
+        print(f"{nome:<48} {r['rps']:>8.0f} {r['p50']:>7.1f}ms {r['p95']:>7.1f}ms {r['p99']:>7.1f}ms "
+              f"{consultas:>9} {r['erros']:>6}")
+
+
+def aguardar_pronto(client):
+    resposta = client.get('/ready')
+    if resposta.status_code != 200:
+        raise RuntimeError(f"App não ficou pronto: {resposta.get_json()}")
+
+
+def preparar_relatorio(client, dados):
+    """Gera um relatório de setor para as rotas de consulta/download terem o que buscar."""
+    tarefa_id = client.post('/relatorios', json={'tipo': 'setor', 'local_internacao': dados['setores'][0]}).get_json()['id']
+    while client.get(f'/relatorios/{tarefa_id}').get_json()['estado'] in ('na_fila', 'executando'):
+        time.sleep(0.05)
+    return tarefa_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='URL de um banco descartável (padrão: SQLite temporário)')
+    parser.add_argument('--alvo', help='servidor no ar, ligado ao banco de --url, para o modo http')
+    parser.add_argument('--modo', choices=['client', 'http', 'ambos'], default='ambos')
+    parser.add_argument('--pacientes', type=int, default=500)
+    parser.add_argument('--leituras-por-dia', type=int, default=4)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--requisicoes', type=int, default=200, help='requisições por rota e modo')
+    parser.add_argument('--conexoes', type=int, default=8, help='conexões simultâneas no modo http')
+    parser.add_argument('--rota', action='append', help='mede só os cenários cujo nome contém o texto (pode repetir)')
+    parser.add_argument('--saida', help='grava os resultados em JSON')
+    parser.add_argument('--salvar-baseline', help='grava os resultados como baseline')
+    parser.add_argument('--baseline', default=BASELINE_PADRAO,
+                        help='baseline para comparar (padrão: benchmarks/baseline.json); sai com código 1 se piorar')
+    parser.add_argument('--sem-baseline', action='store_true', help='não compara com nenhum baseline')
+    parser.add_argument('--tolerancia', type=float, default=0.3, help='aumento de p95 tolerado (0.3 = 30%%)')
+    parser.add_argument('--folga-ms', type=float, default=2.0, help='aumento absoluto de p95 sempre tolerado')
+    args = parser.parse_args()
+
+    arquivo_temporario = None
+    url = args.url
+    if not url:
+        arquivo_temporario = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+        url = f'sqlite:///{arquivo_temporario}'
+
+    app = servidor = None
+    falhou = False
+    try:
+        # Aquecimento 'lazy': o índice de busca carrega depois da semeadura
+        app = create_app({'SQLALCHEMY_DATABASE_URI': url, 'ARQUIVAMENTO_INTERVALO_HORAS': 0,
+                          'DB_AQUECIMENTO': 'lazy'})
+        faltando, obsoletos = verificar_cobertura(app)
+        for rota, metodo in faltando:
+            print(f"❌ rota sem cenário: {metodo} {rota}")
+        for rota, metodo in obsoletos:
+            print(f"❌ cenário de rota inexistente: {metodo} {rota}")
+        falhou = bool(faltando or obsoletos)
+
+        with app.app_context():
+            db.create_all()
+            t = time.perf_counter()
+            dados = semear_hospital(args.pacientes, leituras_por_dia=args.leituras_por_dia, semente=args.semente)
+            print(f"Hospital semeado em {time.perf_counter() - t:.1f}s: "
+                  + ', '.join(f'{n} {tabela}' for tabela, n in dados['contagens'].items()))
+            # O motor de alertas pode ter carregado antes da semeadura: relê o histórico
+            app.extensions['insulincare_alertas'].carregar()
+        client = app.test_client()
+        aguardar_pronto(client)
+        dados['relatorio'] = preparar_relatorio(client, dados)
+
+        cenarios = [c for c in CENARIOS if not args.rota or any(t in nome_cenario(c) for t in args.rota)]
+        modos = ['client', 'http'] if args.modo == 'ambos' else [args.modo]
+        alvo = args.alvo
+        if 'http' in modos and not alvo:
+            logging.getLogger('werkzeug').setLevel(logging.ERROR)  # sem uma linha de log por requisição
+            servidor = make_server('127.0.0.1', 0, app, threaded=True)
+            threading.Thread(target=servidor.serve_forever, daemon=True).start()
+            alvo = f'http://127.0.0.1:{servidor.server_port}'
+
+        resultados = {
+            'meta': {'data': datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+                     'plataforma': platform.platform(), 'banco': url.split('@')[-1], 'pacientes': args.pacientes,
+                     'semente': args.semente, 'requisicoes': args.requisicoes, 'conexoes': args.conexoes},
+            'rotas': {}
+        }
+        for modo in modos:
+            rng = random.Random(args.semente + 1)  # mesmas requisições em toda execução
+            rotas = resultados['rotas'][modo] = {}
+            for cenario in cenarios:
+                pedidos = [(cenario.caminho(dados, rng), cenario.corpo(dados, rng) if cenario.corpo else None)
+                           for _ in range(args.requisicoes)]
+                if modo == 'client':
+                    rotas[nome_cenario(cenario)] = medir_client(app, cenario, pedidos)
+                else:
+                    rotas[nome_cenario(cenario)] = medir_http(alvo, cenario, pedidos, args.conexoes)
+            imprimir(f"{modo}: {args.requisicoes} requisições por rota"
+                     + (f", {args.conexoes} conexões" if modo == 'http' else ''), rotas)
+
+        for caminho in (args.saida, args.salvar_baseline):
+            if caminho:
+                with open(caminho, 'w', encoding='utf-8') as arquivo:
+                    json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+                print(f"\nResultados gravados em {caminho}")
+
+        if args.salvar_baseline or args.sem_baseline:
+            pass  # gravando um baseline novo (ou pedido explícito): nada a comparar
+        elif not os.path.exists(args.baseline):
+            print(f"\n❌ Baseline {args.baseline} não encontrado (gere com --salvar-baseline ou use --sem-baseline)")
+            falhou = True
+        else:
+            with open(args.baseline, encoding='utf-8') as arquivo:
+                baseline = json.load(arquivo)
+            for campo in ('pacientes', 'semente', 'requisicoes', 'conexoes'):
+                if baseline['meta'].get(campo) != resultados['meta'][campo]:
+                    print(f"⚠️  {campo} difere do baseline ({baseline['meta'].get(campo)}): comparação aproximada")
+            regressoes = comparar(resultados, baseline, args.tolerancia, args.folga_ms)
+            if regressoes:
+                print(f"\n❌ {len(regressoes)} REGRESSÕES em relação a {args.baseline}:")
+                for regressao in regressoes:
+                    print(f"   {regressao}")
+                falhou = True
+            else:
+                print(f"\n✅ Sem regressões em relação a {args.baseline}")
+    finally:
+        if servidor:
+            servidor.shutdown()
+        if app is not None:
+            with app.app_context():
+                db.engine.dispose()
+        if arquivo_temporario:
+            for sufixo in ('', '-wal', '-shm'):
+                if os.path.exists(arquivo_temporario + sufixo):
+                    os.remove(arquivo_temporario + sufixo)
+
+    sys.exit(1 if falhou else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Hospital sintético para benchmarks: pacientes, protocolos, prescrições,
+acompanhamentos e altas com distribuições plausíveis, sempre iguais para a
+mesma semente.
+
+Uso como módulo (dentro de um app context):
+    from hospital_sintetico import semear_hospital
+    dados = semear_hospital(pacientes=500, semente=42)
+
+Os INSERTs são em lote (Core), não pelas rotas: semear 100 mil leituras leva
+segundos. O resumo por paciente é reconstruído ao final.
+"""
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from busca import normalizar
+from database import db
+from models import Paciente, Protocolo, Prescricao, Acompanhamento, Alta
+from resumos import reconstruir_resumos
+
+NOMES = ['Ana', 'Antônio', 'Beatriz', 'Carlos', 'Cláudia', 'Daniel', 'Eduarda', 'Fábio', 'Fernanda', 'Gabriel',
+         'Helena', 'João', 'José', 'Júlia', 'Lucas', 'Luíza', 'Marcos', 'Maria', 'Paulo', 'Raimunda',
+         'Rafael', 'Sebastião', 'Sônia', 'Tereza', 'Vitória']
+SOBRENOMES = ['Almeida', 'Araújo', 'Barbosa', 'Cardoso', 'Conceição', 'Costa', 'Ferreira', 'Gomes', 'Lima',
+              'Martins', 'Oliveira', 'Pereira', 'Ribeiro', 'Rodrigues', 'Santos', 'Silva', 'Sousa']
+# (setor, peso no sorteio)
+SETORES = [('UTI', 2), ('Enfermaria A', 4), ('Enfermaria B', 4), ('Enfermaria C', 3), ('Maternidade', 1)]
+# cenário 1 = não crítico é a maioria
+CENARIOS = [(1, 6), (2, 1), (3, 2), (4, 1), (5, 1)]
+DIETAS = [('Dieta geral', 5), ('Dieta para diabéticos', 3), ('NPO', 1), ('Enteral', 1)]
+
+TAMANHO_CHUNK = 1000
+
+
+def _sortear(rng, opcoes):
+    valores, pesos = zip(*opcoes)
+    return rng.choices(valores, weights=pesos)[0]
+
+
+def _inserir(modelo, linhas):
+    for inicio in range(0, len(linhas), TAMANHO_CHUNK):
+        db.session.execute(insert(modelo).values(linhas[inicio:inicio + TAMANHO_CHUNK]))
+
+
+def semear_hospital(pacientes=500, leituras_por_dia=4, permanencia_media_dias=6, fracao_alta=0.4,
+                    prescricoes_por_protocolo=2, semente=42, agora=None):
+    """Semeia o hospital e faz commit. Devolve ids e alguns valores úteis para as
+    rotas: {'pacientes', 'internados', 'setores', 'nomes', 'contagens', 'agora'}."""
+    rng = random.Random(semente)
+    agora = agora or datetime.utcnow().replace(microsecond=0)
+    primeiro_id = (db.session.scalar(select(func.max(Paciente.id))) or 0) + 1
+    primeiro_protocolo = (db.session.scalar(select(func.max(Protocolo.id))) or 0) + 1
+
+    linhas = {Paciente: [], Protocolo: [], Prescricao: [], Acompanhamento: [], Alta: []}
+    internados, nomes = [], []
+    for i in range(pacientes):
+        pid = primeiro_id + i
+        # Internação: duração exponencial; quem teve alta saiu antes de agora
+        permanencia = timedelta(days=min(30.0, rng.expovariate(1 / permanencia_media_dias)) + 0.5)
+        teve_alta = rng.random() < fracao_alta
+        fim = agora - timedelta(hours=rng.uniform(1, 72)) if teve_alta else agora
+        inicio = fim - permanencia
+
+        sexo = rng.choice('MF')
+        nome = f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}"
+        peso = round(min(160, max(40, rng.gauss(76, 16))), 1)
+        altura = round(min(2.0, max(1.45, rng.gauss(1.68 if sexo == 'M' else 1.60, 0.08))), 2)
+        linhas[Paciente].append({
+            'id': pid, 'nome': nome, 'nome_busca': normalizar(nome), 'prontuario': f'PR{100000 + pid}',
+            'sexo': sexo, 'idade': int(min(99, max(18, rng.gauss(62, 16)))), 'peso': peso, 'altura': altura,
+            'imc': round(peso / altura ** 2, 1), 'creatinina': round(rng.lognormvariate(0, 0.35), 2),
+            'local_internacao': _sortear(rng, SETORES), 'cenario': _sortear(rng, CENARIOS),
+            'data_cadastro': inicio
+        })
+        nomes.append(nome)
+
+        # Protocolos (1 a 3) e prescrições ao longo da internação
+        for n in range(rng.randint(1, 3)):
+            protocolo_id = primeiro_protocolo + len(linhas[Protocolo])
+            data_protocolo = inicio + permanencia * (n / 3)
+            linhas[Protocolo].append({
+                'id': protocolo_id, 'paciente_id': pid, 'dieta': _sortear(rng, DIETAS),
+                'corticoide': rng.random() < 0.15, 'sensibilidade': rng.choice(['Sensível', 'Usual', 'Resistente']),
+                'glicemia_atual': round(rng.gauss(180, 50)), 'escala_dispositivo': rng.choice([1.0, 2.0]),
+                'basal_tipo': rng.choice(['NPH', 'Glargina']), 'rapida_tipo': 'Regular',
+                'bolus_threshold': 140.0, 'data_protocolo': data_protocolo, 'updated_at': data_protocolo
+            })
+            for _ in range(rng.randint(1, prescricoes_por_protocolo)):
+                tdd = round(peso * rng.uniform(0.3, 0.6), 1)
+                data_prescricao = data_protocolo + timedelta(minutes=rng.uniform(5, 120))
+                linhas[Prescricao].append({
+                    'paciente_id': pid, 'protocolo_id': protocolo_id, 'dose_total': tdd,
+                    'basal': round(tdd / 2, 1), 'prandial': round(tdd / 6, 1),
+                    'data_prescricao': data_prescricao, 'updated_at': data_prescricao
+                })
+
+        # Leituras: cada paciente tem sua glicemia basal; ~3% de hipoglicemias
+        basal = rng.gauss(165, 35)
+        n_leituras = max(1, int(permanencia.total_seconds() / 86400 * leituras_por_dia))
+        intervalo = permanencia / n_leituras
+        for n in range(n_leituras):
+            if rng.random() < 0.03:
+                glicemia = rng.uniform(40, 69)
+            else:
+                glicemia = min(600, max(70, basal * rng.lognormvariate(0, 0.2)))
+            data_registro = inicio + intervalo * n + timedelta(minutes=rng.uniform(-20, 20))
+            linhas[Acompanhamento].append({
+                'paciente_id': pid, 'glicemia': round(glicemia), 'data_registro': data_registro,
+                'updated_at': data_registro
+            })
+
+        if teve_alta:
+            linhas[Alta].append({'paciente_id': pid, 'resumo': 'Alta hospitalar (sintética)',
+                                 'data_alta': fim, 'updated_at': fim})
+        else:
+            internados.append(pid)
+
+    for modelo in (Paciente, Protocolo, Prescricao, Acompanhamento, Alta):
+        for linha in linhas[modelo]:
+            linha.setdefault('updated_at', agora)
+        _inserir(modelo, linhas[modelo])
+    db.session.commit()
+    reconstruir_resumos()
+
+    return {
+        'pacientes': [linha['id'] for linha in linhas[Paciente]],
+        'internados': internados,
+        'setores': [s for s, _ in SETORES],
+        'nomes': nomes,
+        'contagens': {m.__tablename__: len(v) for m, v in linhas.items()},
+        'agora': agora
+    }
+
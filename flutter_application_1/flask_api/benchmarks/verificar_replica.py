@@ -0,0 +1,100 @@
+"""Verificação: as leituras (GET) vão mesmo para o bind 'replica'.
+
+Uso (a partir da pasta flask_api):
+    python benchmarks/verificar_replica.py
+
+Sobe o app com um primário e uma réplica SQLite temporários em modo
+REPLICA_LOCAL (a réplica é uma cópia do primário feita pelo próprio script),
+conta as consultas que chegam a cada engine e confere o cabeçalho
+X-Banco-Leitura: GET de outro cliente lê da réplica; quem acabou de escrever
+continua no primário. Sai com código 1 se alguma conferência falhar.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LOG_NIVEL', 'OFF')
+
+from sqlalchemy import event  # noqa: E402
+
+from app import create_app  # noqa: E402
+from database import db  # noqa: E402
+
+
+def copiar(origem, destino):
+    fonte, alvo = sqlite3.connect(origem), sqlite3.connect(destino)
+    try:
+        fonte.backup(alvo)
+    finally:
+        fonte.close()
+        alvo.close()
+
+
+def contar_consultas(engine):
+    contagem = {'selects': 0}
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _contar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            contagem['selects'] += 1
+
+    return contagem
+
+
+def main():
+    pasta = tempfile.mkdtemp(prefix='insulincare_replica_')
+    primario, replica = os.path.join(pasta, 'primario.db'), os.path.join(pasta, 'replica.db')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{primario}', 'REPLICA_URL': f'sqlite:///{replica}',
+        'REPLICA_LOCAL': True, 'REPLICA_INTERVALO': 0.1, 'DB_AQUECIMENTO': 'lazy',
+        'ARQUIVAMENTO_INTERVALO_HORAS': 0
+    })
+    with app.app_context():
+        db.create_all()
+    # Clientes separados: o cookie de escrita do escritor não vai junto nas leituras do leitor
+    escritor, leitor = app.test_client(), app.test_client()
+    paciente_id = escritor.post('/pacientes', json={'nome': 'Verificação Réplica'},
+                                headers={'X-Client-Id': 'escritor'}).json['id']
+    copiar(primario, replica)
+
+    monitor = app.extensions['insulincare_replica']
+    limite = time.time() + 5
+    while not monitor.disponivel() and time.time() < limite:
+        time.sleep(0.05)
+
+    with app.app_context():
+        na_replica = contar_consultas(db.engines['replica'])
+        no_primario = contar_consultas(db.engines[None])
+
+    falhas = []
+
+    def conferir(descricao, condicao):
+        print(f"{'ok   ' if condicao else 'FALHA'} {descricao}")
+        if not condicao:
+            falhas.append(descricao)
+
+    conferir(f'réplica disponível ({monitor.resumo()})', monitor.disponivel())
+
+    for caminho in (f'/pacientes/{paciente_id}', '/pacientes?limit=10'):
+        antes = dict(na_replica), dict(no_primario)
+        resposta = leitor.get(caminho, headers={'X-Client-Id': 'leitor'})
+        conferir(f'GET {caminho} (leitor): {resposta.status_code}, '
+                 f"X-Banco-Leitura={resposta.headers.get('X-Banco-Leitura')}",
+                 resposta.status_code == 200 and resposta.headers.get('X-Banco-Leitura') == 'replica')
+        conferir(f'GET {caminho} (leitor): consultou a engine da réplica e não a do primário',
+                 na_replica['selects'] > antes[0]['selects'] and no_primario['selects'] == antes[1]['selects'])
+
+    antes = dict(na_replica)
+    resposta = escritor.get(f'/pacientes/{paciente_id}', headers={'X-Client-Id': 'escritor'})
+    conferir(f"GET logo após escrever (escritor): X-Banco-Leitura={resposta.headers.get('X-Banco-Leitura')}",
+             resposta.headers.get('X-Banco-Leitura') == 'primario' and na_replica['selects'] == antes['selects'])
+
+    monitor.parar()
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == '__main__':
+    main()
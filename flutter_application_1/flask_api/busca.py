@@ -0,0 +1,203 @@
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+import numpy as np
+from sqlalchemy import func, select, update
+
+from database import db
+from logs import log_banco, log_erro
+from models import Paciente
+
+# 🔎 BUSCA DE PACIENTES POR NOME E PRONTUÁRIO
+# Um índice de trigramas em memória (nome sem acentos) responde prefixo e
+# busca aproximada; enquanto ele não está carregado, a busca usa os índices do
+# banco (nome_busca e prontuario) só por prefixo.
+
+
+def normalizar(texto):
+    """Minúsculas, sem acentos e com espaços simples: 'José  Conceição' -> 'jose conceicao'."""
+    if not texto:
+        return ''
+    sem_acentos = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(sem_acentos.lower().split())
+
+
+def trigramas(texto, prefixo=False):
+    """Trigramas de cada palavra, com bordas marcadas por espaço (como o pg_trgm).
+
+    Com prefixo=True a borda final não é marcada: 'jo' casa com 'joao'."""
+    resultado = set()
+    for palavra in texto.split():
+        marcada = f'  {palavra}' if prefixo else f'  {palavra} '
+        resultado.update(marcada[i:i + 3] for i in range(len(marcada) - 2))
+    return resultado
+
+
+def preencher_nome_busca():
+    """Backfill de pacientes.nome_busca nos cadastros sem ele (requer app context e
+    a coluna já criada, ver esquema.py). Devolve quantos foram preenchidos."""
+    pendentes = db.session.execute(select(Paciente.id, Paciente.nome).where(Paciente.nome_busca.is_(None))).all()
+    if pendentes:
+        db.session.execute(update(Paciente), [{'id': pid, 'nome_busca': normalizar(nome)[:120]} for pid, nome in pendentes])
+        db.session.commit()
+    return len(pendentes)
+
+
+class IndiceBusca:
+    """Índice invertido trigrama -> ids de pacientes, em memória do processo.
+
+    As listas de ids são array('i'), lidas pelo NumPy sem cópia; a contagem de
+    trigramas em comum de todos os candidatos é um único np.bincount."""
+
+    def __init__(self):
+        self.pronto = False
+        self.carregado_ate = 0  # maior id lido do banco; adicionar() local não o move
+        self._postagens = {}   # trigrama -> array('i') de ids
+        self._pacientes = {}   # id -> (nome, nome normalizado, prontuario, local_internacao)
+        self._n_trigramas = {}  # id -> número de trigramas do nome
+        self._prontuarios = []  # [(prontuario normalizado, id)] ordenado, para prefixo
+        self._lock = threading.Lock()
+        self._carregando = False
+
+    def adicionar(self, paciente_id, nome, prontuario, local_internacao):
+        normalizado = normalizar(nome)
+        tri = trigramas(normalizado)
+        with self._lock:
+            if paciente_id in self._pacientes:
+                return
+            self._pacientes[paciente_id] = (nome, normalizado, prontuario, local_internacao)
+            self._n_trigramas[paciente_id] = len(tri)
+            for t in tri:
+                self._postagens.setdefault(t, array('i')).append(paciente_id)
+            if prontuario:
+                chave = (normalizar(prontuario), paciente_id)
+                self._prontuarios.insert(bisect_left(self._prontuarios, chave), chave)
+
+    def _carregar_desde(self, ultimo_id):
+        linhas = db.session.execute(
+            select(Paciente.id, Paciente.nome, Paciente.prontuario, Paciente.local_internacao)
+            .where(Paciente.id > ultimo_id).order_by(Paciente.id)
+        ).all()
+        for linha in linhas:
+            self.adicionar(*linha)
+        if linhas:
+            self.carregado_ate = max(self.carregado_ate, linhas[-1].id)
+        return len(linhas)
+
+    def carregar(self):
+        """Carrega todos os pacientes (tarefa do aquecimento; requer app context)."""
+        total = self._carregar_desde(0)
+        self.pronto = True
+        log_banco(f"🔎 Índice de busca carregado: {len(self._pacientes)} pacientes ({total} novos)")
+
+    def carregar_em_segundo_plano(self, app):
+        with self._lock:
+            if self._carregando or self.pronto:
+                return
+            self._carregando = True
+
+        def _carregar():
+            try:
+                with app.app_context():
+                    self.carregar()
+                    db.session.remove()
+            except Exception as e:
+                log_erro(f"Falha ao carregar o índice de busca: {str(e)}")
+            finally:
+                self._carregando = False
+
+        threading.Thread(target=_carregar, name='indice-busca', daemon=True).start()
+
+    def sincronizar(self):
+        """Inclui pacientes criados por outros workers (uma consulta pela PK).
+
+        Compara com o último id lido do banco, não com os criados aqui: um id
+        menor criado em outro worker ainda entra; os já indexados são ignorados."""
+        ultimo = db.session.scalar(select(func.max(Paciente.id))) or 0
+        if ultimo > self.carregado_ate:
+            self._carregar_desde(self.carregado_ate)
+
+    def buscar(self, consulta, limite=20, similaridade_minima=0.3):
+        """Pacientes ordenados por relevância: prontuário exato, prontuário por
+        prefixo, nome por prefixo de palavras e, por fim, nome aproximado."""
+        q = normalizar(consulta)
+        if not q:
+            return []
+        resultados = {}
+
+        tri_prefixo, tri_completo = trigramas(q, prefixo=True), trigramas(q)
+        # Sob o lock: um array('i') com view do NumPy aberta não pode crescer
+        with self._lock:
+            # Prontuário: exato ou prefixo, pela lista ordenada
+            i = bisect_left(self._prontuarios, (q, -1))
+            while i < len(self._prontuarios) and self._prontuarios[i][0].startswith(q):
+                chave, pid = self._prontuarios[i]
+                resultados[pid] = (3.0 if chave == q else 2.0, 'prontuario')
+                i += 1
+
+            # Nome: candidatos pelos trigramas em comum (prefixo e aproximado)
+            postagens = [self._postagens[t] for t in tri_prefixo | tri_completo if t in self._postagens]
+            contagem = np.bincount(np.concatenate([np.frombuffer(p, dtype=np.int32) for p in postagens])) \
+                if postagens else None
+
+        if contagem is not None:
+            minimo = max(1, int(len(tri_prefixo) * similaridade_minima))
+            candidatos = np.flatnonzero(contagem >= minimo)
+            if candidatos.size > limite * 20:
+                melhores = np.argpartition(contagem[candidatos], -limite * 20)[-limite * 20:]
+                candidatos = candidatos[melhores]
+
+            palavras_q = q.split()
+            for pid in candidatos.tolist():
+                nome_normalizado = self._pacientes[pid][1]
+                palavras = nome_normalizado.split()
+                if all(any(p.startswith(pq) for p in palavras) for pq in palavras_q):
+                    # Prefixo: a consulta no início do nome vale mais
+                    pontos = 1.0 + (0.5 if nome_normalizado.startswith(q) else 0.0)
+                    tipo = 'prefixo'
+                else:
+                    comuns = len(tri_completo & trigramas(nome_normalizado))
+                    pontos = 2 * comuns / (len(tri_completo) + self._n_trigramas[pid])  # Dice
+                    if pontos < similaridade_minima:
+                        continue
+                    tipo = 'aproximada'
+                if pontos > resultados.get(pid, (0,))[0]:
+                    resultados[pid] = (pontos, tipo)
+
+        ordenados = sorted(resultados.items(), key=lambda item: (-item[1][0], self._pacientes[item[0]][1]))
+        return [self._resultado(pid, pontos, tipo) for pid, (pontos, tipo) in ordenados[:limite]]
+
+    def _resultado(self, pid, pontos, tipo):
+        nome, _, prontuario, local_internacao = self._pacientes[pid]
+        return {'id': pid, 'nome': nome, 'prontuario': prontuario, 'local_internacao': local_internacao,
+                'relevancia': round(pontos, 3), 'correspondencia': tipo}
+
+    def estatisticas(self):
+        return {'pronto': self.pronto, 'pacientes': len(self._pacientes), 'trigramas': len(self._postagens)}
+
+
+def buscar_no_banco(consulta, limite=20):
+    """Busca por prefixo pelos índices do banco, enquanto o índice em memória carrega."""
+    q = normalizar(consulta)
+    if not q:
+        return []
+    colunas = (Paciente.id, Paciente.nome, Paciente.prontuario, Paciente.local_internacao)
+    resultados = [
+        {'id': pid, 'nome': nome, 'prontuario': prontuario, 'local_internacao': local,
+         'relevancia': 3.0 if normalizar(prontuario) == q else 2.0, 'correspondencia': 'prontuario'}
+        for pid, nome, prontuario, local in db.session.execute(
+            select(*colunas).where(Paciente.prontuario.startswith(q, autoescape=True)).limit(limite)
+        )
+    ]
+    vistos = {r['id'] for r in resultados}
+    for pid, nome, prontuario, local in db.session.execute(
+        select(*colunas).where(Paciente.nome_busca.startswith(q, autoescape=True))
+        .order_by(Paciente.nome_busca).limit(limite)
+    ):
+        if pid not in vistos:
+            resultados.append({'id': pid, 'nome': nome, 'prontuario': prontuario, 'local_internacao': local,
+                               'relevancia': 1.5, 'correspondencia': 'prefixo'})
+    resultados.sort(key=lambda r: -r['relevancia'])
+    return resultados[:limite]
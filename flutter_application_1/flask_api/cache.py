@@ -0,0 +1,116 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# 🧠 CACHE DE LEITURA (pacientes e protocolos)
+# Guarda os dicts já serializados; as rotas de escrita invalidam as chaves afetadas.
+
+
+class CacheLRU:
+    """Cache em memória do processo, com TTL e limite de itens (LRU)."""
+
+    def __init__(self, max_itens=1024, ttl=60):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self.misses += 1
+                return None
+            valor, expira_em = item
+            if expira_em < time.monotonic():
+                del self._itens[chave]
+                self.misses += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.hits += 1
+            return valor
+
+    def set(self, chave, valor):
+        with self._lock:
+            self._itens[chave] = (valor, time.monotonic() + self.ttl)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *chaves):
+        with self._lock:
+            for chave in chaves:
+                self._itens.pop(chave, None)
+
+    def clear(self):
+        with self._lock:
+            self._itens.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                'backend': 'memoria',
+                'itens': len(self._itens),
+                'max_itens': self.max_itens,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+class CacheRedis:
+    """Cache compartilhado entre workers via Redis (dependência opcional).
+
+    O Redis cuida do TTL e do descarte por memória (maxmemory-policy allkeys-lru);
+    os contadores de hit/miss são do processo atual."""
+
+    def __init__(self, url, ttl=60, prefixo='insulincare:'):
+        import redis  # opcional: só necessário com CACHE_REDIS_URL
+
+        self._redis = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefixo = prefixo
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, chave):
+        bruto = self._redis.get(self.prefixo + chave)
+        if bruto is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(bruto)
+
+    def set(self, chave, valor):
+        self._redis.set(self.prefixo + chave, json.dumps(valor), ex=self.ttl)
+
+    def delete(self, *chaves):
+        if chaves:
+            self._redis.delete(*[self.prefixo + c for c in chaves])
+
+    def clear(self):
+        for chave in self._redis.scan_iter(self.prefixo + '*'):
+            self._redis.delete(chave)
+
+    def estatisticas(self):
+        return {
+            'backend': 'redis',
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': None
+        }
+
+
+def criar_cache(config):
+    """Escolhe o backend pela configuração: CACHE_REDIS_URL, CACHE_TTL, CACHE_MAX_ITENS."""
+    ttl = config.get('CACHE_TTL', 60)
+    if config.get('CACHE_REDIS_URL'):
+        return CacheRedis(config['CACHE_REDIS_URL'], ttl=ttl)
+    return CacheLRU(max_itens=config.get('CACHE_MAX_ITENS', 1024), ttl=ttl)
@@ -0,0 +1,103 @@
+import gzip
+
+from flask import Response, jsonify, request
+
+# 📦 CODIFICAÇÃO DAS RESPOSTAS
+# Listas podem sair em JSON colunar ({"columns": [...], "rows": [[...]]}) ou
+# MessagePack, sem repetir as chaves a cada linha; e qualquer resposta grande
+# é comprimida (brotli ou gzip) conforme o Accept-Encoding do cliente.
+
+try:  # opcional: pip install brotli
+    import brotli
+except ImportError:
+    brotli = None
+
+try:  # opcional: pip install msgpack
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MIMETYPE_MSGPACK = 'application/msgpack'
+FORMATOS_LISTA = ('json', 'colunas', 'msgpack')
+MIMETYPES_COMPRIMIVEIS = {'application/json', 'application/x-ndjson', MIMETYPE_MSGPACK,
+                          'text/plain', 'text/csv', 'text/html'}
+
+
+class FormatoInvalido(ValueError):
+    pass
+
+
+def formato_pedido():
+    """Formato da lista: ?formato=json|colunas|msgpack ou, sem ele, o Accept."""
+    formato = request.args.get('formato')
+    if formato:
+        if formato not in FORMATOS_LISTA:
+            raise FormatoInvalido(f"formato deve ser um de: {', '.join(FORMATOS_LISTA)}")
+        if formato == 'msgpack' and msgpack is None:
+            raise FormatoInvalido('MessagePack não está disponível neste servidor')
+        return formato
+    if msgpack is not None and request.accept_mimetypes.best_match(
+            ['application/json', MIMETYPE_MSGPACK, 'application/x-msgpack']) != 'application/json':
+        return 'msgpack'
+    return 'json'
+
+
+def responder_lista(registros, colunas=None):
+    """Resposta de uma rota de listagem. `registros` são dicts já serializados;
+    `colunas` define a ordem das colunas (padrão: chaves do primeiro registro).
+
+    Levanta FormatoInvalido se o formato pedido não for suportado."""
+    formato = formato_pedido()
+    if formato == 'json':
+        response = jsonify(registros)
+    else:
+        colunas = list(colunas or (registros[0] if registros else []))
+        tabela = {'columns': colunas, 'rows': [[r.get(c) for c in colunas] for r in registros]}
+        if formato == 'colunas':
+            response = jsonify(tabela)
+        else:
+            response = Response(msgpack.packb(tabela, use_bin_type=True), mimetype=MIMETYPE_MSGPACK)
+    response.vary.add('Accept')
+    return response
+
+
+def _comprimir(response, minimo, nivel_gzip, qualidade_brotli):
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in MIMETYPES_COMPRIMIVEIS):
+        return response
+    response.vary.add('Accept-Encoding')
+
+    dados = response.get_data()
+    if len(dados) < minimo:
+        return response
+
+    aceitos = request.accept_encodings
+    if brotli is not None and aceitos['br']:
+        response.set_data(brotli.compress(dados, quality=qualidade_brotli))
+        response.headers['Content-Encoding'] = 'br'
+    elif aceitos['gzip']:
+        response.set_data(gzip.compress(dados, compresslevel=nivel_gzip))
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        return response
+
+    # ETag forte identifica os bytes: a versão comprimida ganha um sufixo (ver versoes.py)
+    etag, fraco = response.get_etag()
+    if etag and not fraco:
+        response.set_etag(f"{etag}-{response.headers['Content-Encoding']}")
+    return response
+
+
+def init_compressao(app):
+    """Comprime as respostas conforme o Accept-Encoding. Configurações:
+    COMPRESSAO_MINIMA (bytes; abaixo disso não compensa), COMPRESSAO_NIVEL_GZIP
+    e COMPRESSAO_QUALIDADE_BROTLI. Streams (exportação, SSE) não são comprimidos."""
+    app.config.setdefault('COMPRESSAO_MINIMA', 1024)
+    app.config.setdefault('COMPRESSAO_NIVEL_GZIP', 6)
+    app.config.setdefault('COMPRESSAO_QUALIDADE_BROTLI', 4)
+
+    @app.after_request
+    def _comprimir_resposta(response):
+        return _comprimir(response, app.config['COMPRESSAO_MINIMA'],
+                          app.config['COMPRESSAO_NIVEL_GZIP'], app.config['COMPRESSAO_QUALIDADE_BROTLI'])
@@ -0,0 +1,73 @@
+import os
+
+from banco import PRAGMAS_SQLITE_PADRAO
+
+
+class Config:
+    """Configuração padrão do app. create_app(config) aceita um dict ou outra classe
+    para sobrescrever qualquer um destes valores."""
+
+    # Banco: MySQL (XAMPP) por padrão; DATABASE_URL=sqlite:///arquivo.db para
+    # nós de borda e CI. As opções de pool são montadas em banco.py
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'mysql+pymysql://root:@localhost:3306/hospital_db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 20))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # < wait_timeout do MySQL
+    SQLITE_PRAGMAS = PRAGMAS_SQLITE_PADRAO
+
+    # Réplica de leitura opcional (ver replicas.py); a replicação em si é do banco
+    REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    REPLICA_JANELA_ESCRITA = 5   # s em que quem escreveu continua lendo do primário
+    REPLICA_ATRASO_MAXIMO = 2    # s de atraso acima dos quais todos leem do primário
+    REPLICA_INTERVALO = 1        # s entre medições do heartbeat
+    # Réplica local (ex.: cópia SQLite no mesmo host, mantida por fora): sem
+    # heartbeat, atraso 0 enquanto ela responder
+    REPLICA_LOCAL = os.environ.get('DATABASE_REPLICA_LOCAL') == '1'
+
+    # Logs (ver logs.py): LOG_NIVEL=OFF desliga tudo, útil em benchmarks
+    LOG_NIVEL = os.environ.get('LOG_NIVEL', 'INFO')
+    LOG_FORMATO = os.environ.get('LOG_FORMATO', 'json')
+
+    # Cache de leitura de pacientes/protocolos (ver cache.py)
+    CACHE_TTL = 60
+    CACHE_MAX_ITENS = 1024
+    CACHE_REDIS_URL = None
+
+    # Versões para ETag/GET condicional (ver versoes.py); com CACHE_REDIS_URL ficam no Redis
+    VERSOES_MAX_CHAVES = 10000
+    VERSOES_VALIDADE = None     # s de validade do ETag no backend em memória (padrão: CACHE_TTL)
+
+    # Feed de alterações via SSE (ver eventos.py)
+    EVENTOS_HISTORICO = 1000    # eventos guardados para o reenvio via Last-Event-ID
+    EVENTOS_FILA_MAXIMA = 500   # eventos pendentes por conexão antes de derrubá-la
+    SSE_HEARTBEAT = 15          # segundos entre comentários de keep-alive
+
+    # Arquivamento de pacientes com alta antiga (ver arquivamento.py)
+    ARQUIVAMENTO_DIAS = int(os.environ.get('ARQUIVAMENTO_DIAS', 180))
+    ARQUIVAMENTO_PACIENTES_POR_LOTE = 100
+    ARQUIVAMENTO_INTERVALO_HORAS = float(os.environ.get('ARQUIVAMENTO_INTERVALO_HORAS', 0))  # 0 = só via CLI
+
+    # Motor de alertas glicêmicos (ver alertas.py): tipos 'janela', 'consecutivas' e 'ausencia'
+    ALERTAS_REGRAS = [
+        {'tipo': 'janela', 'nome': 'hipoglicemia_repetida', 'abaixo_de': 70, 'ocorrencias': 2, 'horas': 6,
+         'severidade': 'alta'},
+        {'tipo': 'consecutivas', 'nome': 'hiperglicemia_persistente', 'acima_de': 300, 'ocorrencias': 2,
+         'severidade': 'alta'},
+        {'tipo': 'ausencia', 'nome': 'npo_sem_leitura', 'dieta': 'NPO', 'horas': 8, 'severidade': 'media'},
+    ]
+    ALERTAS_VERIFICACAO_MINUTOS = 5  # intervalo da checagem de ausência de leitura; 0 = desligada
+
+    # Relatórios em segundo plano (ver relatorios.py)
+    RELATORIOS_WORKERS = 2              # relatórios gerados ao mesmo tempo (cada um usa uma conexão)
+    RELATORIOS_FILA_MAXIMA = 20         # esperando além dos que estão rodando; acima disso, 503
+    RELATORIOS_CACHE_TTL = 300          # s em que um pedido igual reaproveita o relatório pronto
+    RELATORIOS_GUARDADOS = 100          # tarefas concluídas mantidas na memória
+    RELATORIOS_JANELA_SETOR_HORAS = 12  # período padrão do relatório de setor (um turno)
+    RELATORIOS_MAXIMO_PACIENTES = 500   # pacientes por pacote de alta
+
+    # Aquecimento do banco (ver prontidao.py): 'background' ou 'lazy'
+    DB_AQUECIMENTO = os.environ.get('DB_AQUECIMENTO', 'background')
+    AQUECIMENTO_ESPERA_INICIAL = 1   # s até a nova tentativa depois de uma falha (dobra a cada falha)
+    AQUECIMENTO_ESPERA_MAXIMA = 60   # s, teto da espera entre tentativas
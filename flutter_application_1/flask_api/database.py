@@ -1,3 +1,20 @@
+from flask import g, has_request_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql import Select
 
-db = SQLAlchemy()
\ No newline at end of file
+
+class SessaoRoteada(Session):
+    """Sessão que manda as leituras das requisições marcadas (g.usar_replica,
+    ver replicas.py) para o bind 'replica'; o resto vai para o primário."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and has_request_context() and g.get('usar_replica')
+                and (clause is None or isinstance(clause, Select))):
+            replica = self._db.engines.get('replica')
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': SessaoRoteada})
@@ -0,0 +1,193 @@
+import numpy as np
+
+# 🧮 MOTOR DE CÁLCULO DE DOSES DE INSULINA
+# Mesma lógica usada no app (prescricao_page.dart), agora mantida no servidor.
+
+# Fator de TDD (U/kg/dia) por cenário: 1=Não crítico, 2=Gestante, 3=Crítico,
+# 4=Paliativo, 5=Outros
+FATOR_TDD_POR_CENARIO = {1: 0.4, 2: 0.6, 3: 0.5, 4: 0.3, 5: 0.3}
+FATOR_TDD_PADRAO = 0.4
+
+# Valores assumidos quando o cadastro está incompleto (iguais aos do app)
+PESO_PADRAO = 70.0
+IDADE_PADRAO = 30
+CENARIO_PADRAO = 1
+EGFR_PADRAO = 90.0
+
+REGRA_ISF = 1700
+
+ESCALA_CORRECAO_PALIATIVO = [
+    {'min': 150, 'max': 200, 'unidades': 2},
+    {'min': 201, 'max': 250, 'unidades': 4},
+    {'min': 251, 'max': 300, 'unidades': 6},
+    {'min': 301, 'max': 400, 'unidades': 8},
+]
+ESCALA_CORRECAO_PADRAO = [
+    {'min': 141, 'max': 180, 'unidades': 2},
+    {'min': 181, 'max': 220, 'unidades': 4},
+    {'min': 221, 'max': 260, 'unidades': 6},
+    {'min': 261, 'max': 300, 'unidades': 8},
+    {'min': 301, 'max': 350, 'unidades': 10},
+    {'min': 351, 'max': 400, 'unidades': 12},
+]
+
+
+def _arredondar(valores):
+    # Dart arredonda .5 para cima; np.round arredondaria para o par mais próximo
+    return np.floor(np.asarray(valores, dtype=np.float64) + 0.5).astype(np.int64)
+
+
+def ckd_epi_2021(creatinina, idade, sexo):
+    """TFG estimada (CKD-EPI 2021) em mL/min/1,73m², vetorizada.
+
+    Retorna 0 onde a creatinina não é positiva, como no cadastro do app."""
+    creatinina = np.asarray(creatinina, dtype=np.float64)
+    idade = np.asarray(idade, dtype=np.float64)
+    feminino = np.asarray(sexo) == 'F'
+
+    k = np.where(feminino, 0.7, 0.9)
+    a = np.where(feminino, -0.241, -0.302)
+    razao = np.where(creatinina > 0, creatinina, k) / k
+
+    egfr = (142 * np.minimum(razao, 1.0) ** a * np.maximum(razao, 1.0) ** -1.200
+            * 0.9938 ** idade * np.where(feminino, 1.012, 1.0))
+    return np.where(creatinina > 0, egfr, 0.0)
+
+
+def calcular_doses(peso, idade, cenario, egfr):
+    """Calcula TDD, basal, bolus, ISF e NPH para vários pacientes de uma vez.
+
+    Recebe arrays alinhados (um elemento por paciente) e devolve um dict de
+    arrays inteiros com as mesmas chaves usadas pelo app."""
+    peso = np.asarray(peso, dtype=np.float64)
+    idade = np.asarray(idade, dtype=np.float64)
+    cenario = np.asarray(cenario, dtype=np.int64)
+    egfr = np.asarray(egfr, dtype=np.float64)
+
+    fator = np.full(peso.shape, FATOR_TDD_PADRAO)
+    for c, f in FATOR_TDD_POR_CENARIO.items():
+        fator[cenario == c] = f
+
+    # Ajustes: idoso e função renal reduzida
+    tdd_base = peso * fator
+    tdd_base *= np.where(idade > 65, 0.8, 1.0)
+    tdd_base *= np.where(egfr < 60, 0.9, 1.0)
+    tdd_base *= np.where(egfr < 30, 0.8, 1.0)
+
+    tdd = _arredondar(tdd_base)
+    basal = _arredondar(tdd * np.where(cenario == 3, 0.6, 0.5))
+    bolus = tdd - basal
+    isf = _arredondar(np.divide(REGRA_ISF, tdd, out=np.zeros(tdd.shape), where=tdd > 0))
+    nph_manha = _arredondar(basal * 0.6)
+
+    return {
+        'tdd': tdd,
+        'basal': basal,
+        'bolus_total': bolus,
+        'bolus_refeicao': _arredondar(bolus / 3),
+        'isf': isf,
+        'nph_manha': nph_manha,
+        'nph_noite': basal - nph_manha
+    }
+
+
+def preparar_parametros(pacientes):
+    """Extrai peso/idade/cenário/TFG de uma lista de dicts, aplicando os padrões.
+
+    Quando a TFG não foi informada mas há creatinina, ela é estimada por CKD-EPI 2021."""
+    def coluna(chave, padrao, dtype):
+        return np.array([padrao if p.get(chave) is None else p[chave] for p in pacientes], dtype=dtype)
+
+    peso = coluna('peso', PESO_PADRAO, np.float64)
+    idade = coluna('idade', IDADE_PADRAO, np.float64)
+    cenario = coluna('cenario', CENARIO_PADRAO, np.int64)
+    creatinina = coluna('creatinina', 0.0, np.float64)
+    sexo = coluna('sexo', 'M', object)
+    # TFG 0 é o que o cadastro grava quando não há creatinina: tratar como ausente
+    egfr = np.array([p.get('egfr') or np.nan for p in pacientes], dtype=np.float64)
+
+    sem_egfr = np.isnan(egfr)
+    estimada = ckd_epi_2021(creatinina, idade, sexo)
+    egfr = np.where(sem_egfr & (estimada > 0), estimada, egfr)
+    egfr = np.where(np.isnan(egfr), EGFR_PADRAO, egfr)
+    return peso, idade, cenario, egfr
+
+
+def definir_metas(cenario):
+    if cenario == 2:
+        return {'min': 70, 'max': 140, 'hipo_alerta': 60}
+    if cenario == 3:
+        return {'min': 140, 'max': 180, 'hipo_alerta': 70}
+    if cenario == 4:
+        return {'min': 100, 'max': 250, 'hipo_alerta': 70}
+    return {'min': 100, 'max': 180, 'hipo_alerta': 70}
+
+
+def definir_tipo_basal(cenario):
+    if cenario == 2:
+        return 'NPH (2x/dia) ou Glargina'
+    if cenario == 3:
+        return 'Insulina IV contínua ou Glargina'
+    return 'NPH (2x/dia) ou Glargina/Detemir'
+
+
+def calcular_risco_hipoglicemia(idade, egfr):
+    pontos = 0
+    if idade > 65:
+        pontos += 2
+    if egfr < 60:
+        pontos += 1
+    if egfr < 30:
+        pontos += 2
+
+    if pontos >= 3:
+        return 'Alto'
+    if pontos >= 1:
+        return 'Moderado'
+    return 'Baixo'
+
+
+def gerar_observacoes(cenario, egfr, idade):
+    obs = []
+    if cenario == 2:
+        obs += ['Gestante: monitorar glicemia 4x/dia', 'Meta pré-prandial: 70-95 mg/dL']
+    elif cenario == 3:
+        obs += ['Paciente crítico: glicemia a cada 2-4h', 'Considerar insulina IV se instável']
+    elif cenario == 4:
+        obs += ['Cuidados paliativos: evitar hipoglicemia', 'Priorizar qualidade de vida']
+
+    if egfr < 60:
+        obs.append('⚠️ Função renal reduzida: monitorar hipoglicemia')
+    if idade > 65:
+        obs.append('⚠️ Idoso: risco aumentado de hipoglicemia')
+
+    obs += ['Ajustar doses conforme monitorização', 'Reavaliar em 24-48h']
+    return '. '.join(obs)
+
+
+def calcular_prescricoes(pacientes, detalhada=True):
+    """Sugere a prescrição de cada paciente (lista de dicts) numa passada vetorizada.
+
+    Com `detalhada=False` devolve só as doses, sem escala/metas/observações."""
+    peso, idade, cenario, egfr = preparar_parametros(pacientes)
+    doses = calcular_doses(peso, idade, cenario, egfr)
+
+    resultado = []
+    for i in range(len(pacientes)):
+        sugestao = {chave: int(valores[i]) for chave, valores in doses.items()}
+        sugestao['egfr_utilizada'] = round(float(egfr[i]), 1)
+        if detalhada:
+            c, e, a = int(cenario[i]), float(egfr[i]), int(idade[i])
+            metas = definir_metas(c)
+            sugestao.update({
+                'escala_correcao': ESCALA_CORRECAO_PALIATIVO if c == 4 else ESCALA_CORRECAO_PADRAO,
+                'meta_min': metas['min'],
+                'meta_max': metas['max'],
+                'hipo_alerta': metas['hipo_alerta'],
+                'tipo_basal': definir_tipo_basal(c),
+                'tipo_rapida': 'Insulina regular ou análogo rápido',
+                'observacoes': gerar_observacoes(c, e, a),
+                'risco_hipo': calcular_risco_hipoglicemia(a, e)
+            })
+        resultado.append(sugestao)
+    return resultado
@@ -0,0 +1,74 @@
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+
+from database import db
+from logs import log_banco
+
+# 🧱 ATUALIZAÇÃO DO ESQUEMA (init-db)
+# O create_all só cria tabelas que não existem: colunas e índices novos em
+# tabelas antigas (ex.: updated_at do /sync) entram aqui, com ALTER TABLE.
+# Só acrescenta; nunca remove nem altera o que já existe.
+
+
+def colunas_ausentes(engine=None):
+    """{tabela: [Column do modelo]} para tabelas existentes sem todas as colunas."""
+    inspetor = inspect(engine or db.engine)
+    existentes = set(inspetor.get_table_names())
+    ausentes = {}
+    for nome, tabela in db.metadata.tables.items():
+        if nome not in existentes:
+            continue
+        colunas = {c['name'] for c in inspetor.get_columns(nome)}
+        faltando = [c for c in tabela.columns if c.name not in colunas]
+        if faltando:
+            ausentes[nome] = faltando
+    return ausentes
+
+
+def _adicionar_colunas(conexao, ausentes):
+    for tabela, colunas in ausentes.items():
+        for coluna in colunas:
+            if not coluna.nullable and coluna.server_default is None:
+                raise RuntimeError(f"{tabela}.{coluna.name} é NOT NULL sem valor padrão: precisa de migração manual")
+            ddl = CreateColumn(coluna).compile(dialect=conexao.dialect)
+            conexao.execute(text(f'ALTER TABLE {tabela} ADD COLUMN {ddl}'))
+            log_banco(f"➕ Coluna adicionada: {tabela}.{coluna.name}")
+
+
+def _criar_indices(conexao):
+    inspetor = inspect(conexao)
+    existentes = set(inspetor.get_table_names())
+    criados = []
+    for nome, tabela in db.metadata.tables.items():
+        if nome not in existentes:
+            continue
+        indices = {i['name'] for i in inspetor.get_indexes(nome)}
+        for indice in tabela.indexes:
+            if indice.name not in indices:
+                indice.create(conexao)
+                criados.append(indice.name)
+                log_banco(f"➕ Índice criado: {indice.name}")
+    return criados
+
+
+def atualizar_esquema():
+    """Cria as tabelas que faltam, acrescenta colunas e índices novos às
+    existentes e preenche updated_at das linhas antigas. Idempotente.
+
+    Devolve {'colunas': ['tabela.coluna', ...], 'indices': [...]}."""
+    db.create_all()
+    ausentes = colunas_ausentes()
+    with db.engine.begin() as conexao:
+        _adicionar_colunas(conexao, ausentes)
+        indices = _criar_indices(conexao)
+        # Linhas anteriores ao /sync: entram na próxima sincronização incremental
+        agora = datetime.utcnow()
+        for nome, tabela in db.metadata.tables.items():
+            if 'updated_at' in tabela.columns:
+                conexao.execute(tabela.update().where(tabela.c.updated_at.is_(None)).values(updated_at=agora))
+    return {
+        'colunas': [f'{tabela}.{c.name}' for tabela, colunas in ausentes.items() for c in colunas],
+        'indices': indices
+    }
@@ -0,0 +1,125 @@
+import itertools
+import json
+import queue
+import threading
+import time
+from collections import deque
+
+# 📡 FEED DE ALTERAÇÕES (Server-Sent Events)
+# As rotas de escrita publicam aqui depois do commit; cada tablet conectado em
+# /stream/... recebe só os eventos do seu paciente ou setor. É um pub/sub em
+# memória do processo: com vários workers, cada um só vê as próprias escritas.
+
+
+class Evento:
+    __slots__ = ('id', 'tipo', 'paciente_id', 'local_internacao', 'dados')
+
+    def __init__(self, id, tipo, paciente_id, local_internacao, dados):
+        self.id = id
+        self.tipo = tipo
+        self.paciente_id = paciente_id
+        self.local_internacao = local_internacao
+        self.dados = dados
+
+    def formatar(self):
+        """Texto do evento no formato text/event-stream."""
+        dados = json.dumps(self.dados, ensure_ascii=False, default=str)
+        return f'id: {self.id}\nevent: {self.tipo}\ndata: {dados}\n\n'
+
+
+class Assinatura:
+    """Fila de uma conexão SSE. Se o cliente não acompanha o ritmo e a fila
+    enche, a assinatura é marcada como atrasada e o stream é encerrado: o
+    cliente reconecta com Last-Event-ID e recupera o que perdeu do histórico."""
+
+    def __init__(self, paciente_id=None, local_internacao=None, fila_maxima=500):
+        self.paciente_id = paciente_id
+        self.local_internacao = local_internacao
+        self.atrasada = False
+        self._fila = queue.Queue(maxsize=fila_maxima)
+
+    def aceita(self, evento):
+        if self.paciente_id is not None:
+            return evento.paciente_id == self.paciente_id
+        return evento.local_internacao == self.local_internacao
+
+    def entregar(self, evento):
+        try:
+            self._fila.put_nowait(evento)
+        except queue.Full:
+            self.atrasada = True
+
+    def proximo(self, timeout):
+        try:
+            return self._fila.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class BarramentoEventos:
+    """Publica eventos para as assinaturas ativas e guarda os últimos para o
+    reenvio via Last-Event-ID. Os ids são '<época>-<n>': um id de outro
+    processo (ex.: antes de um restart) é reconhecido e o cliente é avisado."""
+
+    def __init__(self, historico=1000, fila_maxima=500):
+        self.epoca = str(int(time.time()))
+        self.fila_maxima = fila_maxima
+        self._contador = itertools.count(1)
+        self._historico = deque(maxlen=historico)
+        self._lacuna = 0  # número do último lote não publicado (sem assinantes)
+        self._assinaturas = set()
+        self._lock = threading.Lock()
+
+    def pular_sem_assinantes(self):
+        """Sem ninguém conectado, registra uma lacuna no lugar do evento e devolve
+        True: quem reconectar com um id anterior a ela recebe completo=False
+        (e recarrega), em vez de um reenvio que pareceria completo. Se alguém
+        assinou nesse meio-tempo, devolve False e o evento deve ser publicado."""
+        with self._lock:
+            if self._assinaturas:
+                return False
+            self._lacuna = next(self._contador)
+            return True
+
+    def publicar(self, tipo, paciente_id, local_internacao, dados):
+        with self._lock:
+            evento = Evento(f'{self.epoca}-{next(self._contador)}', tipo, paciente_id, local_internacao, dados)
+            self._historico.append(evento)
+            for assinatura in self._assinaturas:
+                if assinatura.aceita(evento):
+                    assinatura.entregar(evento)
+        return evento
+
+    def assinar(self, paciente_id=None, local_internacao=None, ultimo_id=None):
+        """Registra uma assinatura. Devolve (assinatura, eventos perdidos, completo);
+        completo=False quando o Last-Event-ID não pôde ser retomado do histórico."""
+        assinatura = Assinatura(paciente_id, local_internacao, self.fila_maxima)
+        with self._lock:
+            perdidos, completo = self._desde(ultimo_id, assinatura)
+            self._assinaturas.add(assinatura)
+        return assinatura, perdidos, completo
+
+    def cancelar(self, assinatura):
+        with self._lock:
+            self._assinaturas.discard(assinatura)
+
+    def _desde(self, ultimo_id, assinatura):
+        if not ultimo_id:
+            return [], True
+        epoca, _, numero = str(ultimo_id).partition('-')
+        if epoca != self.epoca or not numero.isdigit():
+            return [], False
+        numero = int(numero)
+        # Houve escrita não publicada (sem assinantes) depois desse id
+        if numero < self._lacuna:
+            return [], False
+        # O histórico precisa começar logo depois do último evento recebido
+        if self._historico and int(self._historico[0].id.split('-')[1]) > numero + 1:
+            return [], False
+        perdidos = [e for e in self._historico
+                    if int(e.id.split('-')[1]) > numero and assinatura.aceita(e)]
+        return perdidos, True
+
+    def estatisticas(self):
+        with self._lock:
+            return {'assinaturas': len(self._assinaturas), 'historico': len(self._historico)}
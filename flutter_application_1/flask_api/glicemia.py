@@ -0,0 +1,146 @@
+import numpy as np
+
+# 🎯 FAIXAS GLICÊMICAS (mg/dL) - mesmas usadas em registrar_acompanhamento
+ALVO_MIN = 70
+ALVO_MAX = 180
+
+
+def _porcentagem(parte, total):
+    return np.round(100.0 * parte / np.maximum(total, 1), 1)
+
+
+def resumir_por_paciente(paciente_ids, glicemias):
+    """Calcula o resumo glicêmico de vários pacientes numa única passada vetorizada.
+
+    `paciente_ids` e `glicemias` são arrays alinhados, ordenados por paciente e,
+    dentro de cada paciente, por data da leitura. Retorna {paciente_id: resumo}.
+    Um episódio de hipoglicemia é uma sequência de leituras consecutivas < ALVO_MIN.
+    """
+    paciente_ids = np.asarray(paciente_ids, dtype=np.int64)
+    glicemias = np.asarray(glicemias, dtype=np.float64)
+    if glicemias.size == 0:
+        return {}
+
+    # Início de cada grupo (paciente) no array ordenado
+    novo_grupo = np.empty(paciente_ids.size, dtype=bool)
+    novo_grupo[0] = True
+    np.not_equal(paciente_ids[1:], paciente_ids[:-1], out=novo_grupo[1:])
+    inicios = np.flatnonzero(novo_grupo)
+    n = np.diff(np.append(inicios, glicemias.size))
+
+    soma = np.add.reduceat(glicemias, inicios)
+    media = soma / n
+    desvio = glicemias - np.repeat(media, n)
+    variancia = np.add.reduceat(desvio * desvio, inicios) / np.maximum(n - 1, 1)
+    dp = np.sqrt(variancia)
+    cv = np.divide(100.0 * dp, media, out=np.zeros_like(dp), where=media > 0)
+
+    abaixo = glicemias < ALVO_MIN
+    acima = glicemias > ALVO_MAX
+    no_alvo = ~abaixo & ~acima
+
+    # Episódio começa numa leitura baixa cuja anterior (do mesmo paciente) não era baixa
+    inicio_episodio = abaixo.copy()
+    inicio_episodio[1:] &= ~abaixo[:-1] | novo_grupo[1:]
+
+    resumo = {}
+    colunas = zip(
+        paciente_ids[inicios].tolist(), n.tolist(),
+        np.round(media, 1).tolist(), np.round(dp, 1).tolist(), np.round(cv, 1).tolist(),
+        _porcentagem(np.add.reduceat(no_alvo, inicios), n).tolist(),
+        _porcentagem(np.add.reduceat(abaixo, inicios), n).tolist(),
+        _porcentagem(np.add.reduceat(acima, inicios), n).tolist(),
+        np.add.reduceat(inicio_episodio, inicios).tolist(),
+        np.minimum.reduceat(glicemias, inicios).tolist(),
+        np.maximum.reduceat(glicemias, inicios).tolist(),
+    )
+    for pid, total, med, desv, coef, tir, tbr, tar, episodios, minimo, maximo in colunas:
+        resumo[pid] = {
+            'leituras': total,
+            'media': med,
+            'desvio_padrao': desv,
+            'coeficiente_variacao': coef,
+            'tempo_no_alvo': tir,
+            'tempo_abaixo': tbr,
+            'tempo_acima': tar,
+            'episodios_hipoglicemia': episodios,
+            'minima': minimo,
+            'maxima': maximo
+        }
+    return resumo
+
+
+def resumo_vazio():
+    return {
+        'leituras': 0,
+        'media': None,
+        'desvio_padrao': None,
+        'coeficiente_variacao': None,
+        'tempo_no_alvo': None,
+        'tempo_abaixo': None,
+        'tempo_acima': None,
+        'episodios_hipoglicemia': 0,
+        'minima': None,
+        'maxima': None
+    }
+
+
+# 📉 SÉRIES PARA GRÁFICO (tamanho limitado, qualquer que seja a internação)
+
+def agrupar_serie(segundos, glicemias, largura):
+    """Agrupa a série em janelas fixas de `largura` segundos.
+
+    `segundos` são os instantes das leituras (ordenados) contados a partir do
+    início do período. Retorna (janela, leituras, mínima, média, máxima) só das
+    janelas que têm leituras; `janela` é o índice da janela a partir do início."""
+    segundos = np.asarray(segundos, dtype=np.float64)
+    glicemias = np.asarray(glicemias, dtype=np.float64)
+    if glicemias.size == 0:
+        return []
+
+    janelas = (segundos // largura).astype(np.int64)
+    novo_grupo = np.empty(janelas.size, dtype=bool)
+    novo_grupo[0] = True
+    np.not_equal(janelas[1:], janelas[:-1], out=novo_grupo[1:])
+    inicios = np.flatnonzero(novo_grupo)
+    n = np.diff(np.append(inicios, glicemias.size))
+
+    return list(zip(
+        janelas[inicios].tolist(), n.tolist(),
+        np.minimum.reduceat(glicemias, inicios).tolist(),
+        np.round(np.add.reduceat(glicemias, inicios) / n, 1).tolist(),
+        np.maximum.reduceat(glicemias, inicios).tolist(),
+    ))
+
+
+def lttb(segundos, glicemias, pontos):
+    """Largest-Triangle-Three-Buckets: escolhe `pontos` leituras que preservam
+    o formato da curva (picos e vales), mantendo a primeira e a última.
+
+    Retorna os índices escolhidos, em ordem."""
+    x = np.asarray(segundos, dtype=np.float64)
+    y = np.asarray(glicemias, dtype=np.float64)
+    n = x.size
+    if pontos >= n or pontos < 3:
+        return np.arange(n)
+
+    # pontos - 2 grupos entre a primeira e a última leitura
+    limites = np.linspace(1, n - 1, pontos - 1).astype(np.int64)
+    escolhidos = np.empty(pontos, dtype=np.int64)
+    escolhidos[0], escolhidos[-1] = 0, n - 1
+
+    a = 0
+    for i in range(pontos - 2):
+        inicio, fim = limites[i], limites[i + 1]
+        if i == pontos - 3:
+            media_x, media_y = x[n - 1], y[n - 1]
+        else:
+            proximo = slice(limites[i + 1], limites[i + 2])
+            media_x, media_y = x[proximo].mean(), y[proximo].mean()
+
+        # Área do triângulo (ponto anterior, candidato, média do grupo seguinte)
+        area = np.abs((x[a] - media_x) * (y[inicio:fim] - y[a])
+                      - (x[a] - x[inicio:fim]) * (media_y - y[a]))
+        a = inicio + int(np.argmax(area))
+        escolhidos[i + 1] = a
+    return escolhidos
@@ -0,0 +1,155 @@
+import atexit
+import json
+import logging
+import queue
+import random
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, has_request_context, request
+
+# 📝 LOGS ESTRUTURADOS E NÃO BLOQUEANTES
+# As rotas só enfileiram o registro; uma thread em segundo plano formata
+# (JSON ou texto) e escreve na saída. Substitui os antigos print_*.
+
+logger = logging.getLogger('insulincare')
+
+ICONES = {
+    'sucesso': '✅',
+    'erro': '❌',
+    'info': 'ℹ️ ',
+    'aviso': '⚠️ ',
+    'banco': '🗄️ ',
+    'requisicao': '🌐',
+}
+
+# Atributos padrão do LogRecord: o resto é campo estruturado (extra=...)
+_ATRIBUTOS_PADRAO = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class FormatadorJSON(logging.Formatter):
+    def format(self, record):
+        dados = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        dados.update({k: v for k, v in vars(record).items() if k not in _ATRIBUTOS_PADRAO})
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+class FormatadorTexto(logging.Formatter):
+    """Formato legível para o console de desenvolvimento, como os antigos print_*."""
+
+    def format(self, record):
+        icone = ICONES.get(getattr(record, 'tipo', None), '•')
+        hora = datetime.fromtimestamp(record.created).strftime('%H:%M:%S')
+        return f"{icone} {hora} | {record.getMessage()}"
+
+
+class FiltroRequisicao(logging.Filter):
+    """Anexa a rota ao registro e descarta INFO/DEBUG das requisições fora da amostra."""
+
+    def filter(self, record):
+        if has_request_context():
+            if record.levelno < logging.WARNING and not g.get('log_amostrado', True):
+                return False
+            record.rota = request.endpoint
+        return True
+
+
+class QueueHandlerNaoBloqueante(QueueHandler):
+    """Com a fila cheia o registro é descartado (e contado) em vez de travar a requisição."""
+
+    descartados = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            QueueHandlerNaoBloqueante.descartados += 1
+
+
+def init_logs(app):
+    """Configura o pipeline de logs. Configurações:
+
+    LOG_NIVEL              'DEBUG', 'INFO', 'WARNING', 'ERROR' ou 'OFF' (desliga tudo)
+    LOG_FORMATO            'json' ou 'texto'
+    LOG_AMOSTRAGEM         {endpoint: fração de requisições com INFO registrado}
+    LOG_AMOSTRAGEM_PADRAO  fração para os demais endpoints (1.0 = todas)
+    LOG_FILA_MAXIMA        tamanho da fila até o escritor em segundo plano
+    """
+    app.config.setdefault('LOG_NIVEL', 'INFO')
+    app.config.setdefault('LOG_FORMATO', 'json')
+    app.config.setdefault('LOG_AMOSTRAGEM', {})
+    app.config.setdefault('LOG_AMOSTRAGEM_PADRAO', 1.0)
+    app.config.setdefault('LOG_FILA_MAXIMA', 10000)
+
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.propagate = False
+
+    nivel = str(app.config['LOG_NIVEL']).upper()
+    if nivel == 'OFF':
+        # Nível acima de CRITICAL também cala os filhos (ex.: insulincare.sql)
+        logger.setLevel(logging.CRITICAL + 1)
+        logger.addHandler(logging.NullHandler())
+        return
+    logger.setLevel(nivel)
+
+    saida = logging.StreamHandler()
+    saida.setFormatter(FormatadorJSON() if app.config['LOG_FORMATO'] == 'json' else FormatadorTexto())
+
+    fila = queue.Queue(maxsize=app.config['LOG_FILA_MAXIMA'])
+    handler = QueueHandlerNaoBloqueante(fila)
+    handler.addFilter(FiltroRequisicao())
+    logger.addHandler(handler)
+
+    listener = QueueListener(fila, saida, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    amostragem = app.config['LOG_AMOSTRAGEM']
+    padrao = app.config['LOG_AMOSTRAGEM_PADRAO']
+    if amostragem or padrao < 1.0:
+        @app.before_request
+        def _sortear_amostra():
+            g.log_amostrado = random.random() < amostragem.get(request.endpoint, padrao)
+
+
+# 🎨 ATALHOS USADOS PELAS ROTAS
+
+def _log(nivel, tipo, message, **campos):
+    if logger.isEnabledFor(nivel):
+        logger.log(nivel, message, extra={'tipo': tipo, **campos})
+
+
+def log_sucesso(message, **campos):
+    _log(logging.INFO, 'sucesso', message, **campos)
+
+
+def log_erro(message, **campos):
+    _log(logging.ERROR, 'erro', message, **campos)
+
+
+def log_info(message, **campos):
+    _log(logging.INFO, 'info', message, **campos)
+
+
+def log_aviso(message, **campos):
+    _log(logging.WARNING, 'aviso', message, **campos)
+
+
+def log_banco(message, **campos):
+    _log(logging.INFO, 'banco', message, **campos)
+
+
+def log_requisicao(method, endpoint, data=None):
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    campos = {'metodo': method, 'caminho': endpoint}
+    # O conteúdo da requisição só vai para o log em nível DEBUG
+    if data is not None and logger.isEnabledFor(logging.DEBUG):
+        campos['dados'] = data
+    _log(logging.INFO, 'requisicao', f"{method} {endpoint}", **campos)
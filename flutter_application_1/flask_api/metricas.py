@@ -0,0 +1,177 @@
+import threading
+import time
+
+from flask import g, request
+
+# 📈 MÉTRICAS NO FORMATO PROMETHEUS
+# Cada thread escreve só no seu próprio "shard" (sem lock no caminho da
+# requisição); o /metrics soma os shards na hora da coleta.
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Shard:
+    def __init__(self):
+        self.requisicoes = {}  # (rota, metodo, status) -> contagem
+        self.latencias = {}    # (rota, metodo) -> [contagem por bucket..., +Inf, soma]
+
+
+class RegistroMetricas:
+    def __init__(self, buckets=BUCKETS_LATENCIA):
+        self.buckets = buckets
+        self._local = threading.local()
+        self._shards = []            # [(thread, shard)]
+        self._encerrados = _Shard()  # soma dos shards de threads que já terminaram
+        self._lock = threading.Lock()  # só para registrar shards novos e na coleta
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                # Thread nova: aproveita para incorporar as que já terminaram, senão,
+                # com uma thread por requisição e sem coleta, a lista não para de crescer
+                self._incorporar_encerrados()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _incorporar_encerrados(self):
+        """Soma em _encerrados os shards de threads mortas (chamar com o lock)."""
+        vivos = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                vivos.append((thread, shard))
+            else:
+                self._somar(self._encerrados, shard)
+        self._shards = vivos
+
+    def observar(self, rota, metodo, status, duracao):
+        shard = self._shard()
+        chave = (rota, metodo, status)
+        shard.requisicoes[chave] = shard.requisicoes.get(chave, 0) + 1
+
+        serie = shard.latencias.get((rota, metodo))
+        if serie is None:
+            serie = shard.latencias[(rota, metodo)] = [0] * (len(self.buckets) + 2)
+        indice = len(self.buckets)
+        for i, limite in enumerate(self.buckets):
+            if duracao <= limite:
+                indice = i
+                break
+        serie[indice] += 1
+        serie[-1] += duracao
+
+    @staticmethod
+    def _somar(destino, shard):
+        for chave, n in shard.requisicoes.copy().items():
+            destino.requisicoes[chave] = destino.requisicoes.get(chave, 0) + n
+        for chave, serie in shard.latencias.copy().items():
+            total = destino.latencias.setdefault(chave, [0] * len(serie))
+            for i, valor in enumerate(list(serie)):
+                total[i] += valor
+
+    def coletar(self):
+        """Soma os shards de todas as threads: (requisicoes, latencias)."""
+        with self._lock:
+            self._incorporar_encerrados()
+            total = _Shard()
+            self._somar(total, self._encerrados)
+            for _, shard in self._shards:
+                self._somar(total, shard)
+        return total.requisicoes, total.latencias
+
+
+def _rotulos(**rotulos):
+    return ','.join(f'{k}="{v}"' for k, v in rotulos.items())
+
+
+def renderizar(registro, pool=None, cache=None, relatorios=None):
+    """Gera o texto de exposição do Prometheus (formato 0.0.4)."""
+    requisicoes, latencias = registro.coletar()
+    linhas = [
+        '# HELP insulincare_http_requests_total Requisições HTTP por rota, método e status.',
+        '# TYPE insulincare_http_requests_total counter',
+    ]
+    for (rota, metodo, status), n in sorted(requisicoes.items()):
+        linhas.append(f'insulincare_http_requests_total{{{_rotulos(rota=rota, metodo=metodo, status=status)}}} {n}')
+
+    linhas += [
+        '# HELP insulincare_http_request_duration_seconds Latência das requisições HTTP.',
+        '# TYPE insulincare_http_request_duration_seconds histogram',
+    ]
+    for (rota, metodo), serie in sorted(latencias.items()):
+        acumulado = 0
+        for limite, n in zip(registro.buckets + ('+Inf',), serie[:-1]):
+            acumulado += n
+            rotulos = _rotulos(rota=rota, metodo=metodo, le=limite)
+            linhas.append(f'insulincare_http_request_duration_seconds_bucket{{{rotulos}}} {acumulado}')
+        rotulos = _rotulos(rota=rota, metodo=metodo)
+        linhas.append(f'insulincare_http_request_duration_seconds_sum{{{rotulos}}} {serie[-1]:.6f}')
+        linhas.append(f'insulincare_http_request_duration_seconds_count{{{rotulos}}} {acumulado}')
+
+    if pool is not None:
+        for nome, metodo, ajuda in (
+            ('size', 'size', 'Tamanho configurado do pool de conexões.'),
+            ('checked_out', 'checkedout', 'Conexões em uso.'),
+            ('checked_in', 'checkedin', 'Conexões livres no pool.'),
+            ('overflow', 'overflow', 'Conexões além do pool_size (overflow).'),
+        ):
+            if hasattr(pool, metodo):
+                linhas += [
+                    f'# HELP insulincare_db_pool_{nome} {ajuda}',
+                    f'# TYPE insulincare_db_pool_{nome} gauge',
+                    f'insulincare_db_pool_{nome} {getattr(pool, metodo)()}',
+                ]
+
+    if cache is not None:
+        estatisticas = cache.estatisticas()
+        for nome in ('hits', 'misses', 'evictions'):
+            if estatisticas.get(nome) is not None:
+                linhas += [
+                    f'# TYPE insulincare_cache_{nome}_total counter',
+                    f'insulincare_cache_{nome}_total {estatisticas[nome]}',
+                ]
+
+    if relatorios is not None:
+        estatisticas = relatorios.estatisticas()
+        for nome in ('na_fila', 'executando'):
+            linhas += [
+                f'# TYPE insulincare_relatorios_{nome} gauge',
+                f'insulincare_relatorios_{nome} {estatisticas[nome]}',
+            ]
+        linhas += [
+            '# HELP insulincare_relatorios_total Relatórios finalizados por tipo e estado.',
+            '# TYPE insulincare_relatorios_total counter',
+        ]
+        for (tipo, estado), n in sorted(estatisticas['contagens'].items()):
+            linhas.append(f'insulincare_relatorios_total{{{_rotulos(tipo=tipo, estado=estado)}}} {n}')
+        linhas += [
+            '# HELP insulincare_relatorio_duracao_seconds Duração da geração dos relatórios.',
+            '# TYPE insulincare_relatorio_duracao_seconds histogram',
+        ]
+        for tipo, serie in sorted(estatisticas['duracoes'].items()):
+            acumulado = 0
+            for limite, n in zip(estatisticas['buckets'] + ('+Inf',), serie[:-1]):
+                acumulado += n
+                linhas.append(f'insulincare_relatorio_duracao_seconds_bucket{{{_rotulos(tipo=tipo, le=limite)}}} {acumulado}')
+            linhas.append(f'insulincare_relatorio_duracao_seconds_sum{{{_rotulos(tipo=tipo)}}} {serie[-1]:.6f}')
+            linhas.append(f'insulincare_relatorio_duracao_seconds_count{{{_rotulos(tipo=tipo)}}} {acumulado}')
+
+    return '\n'.join(linhas) + '\n'
+
+
+def init_metricas(app, registro):
+    """Mede todas as requisições do app (exceto o próprio /metrics)."""
+
+    @app.before_request
+    def _iniciar_medicao():
+        g.inicio_metricas = time.perf_counter()
+
+    @app.after_request
+    def _registrar_medicao(response):
+        inicio = g.pop('inicio_metricas', None)
+        if inicio is not None and request.path != '/metrics':
+            # Usa o molde da rota (/pacientes/<int:paciente_id>) para não explodir a cardinalidade
+            rota = request.url_rule.rule if request.url_rule is not None else 'desconhecida'
+            registro.observar(rota, request.method, response.status_code, time.perf_counter() - inicio)
+        return response
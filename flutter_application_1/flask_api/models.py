@@ -1,10 +1,22 @@
 from database import db
 from datetime import datetime
 
+# 🔄 Versão de cada linha para o /sync: preenchida na criação e a cada UPDATE
+def coluna_updated_at():
+    return db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
 class Paciente(db.Model):
     __tablename__ = 'pacientes'
+    __table_args__ = (
+        # Filtro por setor + paginação por cursor (ORDER BY id)
+        db.Index('ix_pacientes_local_id', 'local_internacao', 'id'),
+        # Busca por prefixo (ver busca.py)
+        db.Index('ix_pacientes_nome_busca', 'nome_busca'),
+        db.Index('ix_pacientes_prontuario', 'prontuario'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(120), nullable=False)
+    nome_busca = db.Column(db.String(120))  # nome sem acentos e em minúsculas, preenchido pelo modelo
     prontuario = db.Column(db.String(50))
     
     # 🆕 CAMPOS ATUALIZADOS (compatível com Flutter)
@@ -21,12 +33,22 @@ class Paciente(db.Model):
     # 🔄 MANTER POR COMPATIBILIDADE
     categoria = db.Column(db.String(50))  # Campo antigo, pode manter
     data_cadastro = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = coluna_updated_at()
+
+    @db.validates('nome')
+    def _atualizar_nome_busca(self, chave, nome):
+        from busca import normalizar
+        self.nome_busca = normalizar(nome)[:120]
+        return nome
 
     def __repr__(self):
         return f'<Paciente {self.nome}>'
 
 class Protocolo(db.Model):
     __tablename__ = 'protocolos'
+    __table_args__ = (
+        db.Index('ix_protocolos_paciente_data', 'paciente_id', 'data_protocolo'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'), nullable=False)
     
@@ -45,6 +67,7 @@ class Protocolo(db.Model):
     bolus_threshold = db.Column(db.Float)  # Limiar para bolus
     
     data_protocolo = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = coluna_updated_at()
     
     # 🔗 RELACIONAMENTO
     paciente = db.relationship('Paciente', backref=db.backref('protocolos', lazy=True))
@@ -54,6 +77,9 @@ class Protocolo(db.Model):
 
 class Prescricao(db.Model):
     __tablename__ = 'prescricoes'
+    __table_args__ = (
+        db.Index('ix_prescricoes_paciente_data', 'paciente_id', 'data_prescricao'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'), nullable=False)
     protocolo_id = db.Column(db.Integer, db.ForeignKey('protocolos.id'))  # Opcional
@@ -66,16 +92,20 @@ class Prescricao(db.Model):
     # 📝 INFORMAÇÕES ADICIONAIS
     observacoes = db.Column(db.Text)
     data_prescricao = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = coluna_updated_at()
 
     # 🔗 RELACIONAMENTOS
     paciente = db.relationship('Paciente', backref=db.backref('prescricoes', lazy=True))
     protocolo = db.relationship('Protocolo', backref=db.backref('prescricoes', lazy=True))
 
     def __repr__(self):
-        return f'<Prescricao {self.paciente.nome} - TDD: {self.dose_total}U>'
+        return f'<Prescricao Paciente {self.paciente_id} - TDD: {self.dose_total}U>'
 
 class Acompanhamento(db.Model):
     __tablename__ = 'acompanhamentos'
+    __table_args__ = (
+        db.Index('ix_acompanhamentos_paciente_data', 'paciente_id', 'data_registro'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'), nullable=False)
     
@@ -83,24 +113,141 @@ class Acompanhamento(db.Model):
     glicemia = db.Column(db.Float, nullable=False)  # mg/dL
     observacao = db.Column(db.Text)
     data_registro = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = coluna_updated_at()
 
     # 🔗 RELACIONAMENTO
     paciente = db.relationship('Paciente', backref=db.backref('acompanhamentos', lazy=True))
 
     def __repr__(self):
-        return f'<Acompanhamento {self.paciente.nome} - {self.glicemia} mg/dL>'
+        return f'<Acompanhamento Paciente {self.paciente_id} - {self.glicemia} mg/dL>'
 
 class Alta(db.Model):
     __tablename__ = 'altas'
+    __table_args__ = (
+        db.Index('ix_altas_paciente_data', 'paciente_id', 'data_alta'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'), nullable=False)
     
     # 📋 DADOS DA ALTA
     resumo = db.Column(db.Text, nullable=False)  # Resumo obrigatório
     data_alta = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = coluna_updated_at()
 
     # 🔗 RELACIONAMENTO
     paciente = db.relationship('Paciente', backref=db.backref('altas', lazy=True))
 
     def __repr__(self):
-        return f'<Alta {self.paciente.nome} - {self.data_alta.strftime("%d/%m/%Y")}>'
\ No newline at end of file
+        return f'<Alta Paciente {self.paciente_id} - {self.data_alta}>'
+
+class Remocao(db.Model):
+    """Tombstone: registro removido de uma das tabelas acima, para o /sync
+    avisar os clientes que ainda têm a linha guardada."""
+    __tablename__ = 'remocoes'
+    id = db.Column(db.Integer, primary_key=True)
+    tabela = db.Column(db.String(50), nullable=False)
+    registro_id = db.Column(db.Integer, nullable=False)
+    paciente_id = db.Column(db.Integer)
+    removido_em = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<Remocao {self.tabela} {self.registro_id}>'
+
+
+class PacienteResumo(db.Model):
+    """Resumo por paciente para a tela do censo, mantido na mesma transação das
+    rotas de escrita (ver resumos.py). min/máx cobrem as 24h até `janela_em`."""
+    __tablename__ = 'paciente_resumo'
+    paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'), primary_key=True, autoincrement=False)
+    ultima_glicemia = db.Column(db.Float)
+    ultima_leitura_em = db.Column(db.DateTime)
+    leituras = db.Column(db.Integer, nullable=False, default=0)
+    minima_24h = db.Column(db.Float)
+    maxima_24h = db.Column(db.Float)
+    janela_em = db.Column(db.DateTime)  # quando min/máx das 24h foram calculados
+    tdd_atual = db.Column(db.Float)
+    ultima_prescricao_em = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<PacienteResumo Paciente {self.paciente_id}>'
+
+
+# 🗃️ ARQUIVO: histórico de pacientes com alta antiga (ver arquivamento.py)
+# Mesmas colunas e ids das tabelas quentes; as rotas de leitura consultam os dois lugares.
+
+class ProtocoloArquivo(db.Model):
+    __tablename__ = 'protocolos_arquivo'
+    __table_args__ = (
+        db.Index('ix_protocolos_arquivo_paciente_data', 'paciente_id', 'data_protocolo'),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'), nullable=False)
+    dieta = db.Column(db.String(50))
+    corticoide = db.Column(db.Boolean, default=False)
+    hepato = db.Column(db.String(50))
+    sensibilidade = db.Column(db.String(50))
+    glicemia_atual = db.Column(db.Float)
+    escala_dispositivo = db.Column(db.Float)
+    basal_tipo = db.Column(db.String(100))
+    nph_posologia = db.Column(db.String(100))
+    rapida_tipo = db.Column(db.String(100))
+    bolus_threshold = db.Column(db.Float)
+    data_protocolo = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    arquivado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+class PrescricaoArquivo(db.Model):
+    __tablename__ = 'prescricoes_arquivo'
+    __table_args__ = (
+        db.Index('ix_prescricoes_arquivo_paciente_data', 'paciente_id', 'data_prescricao'),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'), nullable=False)
+    protocolo_id = db.Column(db.Integer)  # sem FK: o protocolo também vai para o arquivo
+    dose_total = db.Column(db.Float)
+    basal = db.Column(db.Float)
+    prandial = db.Column(db.Float)
+    observacoes = db.Column(db.Text)
+    data_prescricao = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    arquivado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+class AcompanhamentoArquivo(db.Model):
+    __tablename__ = 'acompanhamentos_arquivo'
+    __table_args__ = (
+        db.Index('ix_acompanhamentos_arquivo_paciente_data', 'paciente_id', 'data_registro'),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'), nullable=False)
+    glicemia = db.Column(db.Float, nullable=False)
+    observacao = db.Column(db.Text)
+    data_registro = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    arquivado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class ReplicacaoHeartbeat(db.Model):
+    """Linha única gravada no primário a cada segundo; lida na réplica, dá o atraso
+    da replicação (ver replicas.py)."""
+    __tablename__ = 'replicacao_heartbeat'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    atualizado_em = db.Column(db.DateTime, nullable=False)
+
+
+class Alerta(db.Model):
+    """Alerta glicêmico gerado pelo motor de regras na ingestão (ver alertas.py)."""
+    __tablename__ = 'alertas'
+    __table_args__ = (
+        db.Index('ix_alertas_paciente_criado', 'paciente_id', 'criado_em'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'), nullable=False)
+    regra = db.Column(db.String(50), nullable=False)
+    severidade = db.Column(db.String(20))
+    mensagem = db.Column(db.String(255))
+    glicemia = db.Column(db.Float)  # leitura que disparou; vazio nos alertas de ausência
+    data_referencia = db.Column(db.DateTime, nullable=False)  # leitura (ou última atividade) que originou
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<Alerta {self.regra} Paciente {self.paciente_id}>'
@@ -0,0 +1,98 @@
+import logging
+import time
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# ⏱️ PERFIL DE SQL POR REQUISIÇÃO
+# Conta as consultas e soma o tempo de banco de cada requisição, envia tudo no
+# cabeçalho Server-Timing e registra consultas lentas / suspeitas de N+1.
+
+# Filho de 'insulincare': sai pelo mesmo pipeline de logs.py (a rota é anexada lá)
+logger = logging.getLogger('insulincare.sql')
+
+
+def _antes_de_executar(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('inicio_consultas', []).append(time.perf_counter())
+
+
+def _depois_de_executar(conn, cursor, statement, parameters, context, executemany):
+    duracao = time.perf_counter() - conn.info['inicio_consultas'].pop()
+    if not has_request_context():
+        return
+    perfil = g.get('perfil_sql')
+    if perfil is None:
+        return
+
+    perfil['consultas'] += 1
+    perfil['tempo'] += duracao
+    perfil['sentencas'][statement] += 1
+
+    duracao_ms = duracao * 1000
+    if duracao_ms >= current_app.config['SQL_SLOW_QUERY_MS']:
+        logger.warning('Consulta lenta', extra={
+            'evento': 'consulta_lenta',
+            'metodo': request.method,
+            'caminho': request.path,
+            'duracao_ms': round(duracao_ms, 2),
+            'executemany': executemany,
+            'sql': ' '.join(statement.split())
+        })
+
+
+def _erro_na_execucao(contexto):
+    # Sem after_cursor_execute quando a consulta falha: descarta o início pendente
+    conexao = contexto.connection
+    if conexao is not None and conexao.info.get('inicio_consultas'):
+        conexao.info['inicio_consultas'].pop()
+
+
+def _iniciar_perfil():
+    g.perfil_sql = {'consultas': 0, 'tempo': 0.0, 'sentencas': Counter()}
+    g.inicio_requisicao = time.perf_counter()
+
+
+def _finalizar_perfil(response):
+    perfil = g.pop('perfil_sql', None)
+    if perfil is None:
+        return response
+
+    total_ms = (time.perf_counter() - g.pop('inicio_requisicao')) * 1000
+    db_ms = perfil['tempo'] * 1000
+    response.headers.add('Server-Timing', f'db;dur={db_ms:.2f};desc="{perfil["consultas"]} queries"')
+    response.headers.add('Server-Timing', f'app;dur={total_ms:.2f}')
+
+    # A mesma sentença repetida muitas vezes numa requisição é o padrão típico de N+1
+    limite = current_app.config['SQL_N_MAIS_1_LIMITE']
+    for sentenca, vezes in perfil['sentencas'].items():
+        if vezes >= limite:
+            logger.warning('Possível N+1', extra={
+                'evento': 'possivel_n_mais_1',
+                'metodo': request.method,
+                'caminho': request.path,
+                'repeticoes': vezes,
+                'consultas': perfil['consultas'],
+                'sql': ' '.join(sentenca.split())
+            })
+    return response
+
+
+def init_perfil_sql(app):
+    """Liga o perfil de SQL no app. Configurações: SQL_PROFILING (liga/desliga),
+    SQL_SLOW_QUERY_MS (limiar da consulta lenta) e SQL_N_MAIS_1_LIMITE."""
+    app.config.setdefault('SQL_PROFILING', True)
+    app.config.setdefault('SQL_SLOW_QUERY_MS', 200)
+    app.config.setdefault('SQL_N_MAIS_1_LIMITE', 10)
+    if not app.config['SQL_PROFILING']:
+        return
+
+    # Ouvintes na classe Engine: valem para qualquer engine criado pelo app
+    if not event.contains(Engine, 'before_cursor_execute', _antes_de_executar):
+        event.listen(Engine, 'before_cursor_execute', _antes_de_executar)
+        event.listen(Engine, 'after_cursor_execute', _depois_de_executar)
+        event.listen(Engine, 'handle_error', _erro_na_execucao)
+
+    app.before_request(_iniciar_perfil)
+    app.after_request(_finalizar_perfil)
@@ -0,0 +1,119 @@
+import threading
+import time
+
+from sqlalchemy import inspect, text
+
+from database import db
+from esquema import colunas_ausentes
+from logs import log_banco, log_erro, log_info, log_sucesso
+
+# 🚦 PRONTIDÃO DO APP
+# O create_app não toca no banco: o aquecimento (conexão + verificação das
+# tabelas) roda em segundo plano ou na primeira chamada a /ready.
+
+
+class Prontidao:
+    """Estado do aquecimento do banco, consultado pelo /ready.
+
+    Modos: 'background' (thread iniciada junto com o app) ou 'lazy' (o
+    aquecimento só acontece quando alguém pergunta se o app está pronto).
+    Outros módulos podem registrar tarefas extras com adicionar_tarefa().
+
+    Uma falha não é definitiva: o aquecimento é refeito com espera crescente
+    (AQUECIMENTO_ESPERA_INICIAL dobrando até AQUECIMENTO_ESPERA_MAXIMA), pela
+    thread no modo background ou pelo próximo /ready depois da espera no lazy.
+    As tarefas rodam de novo desde o início, então precisam ser idempotentes."""
+
+    def __init__(self, app, modo='background'):
+        self.app = app
+        self.modo = modo
+        self.estado = 'pendente'
+        self.erro = None
+        self.duracao = None
+        self.etapas = {}
+        self.tentativas = 0
+        self.espera_inicial = app.config.get('AQUECIMENTO_ESPERA_INICIAL', 1)
+        self.espera_maxima = app.config.get('AQUECIMENTO_ESPERA_MAXIMA', 60)
+        self._proxima_tentativa = 0.0
+        self.tarefas = [('conexao', verificar_conexao), ('tabelas', verificar_tabelas)]
+        self._lock = threading.Lock()
+
+    def adicionar_tarefa(self, nome, funcao):
+        self.tarefas.append((nome, funcao))
+
+    def iniciar(self):
+        if self.modo == 'background':
+            threading.Thread(target=self._aquecer_ate_pronto, name='aquecimento-db', daemon=True).start()
+
+    def _aquecer_ate_pronto(self):
+        while not self.aquecer():
+            time.sleep(max(0.1, self._proxima_tentativa - time.monotonic()))
+
+    def aquecer(self):
+        """Executa as tarefas se ainda não estão prontas (ou se a espera depois
+        da última falha já passou). Devolve True quando o app está pronto."""
+        with self._lock:
+            if self.estado in ('pronto', 'aquecendo'):
+                return self.estado == 'pronto'
+            if self.estado == 'erro' and time.monotonic() < self._proxima_tentativa:
+                return False
+            self.estado = 'aquecendo'
+            self.tentativas += 1
+
+        inicio = time.perf_counter()
+        try:
+            with self.app.app_context():
+                for nome, funcao in self.tarefas:
+                    t = time.perf_counter()
+                    funcao()
+                    self.etapas[nome] = round((time.perf_counter() - t) * 1000, 2)
+            self.erro = None
+            self.estado = 'pronto'
+            log_sucesso(f"Banco pronto em {time.perf_counter() - inicio:.2f}s")
+        except Exception as e:
+            espera = min(self.espera_maxima, self.espera_inicial * 2 ** (self.tentativas - 1))
+            self._proxima_tentativa = time.monotonic() + espera
+            self.erro = str(e)
+            self.estado = 'erro'
+            log_erro(f"Falha no aquecimento do banco (tentativa {self.tentativas}, "
+                     f"nova tentativa em {espera:.0f}s): {str(e)}")
+        finally:
+            self.duracao = round(time.perf_counter() - inicio, 3)
+        return self.estado == 'pronto'
+
+    def garantir(self):
+        """No modo lazy, executa o aquecimento na própria requisição (de novo
+        depois de uma falha, respeitando a espera)."""
+        if self.estado in ('pendente', 'erro'):
+            self.aquecer()
+
+    def resumo(self):
+        return {
+            'status': self.estado,
+            'modo': self.modo,
+            'duracao_s': self.duracao,
+            'etapas_ms': dict(self.etapas),
+            'tentativas': self.tentativas,
+            'erro': self.erro
+        }
+
+
+def verificar_conexao():
+    log_banco("Testando conexão com o banco...")
+    with db.engine.connect() as connection:
+        connection.execute(text('SELECT 1')).fetchone()
+
+
+def verificar_tabelas():
+    existentes = set(inspect(db.engine).get_table_names())
+    faltando = sorted(set(db.metadata.tables) - existentes)
+    if faltando:
+        log_info("💡 Solução: rode 'python -m flask --app app init-db' para criar as tabelas")
+        raise RuntimeError(f"Tabelas ausentes: {', '.join(faltando)}")
+    # Tabela antiga sem as colunas novas: o ORM falharia em toda consulta
+    ausentes = colunas_ausentes()
+    if ausentes:
+        log_info("💡 Solução: rode 'python -m flask --app app init-db' para atualizar o esquema")
+        raise RuntimeError("Colunas ausentes: " + ', '.join(
+            f'{tabela}.{c.name}' for tabela, colunas in ausentes.items() for c in colunas))
+    log_banco(f"Tabelas disponíveis: {', '.join(sorted(existentes))}")
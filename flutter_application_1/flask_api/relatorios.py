@@ -0,0 +1,237 @@
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import exists, select
+
+from arquivamento import MODELOS_ARQUIVO
+from database import db
+from glicemia import resumir_por_paciente, resumo_vazio
+from logs import log_erro, log_sucesso
+from models import Paciente, Protocolo, Prescricao, Acompanhamento, Alta
+from serializadores import (serializar_paciente, serializar_protocolo, serializar_prescricao,
+                            serializar_acompanhamento, serializar_alta)
+
+# 📑 RELATÓRIOS EM SEGUNDO PLANO
+# Relatório de fim de turno do setor e pacote de alta juntam leituras,
+# prescrições e protocolos de muitos pacientes. Montá-los dentro da requisição
+# prende um worker e uma conexão do pool por segundos; aqui eles rodam num pool
+# de threads limitado e o cliente acompanha pelo id da tarefa. As tarefas ficam
+# na memória do processo: com vários workers, consulte no mesmo que criou.
+
+TIPOS_RELATORIO = ('setor', 'alta')
+
+BUCKETS_DURACAO = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class FilaCheia(Exception):
+    """Já há relatórios demais esperando execução."""
+
+
+def _historico(modelo, coluna, paciente_ids, inicio=None, fim=None):
+    """{paciente_id: [registros]} das tabelas quente e de arquivo, em ordem de data.
+
+    Uma consulta por tabela para todos os pacientes, pelo índice (paciente_id, data)."""
+    por_paciente = {}
+    for m in (modelo, MODELOS_ARQUIVO[modelo]):
+        data = getattr(m, coluna)
+        query = select(m).where(m.paciente_id.in_(paciente_ids))
+        if inicio is not None:
+            query = query.where(data >= inicio)
+        if fim is not None:
+            query = query.where(data <= fim)
+        for registro in db.session.scalars(query.order_by(m.paciente_id, data)):
+            por_paciente.setdefault(registro.paciente_id, []).append(registro)
+    for registros in por_paciente.values():
+        registros.sort(key=lambda r: getattr(r, coluna) or datetime.min)
+    return por_paciente
+
+
+def montar_relatorio(tipo, parametros):
+    """Monta o relatório (requer app context).
+
+    'setor': pacientes internados em `local_internacao`, no período since/until
+    (padrão: as últimas `horas`). 'alta': os `paciente_ids`, com todo o histórico
+    ou só o do período."""
+    fim = datetime.fromisoformat(parametros['until']) if parametros.get('until') else datetime.utcnow()
+    if parametros.get('since'):
+        inicio = datetime.fromisoformat(parametros['since'])
+    elif parametros.get('horas'):
+        inicio = fim - timedelta(hours=parametros['horas'])
+    else:
+        inicio = None
+
+    if tipo == 'setor':
+        ids = db.session.scalars(
+            select(Paciente.id)
+            .where(Paciente.local_internacao == parametros['local_internacao'],
+                   ~exists().where(Alta.paciente_id == Paciente.id))
+            .order_by(Paciente.id)
+        ).all()
+    else:
+        ids = parametros['paciente_ids']
+
+    pacientes = db.session.scalars(select(Paciente).where(Paciente.id.in_(ids)).order_by(Paciente.id)).all()
+    ids = [p.id for p in pacientes]
+    leituras = _historico(Acompanhamento, 'data_registro', ids, inicio, fim)
+    prescricoes = _historico(Prescricao, 'data_prescricao', ids, inicio, fim)
+    protocolos = _historico(Protocolo, 'data_protocolo', ids)  # todos: o vigente pode ser anterior ao período
+    altas = {}
+    for alta in db.session.scalars(select(Alta).where(Alta.paciente_id.in_(ids)).order_by(Alta.data_alta)):
+        altas.setdefault(alta.paciente_id, []).append(alta)
+
+    # Resumo glicêmico de todos os pacientes numa passada (arrays ordenados por paciente)
+    serie_ids = [pid for pid in ids for _ in leituras.get(pid, [])]
+    serie_glicemias = [r.glicemia for pid in ids for r in leituras.get(pid, [])]
+    resumos = resumir_por_paciente(serie_ids, serie_glicemias)
+
+    def no_periodo(protocolo):
+        data = protocolo.data_protocolo
+        return data is not None and (inicio is None or data >= inicio) and data <= fim
+
+    itens = []
+    for paciente in pacientes:
+        historico_protocolos = protocolos.get(paciente.id, [])
+        itens.append({
+            'paciente': serializar_paciente(paciente),
+            'protocolo_vigente': serializar_protocolo(historico_protocolos[-1]) if historico_protocolos else None,
+            'protocolos': [serializar_protocolo(p) for p in historico_protocolos if no_periodo(p)],
+            'prescricoes': [serializar_prescricao(p) for p in prescricoes.get(paciente.id, [])],
+            'acompanhamentos': [serializar_acompanhamento(r) for r in leituras.get(paciente.id, [])],
+            'altas': [serializar_alta(a) for a in altas.get(paciente.id, [])],
+            'resumo_glicemico': resumos.get(paciente.id, resumo_vazio())
+        })
+
+    return {
+        'tipo': tipo,
+        'parametros': parametros,
+        'periodo': {'inicio': inicio.isoformat() if inicio else None, 'fim': fim.isoformat()},
+        'gerado_em': datetime.utcnow().isoformat(),
+        'pacientes': itens
+    }
+
+
+class Tarefa:
+    def __init__(self, tipo, parametros, chave):
+        self.id = uuid.uuid4().hex
+        self.tipo = tipo
+        self.parametros = parametros
+        self.chave = chave
+        self.estado = 'na_fila'
+        self.criado_em = datetime.utcnow()
+        self.concluido_em = None
+        self.duracao = None
+        self.resultado = None  # JSON já serializado: o download só copia bytes
+        self.erro = None
+
+    def resumo(self):
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'parametros': self.parametros,
+            'estado': self.estado,
+            'criado_em': self.criado_em.isoformat(),
+            'concluido_em': self.concluido_em.isoformat() if self.concluido_em else None,
+            'duracao_ms': round(self.duracao * 1000, 1) if self.duracao is not None else None,
+            'tamanho_bytes': len(self.resultado) if self.resultado is not None else None,
+            'erro': self.erro
+        }
+
+
+class ExecutorRelatorios:
+    """Pool de RELATORIOS_WORKERS threads com no máximo RELATORIOS_FILA_MAXIMA
+    tarefas esperando. Um pedido com os mesmos parâmetros de uma tarefa em
+    andamento, ou concluída há menos de RELATORIOS_CACHE_TTL segundos, devolve
+    essa tarefa em vez de gerar outra. Guarda as RELATORIOS_GUARDADOS mais recentes."""
+
+    def __init__(self, app):
+        self.app = app
+        config = app.config
+        self.workers = config['RELATORIOS_WORKERS']
+        self.fila_maxima = config['RELATORIOS_FILA_MAXIMA']
+        self.ttl = config['RELATORIOS_CACHE_TTL']
+        self.guardados = config['RELATORIOS_GUARDADOS']
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='relatorio')
+        self._tarefas = OrderedDict()  # id -> Tarefa, da mais antiga para a mais recente
+        self._por_chave = {}           # parâmetros -> id da última tarefa
+        self._lock = threading.Lock()
+        self._contagens = {}           # (tipo, estado final) -> n
+        self._duracoes = {}            # tipo -> [contagem por bucket..., +Inf, soma]
+
+    def submeter(self, tipo, parametros, forcar=False):
+        """Devolve (tarefa, reaproveitada). Levanta FilaCheia se não houver vaga."""
+        chave = json.dumps([tipo, parametros], sort_keys=True)
+        agora = datetime.utcnow()
+        with self._lock:
+            existente = self._tarefas.get(self._por_chave.get(chave))
+            if existente is not None and not forcar and existente.estado != 'erro' and (
+                    existente.concluido_em is None or (agora - existente.concluido_em).total_seconds() < self.ttl):
+                return existente, True
+
+            pendentes = sum(1 for t in self._tarefas.values() if t.estado in ('na_fila', 'executando'))
+            if pendentes >= self.workers + self.fila_maxima:
+                raise FilaCheia()
+
+            tarefa = Tarefa(tipo, parametros, chave)
+            self._tarefas[tarefa.id] = tarefa
+            self._por_chave[chave] = tarefa.id
+            self._descartar_antigas()
+        self._executor.submit(self._executar, tarefa)
+        return tarefa, False
+
+    def _executar(self, tarefa):
+        tarefa.estado = 'executando'
+        inicio = time.perf_counter()
+        try:
+            with self.app.app_context():
+                try:
+                    tarefa.resultado = json.dumps(montar_relatorio(tarefa.tipo, tarefa.parametros), ensure_ascii=False)
+                finally:
+                    db.session.remove()
+            tarefa.estado = 'concluido'
+        except Exception as e:
+            tarefa.erro = str(e)
+            tarefa.estado = 'erro'
+            log_erro(f"Falha no relatório {tarefa.tipo} {tarefa.id}: {str(e)}")
+        finally:
+            tarefa.duracao = time.perf_counter() - inicio
+            tarefa.concluido_em = datetime.utcnow()
+            self._observar(tarefa)
+        if tarefa.estado == 'concluido':
+            log_sucesso(f"📑 Relatório {tarefa.tipo} {tarefa.id} pronto em {tarefa.duracao * 1000:.0f} ms",
+                        evento='relatorio', tipo=tarefa.tipo, duracao_ms=round(tarefa.duracao * 1000, 1))
+
+    def _observar(self, tarefa):
+        with self._lock:
+            chave = (tarefa.tipo, tarefa.estado)
+            self._contagens[chave] = self._contagens.get(chave, 0) + 1
+            serie = self._duracoes.setdefault(tarefa.tipo, [0] * (len(BUCKETS_DURACAO) + 2))
+            indice = next((i for i, limite in enumerate(BUCKETS_DURACAO) if tarefa.duracao <= limite),
+                          len(BUCKETS_DURACAO))
+            serie[indice] += 1
+            serie[-1] += tarefa.duracao
+
+    def _descartar_antigas(self):
+        excedente = len(self._tarefas) - self.guardados
+        for tarefa_id in [i for i, t in self._tarefas.items() if t.concluido_em is not None][:max(0, excedente)]:
+            tarefa = self._tarefas.pop(tarefa_id)
+            if self._por_chave.get(tarefa.chave) == tarefa_id:
+                del self._por_chave[tarefa.chave]
+
+    def obter(self, tarefa_id):
+        return self._tarefas.get(tarefa_id)
+
+    def estatisticas(self):
+        with self._lock:
+            estados = [t.estado for t in self._tarefas.values()]
+            return {
+                'na_fila': estados.count('na_fila'),
+                'executando': estados.count('executando'),
+                'contagens': dict(self._contagens),
+                'duracoes': {tipo: list(serie) for tipo, serie in self._duracoes.items()},
+                'buckets': BUCKETS_DURACAO
+            }
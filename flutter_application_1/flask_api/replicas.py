@@ -0,0 +1,151 @@
+import math
+import threading
+import time
+from datetime import datetime
+
+from flask import g, request
+from sqlalchemy import select, update
+
+from banco import METODOS_LEITURA, requisicao_escreve
+from database import db
+from logs import log_aviso, log_info
+from models import ReplicacaoHeartbeat
+
+# 🪞 RÉPLICA DE LEITURA (opcional, DATABASE_REPLICA_URL)
+# GETs leem da réplica; escritas vão para o primário. Um cliente que acabou de
+# escrever continua lendo do primário por REPLICA_JANELA_ESCRITA segundos, e
+# todos voltam para o primário enquanto a réplica estiver atrasada demais.
+#
+# O atraso vem de um heartbeat que a própria replicação do banco copia. Sem
+# replicação (ex.: dois arquivos SQLite no mesmo host, copiados por fora),
+# nada copia o heartbeat e a réplica nunca seria usada: aí vale REPLICA_LOCAL.
+
+COOKIE_ESCRITA = 'insulincare_escrita'
+
+
+class MonitorReplica:
+    """Mede o atraso da réplica com um heartbeat (como o pt-heartbeat): grava a
+    hora no primário e lê o valor que chegou à réplica. Com REPLICA_LOCAL só
+    confere que a réplica responde e considera o atraso zero."""
+
+    def __init__(self, app):
+        self.app = app
+        self.local = app.config.get('REPLICA_LOCAL', False)
+        self.atraso = math.inf   # segundos; infinito até a primeira medição
+        self.erro = None
+        self._parar = threading.Event()
+
+    def medir(self):
+        with self.app.app_context():
+            try:
+                atraso = self._responde() if self.local else self._heartbeat()
+                self.erro = None
+            except Exception as e:
+                db.session.rollback()
+                atraso, self.erro = math.inf, str(e)
+            finally:
+                db.session.remove()
+
+        limite = self.app.config['REPLICA_ATRASO_MAXIMO']
+        if atraso > limite >= self.atraso:
+            log_aviso(f"Réplica atrasada ({atraso:.1f}s): leituras voltam para o primário")
+        elif self.atraso > limite >= atraso:
+            log_info(f"Réplica em dia ({atraso:.1f}s): leituras voltam para a réplica")
+        self.atraso = atraso
+
+    def _heartbeat(self):
+        fila = self.app.extensions.get('insulincare_fila_escrita')
+        if fila:
+            fila.entrar()
+        try:
+            agora = datetime.utcnow()
+            if db.session.execute(update(ReplicacaoHeartbeat).where(ReplicacaoHeartbeat.id == 1)
+                                  .values(atualizado_em=agora)).rowcount == 0:
+                db.session.add(ReplicacaoHeartbeat(id=1, atualizado_em=agora))
+            db.session.commit()
+        finally:
+            if fila:
+                fila.sair()
+
+        with db.engines['replica'].connect() as conexao:
+            replicado = conexao.execute(
+                select(ReplicacaoHeartbeat.atualizado_em).where(ReplicacaoHeartbeat.id == 1)
+            ).scalar()
+        return (datetime.utcnow() - replicado).total_seconds() if replicado else math.inf
+
+    def _responde(self):
+        with db.engines['replica'].connect() as conexao:
+            conexao.execute(select(1))
+        return 0.0
+
+    def disponivel(self):
+        return self.atraso <= self.app.config['REPLICA_ATRASO_MAXIMO']
+
+    def iniciar(self):
+        intervalo = self.app.config['REPLICA_INTERVALO']
+
+        def _laco():
+            while True:
+                self.medir()
+                if self._parar.wait(intervalo):
+                    return
+
+        threading.Thread(target=_laco, name='monitor-replica', daemon=True).start()
+
+    def parar(self):
+        self._parar.set()
+
+    def resumo(self):
+        return {
+            'atraso_s': None if math.isinf(self.atraso) else round(self.atraso, 3),
+            'disponivel': self.disponivel(),
+            'modo': 'local' if self.local else 'heartbeat',
+            'erro': self.erro
+        }
+
+
+def _chave_cliente():
+    return request.headers.get('X-Client-Id') or request.remote_addr
+
+
+def init_replica(app):
+    """Liga o roteamento se DATABASE_REPLICA_URL estiver configurada. Configurações:
+    REPLICA_JANELA_ESCRITA (s lendo do primário após escrever), REPLICA_ATRASO_MAXIMO
+    (s de atraso tolerado), REPLICA_INTERVALO (s entre medições do heartbeat) e
+    REPLICA_LOCAL (sem heartbeat, ver acima).
+
+    Deve ser chamada depois de db.init_app: o bind 'replica' já existe."""
+    if 'replica' not in app.config.get('SQLALCHEMY_BINDS', {}):
+        return None
+
+    monitor = MonitorReplica(app)
+    janela = app.config['REPLICA_JANELA_ESCRITA']
+    escritas = {}  # cliente -> instante da última escrita (complementa o cookie)
+    lock = threading.Lock()
+
+    @app.before_request
+    def _escolher_banco():
+        if request.method not in METODOS_LEITURA or not monitor.disponivel():
+            return
+        ultima = max(escritas.get(_chave_cliente(), 0.0), request.cookies.get(COOKIE_ESCRITA, 0.0, type=float))
+        if time.time() - ultima < janela:
+            return  # read-your-writes: o cliente ainda pode não ver a própria escrita na réplica
+        g.usar_replica = True
+
+    @app.after_request
+    def _registrar_escrita(response):
+        if request.method in METODOS_LEITURA:
+            response.headers['X-Banco-Leitura'] = 'replica' if g.get('usar_replica') else 'primario'
+        elif response.status_code < 400 and requisicao_escreve(app):
+            agora = time.time()
+            response.set_cookie(COOKIE_ESCRITA, f'{agora:.3f}', max_age=math.ceil(janela),
+                                httponly=True, samesite='Lax')
+            with lock:
+                escritas[_chave_cliente()] = agora
+                if len(escritas) > 10000:
+                    for chave in [c for c, t in escritas.items() if agora - t >= janela]:
+                        del escritas[chave]
+        return response
+
+    monitor.iniciar()
+    return monitor
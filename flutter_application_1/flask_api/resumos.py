@@ -0,0 +1,153 @@
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, func, insert, select, union_all, update
+
+from database import db
+from models import (Paciente, Prescricao, Acompanhamento, PacienteResumo,
+                    PrescricaoArquivo, AcompanhamentoArquivo)
+
+# 📋 RESUMO POR PACIENTE (tabela paciente_resumo)
+# A tela do censo lê uma linha por paciente em vez de varrer o histórico. As
+# rotas de escrita chamam as funções abaixo antes do commit, então o resumo
+# nunca fica à frente nem atrás dos dados; `reconstruir_resumos` refaz tudo.
+
+JANELA_RESUMO = timedelta(hours=24)
+
+
+def _carregar_resumos(paciente_ids, *colunas):
+    """{paciente_id: linha com `colunas`} dos resumos existentes, bloqueados até o
+    commit (SELECT ... FOR UPDATE). Só colunas: nada entra no identity map."""
+    return {linha.paciente_id: linha for linha in db.session.execute(
+        select(PacienteResumo.paciente_id, *colunas)
+        .where(PacienteResumo.paciente_id.in_(paciente_ids)).with_for_update()
+    )}
+
+
+def _gravar_resumos(existentes, valores):
+    """Grava {paciente_id: {coluna: valor}}: um UPDATE em lote (executemany pela PK)
+    para os resumos que já existem e um INSERT para os que faltam. Os dicts de
+    cada grupo têm as mesmas chaves, então cada grupo vira um único statement."""
+    atualizar = [{'paciente_id': pid, **v} for pid, v in valores.items() if pid in existentes]
+    inserir = [{'paciente_id': pid, **v} for pid, v in valores.items() if pid not in existentes]
+    if atualizar:
+        db.session.execute(update(PacienteResumo), atualizar)
+    if inserir:
+        db.session.execute(insert(PacienteResumo), inserir)
+
+
+def atualizar_resumo_leituras(leituras):
+    """Incorpora leituras já gravadas na transação atual: [(paciente_id, glicemia, data_registro)].
+
+    Contagem e última leitura são incrementais; mínima/máxima das últimas 24h
+    saem de uma consulta agregada pelo índice (paciente_id, data_registro)."""
+    por_paciente = {}
+    for paciente_id, glicemia, data_registro in leituras:
+        por_paciente.setdefault(paciente_id, []).append((data_registro, glicemia))
+    if not por_paciente:
+        return
+
+    resumos = _carregar_resumos(list(por_paciente), PacienteResumo.leituras,
+                                PacienteResumo.ultima_glicemia, PacienteResumo.ultima_leitura_em)
+    agora = datetime.utcnow()
+    janela = {pid: (minima, maxima) for pid, minima, maxima in db.session.execute(
+        select(Acompanhamento.paciente_id, func.min(Acompanhamento.glicemia), func.max(Acompanhamento.glicemia))
+        .where(Acompanhamento.paciente_id.in_(por_paciente), Acompanhamento.data_registro >= agora - JANELA_RESUMO)
+        .group_by(Acompanhamento.paciente_id)
+    )}
+
+    valores = {}
+    for pid, novas in por_paciente.items():
+        resumo = resumos.get(pid)
+        data_registro, glicemia = max(novas, key=lambda leitura: leitura[0])
+        # Lotes de dispositivos offline podem trazer leituras mais antigas que a última
+        if resumo is not None and resumo.ultima_leitura_em is not None and data_registro < resumo.ultima_leitura_em:
+            glicemia, data_registro = resumo.ultima_glicemia, resumo.ultima_leitura_em
+        minima, maxima = janela.get(pid, (None, None))
+        valores[pid] = {
+            'leituras': ((resumo.leituras or 0) if resumo is not None else 0) + len(novas),
+            'ultima_glicemia': glicemia, 'ultima_leitura_em': data_registro,
+            'minima_24h': minima, 'maxima_24h': maxima, 'janela_em': agora
+        }
+    _gravar_resumos(resumos, valores)
+
+
+def atualizar_resumo_prescricoes(prescricoes):
+    """Incorpora prescrições já gravadas na transação atual: [(paciente_id, dose_total, data_prescricao)]."""
+    ultimas = {}
+    for paciente_id, dose_total, data_prescricao in prescricoes:
+        if paciente_id not in ultimas or data_prescricao >= ultimas[paciente_id][1]:
+            ultimas[paciente_id] = (dose_total, data_prescricao)
+    if not ultimas:
+        return
+
+    resumos = _carregar_resumos(list(ultimas), PacienteResumo.ultima_prescricao_em)
+    valores = {}
+    for pid, (dose_total, data_prescricao) in ultimas.items():
+        resumo = resumos.get(pid)
+        if resumo is None or resumo.ultima_prescricao_em is None or data_prescricao >= resumo.ultima_prescricao_em:
+            valores[pid] = {'tdd_atual': dose_total, 'ultima_prescricao_em': data_prescricao}
+            if resumo is None:
+                valores[pid]['leituras'] = 0  # o INSERT precisa da contagem (NOT NULL)
+    _gravar_resumos(resumos, valores)
+
+
+def _ultimas_por_paciente(uniao, coluna_valor, coluna_data):
+    """{paciente_id: (valor, data)} da linha mais recente de cada paciente."""
+    datas = (select(uniao.c.paciente_id, func.max(uniao.c[coluna_data]).label('ultima'))
+             .group_by(uniao.c.paciente_id).subquery())
+    return {pid: (valor, data) for pid, valor, data in db.session.execute(
+        select(uniao.c.paciente_id, uniao.c[coluna_valor], uniao.c[coluna_data])
+        .join(datas, and_(uniao.c.paciente_id == datas.c.paciente_id, uniao.c[coluna_data] == datas.c.ultima))
+    )}
+
+
+def reconstruir_resumos(fila=None, tamanho_chunk=1000):
+    """Refaz paciente_resumo a partir do histórico (tabelas quentes + arquivo),
+    numa única transação. Para backfill e correções; devolve o relatório."""
+    inicio = time.perf_counter()
+    agora = datetime.utcnow()
+    if fila:
+        fila.entrar()
+    try:
+        leituras = union_all(*[
+            select(m.paciente_id, m.glicemia, m.data_registro) for m in (Acompanhamento, AcompanhamentoArquivo)
+        ]).subquery()
+        prescricoes = union_all(*[
+            select(m.paciente_id, m.dose_total, m.data_prescricao) for m in (Prescricao, PrescricaoArquivo)
+        ]).subquery()
+
+        contagens = dict(db.session.execute(
+            select(leituras.c.paciente_id, func.count()).group_by(leituras.c.paciente_id)
+        ).all())
+        ultimas_leituras = _ultimas_por_paciente(leituras, 'glicemia', 'data_registro')
+        ultimas_prescricoes = _ultimas_por_paciente(prescricoes, 'dose_total', 'data_prescricao')
+        janela = {pid: (minima, maxima) for pid, minima, maxima in db.session.execute(
+            select(Acompanhamento.paciente_id, func.min(Acompanhamento.glicemia), func.max(Acompanhamento.glicemia))
+            .where(Acompanhamento.data_registro >= agora - JANELA_RESUMO)
+            .group_by(Acompanhamento.paciente_id)
+        )}
+
+        linhas = []
+        for pid in db.session.scalars(select(Paciente.id)):
+            glicemia, data_leitura = ultimas_leituras.get(pid, (None, None))
+            tdd, data_prescricao = ultimas_prescricoes.get(pid, (None, None))
+            minima, maxima = janela.get(pid, (None, None))
+            linhas.append({
+                'paciente_id': pid, 'ultima_glicemia': glicemia, 'ultima_leitura_em': data_leitura,
+                'leituras': contagens.get(pid, 0), 'minima_24h': minima, 'maxima_24h': maxima,
+                'janela_em': agora, 'tdd_atual': tdd, 'ultima_prescricao_em': data_prescricao
+            })
+
+        db.session.execute(delete(PacienteResumo))
+        for inicio_chunk in range(0, len(linhas), tamanho_chunk):
+            db.session.execute(insert(PacienteResumo).values(linhas[inicio_chunk:inicio_chunk + tamanho_chunk]))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        if fila:
+            fila.sair()
+
+    return {'pacientes': len(linhas), 'duracao_ms': round((time.perf_counter() - inicio) * 1000, 1)}
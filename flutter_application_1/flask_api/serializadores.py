@@ -0,0 +1,81 @@
+from datetime import datetime
+
+
+# 📦 CONVERSÃO DOS MODELOS PARA JSON (mesmos campos devolvidos pelas rotas)
+
+def _iso(data):
+    return data.isoformat() if isinstance(data, datetime) else None
+
+
+def serializar_paciente(p):
+    return {
+        'id': p.id,
+        'nome': p.nome,
+        'prontuario': p.prontuario,
+        'sexo': p.sexo,
+        'idade': p.idade,
+        'peso': p.peso,
+        'altura': p.altura,
+        'imc': p.imc,
+        'egfr': p.egfr,
+        'cenario': p.cenario,
+        'local_internacao': p.local_internacao
+    }
+
+
+def serializar_protocolo(protocolo):
+    return {
+        'id': protocolo.id,
+        'dieta': protocolo.dieta,
+        'corticoide': protocolo.corticoide,
+        'hepato': protocolo.hepato,
+        'sensibilidade': protocolo.sensibilidade,
+        'glicemia_atual': protocolo.glicemia_atual,
+        'escala_dispositivo': protocolo.escala_dispositivo,
+        'basal_tipo': protocolo.basal_tipo,
+        'nph_posologia': protocolo.nph_posologia,
+        'rapida_tipo': protocolo.rapida_tipo,
+        'bolus_threshold': protocolo.bolus_threshold,
+        'data_protocolo': _iso(protocolo.data_protocolo)
+    }
+
+
+def serializar_prescricao(p):
+    return {
+        'id': p.id,
+        'dose_total': p.dose_total,
+        'basal': p.basal,
+        'prandial': p.prandial,
+        'observacoes': p.observacoes,
+        'data': _iso(p.data_prescricao)
+    }
+
+
+def serializar_acompanhamento(r):
+    return {
+        'id': r.id,
+        'glicemia': r.glicemia,
+        'observacao': r.observacao,
+        'data': _iso(r.data_registro)
+    }
+
+
+def serializar_alta(a):
+    return {
+        'id': a.id,
+        'resumo': a.resumo,
+        'data': _iso(a.data_alta)
+    }
+
+
+def serializar_alerta(a):
+    return {
+        'id': a.id,
+        'paciente_id': a.paciente_id,
+        'regra': a.regra,
+        'severidade': a.severidade,
+        'mensagem': a.mensagem,
+        'glicemia': a.glicemia,
+        'data_referencia': _iso(a.data_referencia),
+        'criado_em': _iso(a.criado_em)
+    }
@@ -0,0 +1,24 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import Paciente, Protocolo, Prescricao, Acompanhamento, Alta, Remocao
+
+# 🔄 SINCRONIZAÇÃO INCREMENTAL (GET /sync)
+# Linhas novas/alteradas saem pelo updated_at de cada tabela; remoções deixam
+# um tombstone em `remocoes` para os clientes apagarem a cópia local.
+
+MODELOS_SINCRONIZADOS = {m.__tablename__: m for m in (Paciente, Protocolo, Prescricao, Acompanhamento, Alta)}
+
+
+def _tombstones_do_flush(session, flush_context, instances):
+    # session.delete(obj) em qualquer rota: o tombstone entra no mesmo flush
+    for obj in list(session.deleted):
+        tabela = getattr(obj, '__tablename__', None)
+        if tabela in MODELOS_SINCRONIZADOS:
+            paciente_id = obj.id if isinstance(obj, Paciente) else obj.paciente_id
+            session.add(Remocao(tabela=tabela, registro_id=obj.id, paciente_id=paciente_id))
+
+
+def init_sincronizacao():
+    if not event.contains(Session, 'before_flush', _tombstones_do_flush):
+        event.listen(Session, 'before_flush', _tombstones_do_flush)
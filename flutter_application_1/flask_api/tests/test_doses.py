@@ -0,0 +1,161 @@
+"""Paridade do motor de doses (doses.py) com o cálculo do app Flutter.
+
+Uso (a partir da pasta flask_api):
+    python -m unittest discover -s tests
+
+Os valores esperados vêm de lib/pages/prescricao_page.dart (_calcularPrescricao)
+e da CKD-EPI 2021 de lib/pages/cadastro_page.dart (_ckdEpi2021), calculados à
+mão com as regras do Dart: .round() arredonda .5 para longe do zero.
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LOG_NIVEL', 'OFF')
+
+from doses import calcular_prescricoes, ckd_epi_2021  # noqa: E402
+
+CHAVES_DOSE = ('tdd', 'basal', 'bolus_total', 'bolus_refeicao', 'isf', 'nph_manha', 'nph_noite')
+
+# (descrição, cadastro, doses esperadas na ordem de CHAVES_DOSE)
+CASOS = [
+    ('cenário 1, não crítico', {'peso': 70, 'idade': 30, 'cenario': 1, 'egfr': 90}, (28, 14, 14, 5, 61, 8, 6)),
+    ('cenário 2, gestante', {'peso': 70, 'idade': 30, 'cenario': 2, 'egfr': 90}, (42, 21, 21, 7, 40, 13, 8)),
+    ('cenário 3, crítico: basal 60%', {'peso': 70, 'idade': 30, 'cenario': 3, 'egfr': 90}, (35, 21, 14, 5, 49, 13, 8)),
+    # basal = 21 * 0,5 = 10,5: o Dart arredonda para 11 (np.round daria 10)
+    ('cenário 4, paliativo', {'peso': 70, 'idade': 30, 'cenario': 4, 'egfr': 90}, (21, 11, 10, 3, 81, 7, 4)),
+    ('cenário 5, outros', {'peso': 70, 'idade': 30, 'cenario': 5, 'egfr': 90}, (21, 11, 10, 3, 81, 7, 4)),
+    ('idoso (> 65)', {'peso': 70, 'idade': 70, 'cenario': 1, 'egfr': 90}, (22, 11, 11, 4, 77, 7, 4)),
+    ('idade 65 não é idoso', {'peso': 70, 'idade': 65, 'cenario': 1, 'egfr': 90}, (28, 14, 14, 5, 61, 8, 6)),
+    ('TFG 60 não reduz', {'peso': 70, 'idade': 30, 'cenario': 1, 'egfr': 60}, (28, 14, 14, 5, 61, 8, 6)),
+    ('TFG < 60', {'peso': 70, 'idade': 30, 'cenario': 1, 'egfr': 59.9}, (25, 13, 12, 4, 68, 8, 5)),
+    ('TFG 30 só reduz uma vez', {'peso': 70, 'idade': 30, 'cenario': 1, 'egfr': 30}, (25, 13, 12, 4, 68, 8, 5)),
+    ('TFG < 30', {'peso': 70, 'idade': 30, 'cenario': 1, 'egfr': 29.9}, (20, 10, 10, 3, 85, 6, 4)),
+    ('idoso crítico com TFG < 30', {'peso': 80, 'idade': 70, 'cenario': 3, 'egfr': 20}, (23, 14, 9, 3, 74, 8, 6)),
+    ('sem peso: 70 kg', {'idade': 30, 'cenario': 1, 'egfr': 90}, (28, 14, 14, 5, 61, 8, 6)),
+    ('sem nada: 70 kg, 30 anos, cenário 1, TFG 90', {}, (28, 14, 14, 5, 61, 8, 6)),
+    ('peso fracionado', {'peso': 52.5, 'idade': 30, 'cenario': 1, 'egfr': 90}, (21, 11, 10, 3, 81, 7, 4)),
+]
+
+# (creatinina, idade, sexo, TFG esperada com 1 casa)
+CASOS_CKD_EPI = [
+    (1.0, 50, 'M', 91.7),
+    (1.0, 50, 'F', 68.6),
+    (0.5, 50, 'F', 114.2),
+    (0.9, 40, 'M', 110.7),   # creatinina = k: os dois termos valem 1
+    (3.0, 70, 'M', 21.7),
+    (0.0, 50, 'M', 0.0),     # sem creatinina o cadastro grava 0
+]
+
+
+def doses(sugestao):
+    return tuple(sugestao[c] for c in CHAVES_DOSE)
+
+
+class TestParidadeDoses(unittest.TestCase):
+
+    def test_cenarios_e_ajustes(self):
+        sugestoes = calcular_prescricoes([cadastro for _, cadastro, _ in CASOS], detalhada=False)
+        for (descricao, _, esperado), sugestao in zip(CASOS, sugestoes):
+            with self.subTest(descricao):
+                self.assertEqual(doses(sugestao), esperado)
+
+    def test_ckd_epi_2021(self):
+        for creatinina, idade, sexo, esperado in CASOS_CKD_EPI:
+            with self.subTest(creatinina=creatinina, idade=idade, sexo=sexo):
+                self.assertAlmostEqual(float(ckd_epi_2021(creatinina, idade, sexo)), esperado, places=1)
+
+    def test_tfg_estimada_pela_creatinina(self):
+        sugestao = calcular_prescricoes([{'peso': 80, 'idade': 70, 'cenario': 1, 'creatinina': 3.0, 'sexo': 'M'}],
+                                        detalhada=False)[0]
+        self.assertEqual(sugestao['egfr_utilizada'], 21.7)
+        self.assertEqual(doses(sugestao), (18, 9, 9, 3, 94, 5, 4))
+
+    def test_tfg_informada_prevalece_sobre_creatinina(self):
+        sugestao = calcular_prescricoes([{'peso': 70, 'idade': 30, 'egfr': 90, 'creatinina': 3.0}], detalhada=False)[0]
+        self.assertEqual(sugestao['egfr_utilizada'], 90.0)
+
+    def test_tfg_zero_sem_creatinina_usa_padrao(self):
+        # Diferença intencional: o app usaria TFG 0 (< 30) para quem não informou creatinina
+        sugestao = calcular_prescricoes([{'peso': 70, 'idade': 30, 'egfr': 0, 'creatinina': 0}], detalhada=False)[0]
+        self.assertEqual(sugestao['egfr_utilizada'], 90.0)
+        self.assertEqual(doses(sugestao), (28, 14, 14, 5, 61, 8, 6))
+
+    def test_detalhes_como_no_app(self):
+        paliativo, critico_idoso = calcular_prescricoes([
+            {'peso': 70, 'idade': 30, 'cenario': 4, 'egfr': 90},
+            {'peso': 70, 'idade': 70, 'cenario': 3, 'egfr': 50},
+        ])
+        self.assertEqual(paliativo['escala_correcao'][0], {'min': 150, 'max': 200, 'unidades': 2})
+        self.assertEqual((paliativo['meta_min'], paliativo['meta_max'], paliativo['risco_hipo']), (100, 250, 'Baixo'))
+        self.assertEqual(critico_idoso['escala_correcao'][0], {'min': 141, 'max': 180, 'unidades': 2})
+        self.assertEqual((critico_idoso['meta_min'], critico_idoso['meta_max'], critico_idoso['hipo_alerta']),
+                         (140, 180, 70))
+        self.assertEqual(critico_idoso['risco_hipo'], 'Alto')
+
+
+class TestRotasDoses(unittest.TestCase):
+    """As mesmas doses pelas rotas: POST /prescricoes sem dose_total e /prescricoes/calcular."""
+
+    @classmethod
+    def setUpClass(cls):
+        from app import create_app
+        from database import db
+
+        cls.pasta = tempfile.TemporaryDirectory()
+        cls.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(cls.pasta.name, 'doses.db')}",
+            'DB_AQUECIMENTO': 'lazy', 'ARQUIVAMENTO_INTERVALO_HORAS': 0, 'ALERTAS_VERIFICACAO_MINUTOS': 0
+        })
+        with cls.app.app_context():
+            db.create_all()
+        cls.client = cls.app.test_client()
+
+    @classmethod
+    def tearDownClass(cls):
+        from database import db
+
+        with cls.app.app_context():
+            db.engine.dispose()
+        cls.pasta.cleanup()
+
+    def cadastrar(self, **campos):
+        resposta = self.client.post('/pacientes', json={'nome': 'Paridade Doses', **campos})
+        self.assertEqual(resposta.status_code, 200, resposta.get_json())
+        return resposta.get_json()['id']
+
+    def test_criar_prescricao_sem_dose_total(self):
+        for descricao, cadastro, esperado in CASOS:
+            with self.subTest(descricao):
+                paciente_id = self.cadastrar(**cadastro)
+                resposta = self.client.post('/prescricoes', json={'paciente_id': paciente_id})
+                self.assertEqual(resposta.status_code, 200, resposta.get_json())
+                prescricao = self.client.get(f'/prescricoes/{paciente_id}').get_json()[0]
+                tdd, basal, _, bolus_refeicao, *_ = esperado
+                self.assertEqual((prescricao['dose_total'], prescricao['basal'], prescricao['prandial']),
+                                 (tdd, basal, bolus_refeicao))
+
+    def test_calcular_pelo_cadastro(self):
+        for descricao, cadastro, esperado in CASOS:
+            with self.subTest(descricao):
+                paciente_id = self.cadastrar(**cadastro)
+                resposta = self.client.post('/prescricoes/calcular', json={'paciente_id': paciente_id})
+                self.assertEqual(resposta.status_code, 200, resposta.get_json())
+                self.assertEqual(doses(resposta.get_json()), esperado)
+
+    def test_calcular_simulacao_com_creatinina(self):
+        paciente_id = self.cadastrar(peso=80, idade=70, cenario=1, egfr=90)
+        resposta = self.client.post('/prescricoes/calcular',
+                                    json={'paciente_id': paciente_id, 'creatinina': 3.0, 'sexo': 'M'})
+        self.assertEqual(resposta.get_json()['egfr_utilizada'], 21.7)
+        self.assertEqual(doses(resposta.get_json()), (18, 9, 9, 3, 94, 5, 4))
+
+    def test_calcular_sem_paciente(self):
+        resposta = self.client.post('/prescricoes/calcular', json={'cenario': 2})
+        self.assertEqual(doses(resposta.get_json()), (42, 21, 21, 7, 40, 13, 8))
+
+
+if __name__ == '__main__':
+    unittest.main()
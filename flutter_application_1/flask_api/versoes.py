@@ -0,0 +1,168 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, current_app, g, request
+
+from codificacao import FormatoInvalido, formato_pedido
+
+# 🏷️ ETAG E GET CONDICIONAL
+# Cada tabela (ou tabela de um paciente, 'prescricoes:42') tem um número de
+# versão que as rotas de escrita incrementam depois do commit. O ETag de uma
+# leitura é o hash dessas versões com a URL e o formato pedido: com um
+# If-None-Match igual, a rota responde 304 sem consultar o banco nem serializar.
+#
+# A versão é lida antes da consulta e incrementada depois do commit, então um
+# ETag nunca rotula dados mais antigos do que a versão que ele carrega.
+
+SUFIXOS_COMPRESSAO = ('-gzip', '-br')
+
+
+class VersoesMemoria:
+    """Versões no processo atual. Com vários workers cada um tem as suas: o ETag
+    inclui uma época por processo e vale só por `validade` segundos, como o
+    CacheLRU, para que a escrita feita em outro worker apareça dentro desse prazo."""
+
+    def __init__(self, max_chaves=10000, validade=60):
+        self.max_chaves = max_chaves
+        self.validade = validade
+        self.epoca = uuid.uuid4().hex
+        self._sequencia = 0
+        self._versoes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def incrementar(self, *chaves):
+        with self._lock:
+            self._sequencia += 1
+            for chave in chaves:
+                self._versoes[chave] = self._sequencia
+                self._versoes.move_to_end(chave)
+            self._descartar()
+
+    def obter(self, chaves):
+        """Versões das chaves. Uma chave nunca vista (ou descartada) recebe a
+        sequência atual, que é maior ou igual a qualquer versão já emitida."""
+        with self._lock:
+            versoes = []
+            for chave in chaves:
+                versao = self._versoes.get(chave)
+                if versao is None:
+                    versao = self._versoes[chave] = self._sequencia
+                self._versoes.move_to_end(chave)
+                versoes.append(versao)
+            self._descartar()
+            return self.epoca, versoes
+
+    def _descartar(self):
+        while len(self._versoes) > self.max_chaves:
+            self._versoes.popitem(last=False)
+
+    def estatisticas(self):
+        with self._lock:
+            return {'backend': 'memoria', 'chaves': len(self._versoes), 'sequencia': self._sequencia,
+                    'validade': self.validade}
+
+
+class VersoesRedis:
+    """Versões compartilhadas entre workers via Redis (dependência opcional).
+
+    Um INCR global dá a próxima versão; chaves ausentes (nunca escritas ou
+    descartadas pelo Redis) são criadas com a sequência atual, como na memória."""
+
+    def __init__(self, url, prefixo='insulincare:versao:'):
+        import redis  # opcional: só necessário com CACHE_REDIS_URL
+
+        self._redis = redis.Redis.from_url(url)
+        self.prefixo = prefixo
+        self.validade = None
+        self._chave_sequencia = prefixo + '_sequencia'
+        self._chave_epoca = prefixo + '_epoca'
+
+    def incrementar(self, *chaves):
+        if not chaves:
+            return
+        versao = self._redis.incr(self._chave_sequencia)
+        self._redis.mset({self.prefixo + c: versao for c in chaves})
+
+    def obter(self, chaves):
+        nomes = [self._chave_epoca] + [self.prefixo + c for c in chaves]
+        valores = self._redis.mget(nomes)
+        if any(v is None for v in valores):
+            # Época nova se o Redis foi esvaziado: versões reiniciadas não repetem ETags antigos
+            sequencia = self._redis.get(self._chave_sequencia) or 0
+            pipe = self._redis.pipeline()
+            pipe.set(self._chave_epoca, uuid.uuid4().hex, nx=True)
+            for nome, valor in zip(nomes[1:], valores[1:]):
+                if valor is None:
+                    pipe.set(nome, sequencia, nx=True)
+            pipe.execute()
+            valores = self._redis.mget(nomes)
+        return valores[0].decode(), [int(v) for v in valores[1:]]
+
+    def estatisticas(self):
+        return {'backend': 'redis', 'sequencia': int(self._redis.get(self._chave_sequencia) or 0)}
+
+
+def criar_versoes(config):
+    """Mesmo backend do cache: CACHE_REDIS_URL; na memória, VERSOES_MAX_CHAVES e
+    VERSOES_VALIDADE (padrão: CACHE_TTL)."""
+    if config.get('CACHE_REDIS_URL'):
+        return VersoesRedis(config['CACHE_REDIS_URL'])
+    return VersoesMemoria(max_chaves=config.get('VERSOES_MAX_CHAVES', 10000),
+                          validade=config.get('VERSOES_VALIDADE') or config.get('CACHE_TTL', 60))
+
+
+def calcular_etag(versoes, chaves, validade=None):
+    """ETag forte da requisição atual: versões das chaves + URL + formato pedido.
+
+    `validade` (s) limita o ETag a uma janela de tempo, para respostas que
+    mudam com o relógio; a do backend em memória também entra."""
+    epoca, numeros = versoes.obter(chaves)
+    partes = [epoca, ','.join(map(str, numeros)), request.full_path, formato_pedido()]
+    for janela in (validade, versoes.validade):
+        if janela:
+            partes.append(str(int(time.time() // janela)))
+    return hashlib.blake2b('|'.join(partes).encode(), digest_size=12).hexdigest()
+
+
+def _sem_sufixo(etag):
+    for sufixo in SUFIXOS_COMPRESSAO:
+        if etag.endswith(sufixo):
+            return etag[:-len(sufixo)]
+    return etag
+
+
+def condicional(chaves, validade=None):
+    """Decorator das rotas de leitura. `chaves(**kwargs da rota)` devolve as
+    chaves de versão da resposta; `validade` é um número ou função sem argumentos.
+
+    If-None-Match com o ETag atual (com ou sem o sufixo da compressão) vira 304
+    antes de a rota rodar. Leituras servidas pela réplica não recebem ETag: o
+    atraso da réplica poderia rotular dados antigos com a versão nova."""
+    def decorator(rota):
+        @wraps(rota)
+        def wrapper(**kwargs):
+            try:
+                janela = validade() if callable(validade) else validade
+                etag = calcular_etag(current_app.extensions['insulincare_versoes'], chaves(**kwargs), janela)
+            except FormatoInvalido:
+                return rota(**kwargs)  # a própria rota responde o 400
+
+            for recebido in request.if_none_match.as_set(include_weak=True):
+                if _sem_sufixo(recebido) == etag:
+                    response = Response(status=304)
+                    response.set_etag(recebido)
+                    response.headers['Cache-Control'] = 'no-cache'
+                    response.vary.update(('Accept', 'Accept-Encoding'))
+                    return response
+
+            response = current_app.make_response(rota(**kwargs))
+            if response.status_code == 200 and not g.get('usar_replica'):
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
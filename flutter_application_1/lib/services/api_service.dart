@@ -171,16 +171,25 @@ class ApiService {
     }
   }
 
+  // 📄 A API pagina /pacientes: segue o X-Next-After-Id até a última página
+  static const int _pacientesPorPagina = 1000;
+
   static Future<List<Map<String, dynamic>>> listarPacientes() async {
     try {
-      final response = await _makeRequest('GET', '/pacientes');
-      
-      if (response.statusCode == 200) {
+      final pacientes = <Map<String, dynamic>>[];
+      String? afterId;
+      do {
+        final response = await _makeRequest('GET',
+            '/pacientes?limit=$_pacientesPorPagina${afterId != null ? '&after_id=$afterId' : ''}');
+
+        if (response.statusCode != 200) {
+          throw Exception('Erro ao listar pacientes');
+        }
         List<dynamic> data = jsonDecode(response.body);
-        return data.cast<Map<String, dynamic>>();
-      } else {
-        throw Exception('Erro ao listar pacientes');
-      }
+        pacientes.addAll(data.cast<Map<String, dynamic>>());
+        afterId = response.headers['x-next-after-id'];
+      } while (afterId != null);
+      return pacientes;
     } catch (e) {
       throw Exception('Falha ao carregar pacientes: $e');
     }